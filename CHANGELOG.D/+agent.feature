@@ -0,0 +1 @@
+Add `wabucket serve` agent, which keeps the platform client, buckets, W&B service and caches warm, the CLI commands are run by it transparently while it is running.
@@ -0,0 +1 @@
+Cache the resolved artifact aliases locally to skip W&B API round-trips on download. Immutable aliases never expire, the mutable ones are cached for `--alias-ttl` seconds; the artifact usage is recorded in W&B in the background.
@@ -0,0 +1 @@
+Add node-local artifact cache for `download_artifact`, configured with `--cache-dir`/`WABUCKET_CACHE_DIR` and `--cache-size`/`WABUCKET_CACHE_SIZE`.
@@ -0,0 +1 @@
+Add `AsyncWaBucketRefAPI` with coroutine versions of the upload, download and link methods, `WaBucketRefAPI` is now a synchronous wrapper around it.
@@ -0,0 +1 @@
+Add `wabucket upload-many` and `download-many` commands, with the matching `upload_many()` and `download_many()` API methods, which transfer the artifacts listed in a YAML or JSON manifest concurrently, within a single W&B run and under a shared concurrency limit.
@@ -0,0 +1 @@
+Add `upload --compress [zstd|gzip]` option, which compresses every file as a stream on its way to the bucket. The codec is recorded in the W&B artifact metadata and the files are decompressed on download transparently. Install `wabucketref[zstd]` for the zstd codec.
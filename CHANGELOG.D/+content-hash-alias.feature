@@ -0,0 +1 @@
+Add `!content-hash` artifact alias, which is a digest of the uploaded files. The upload is skipped if the bucket already has the artifact with the same content.
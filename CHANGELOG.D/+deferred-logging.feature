@@ -0,0 +1 @@
+Add `--defer-logging` mode, which records the uploaded and linked artifacts in a durable local journal and logs them to W&B in the background, and `wabucket flush` command to log the records left.
@@ -0,0 +1 @@
+Store a manifest of the uploaded files next to each artifact, so `upload_artifact(..., overwrite=True)` uploads only new or changed files and deletes only the removed ones.
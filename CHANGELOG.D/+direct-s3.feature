@@ -0,0 +1 @@
+Add `--direct-s3` transfer mode, talking to the S3-compatible object store of the bucket directly with concurrent multipart uploads and ranged downloads.
@@ -0,0 +1 @@
+Support local directories (`file://` bucket URIs, e.g. NFS mounts) as the artifact storage, transferring the files with parallel copies.
@@ -0,0 +1 @@
+Add `upload --pack` mode, which streams many small files into tar shards with an offset index. Packed artifacts are unpacked concurrently on download, and a single file could be read with `fetch_artifact_file()`.
@@ -0,0 +1 @@
+Upload artifact files to the bucket in parallel, the number of concurrent uploads is set with `upload --jobs`.
@@ -0,0 +1 @@
+Add `WaBucketRefAPI.prefetch_artifact()`, which downloads the artifact in the background and returns a handle to wait for the whole artifact or for the individual files. The synchronous API now runs its event loop in a dedicated thread.
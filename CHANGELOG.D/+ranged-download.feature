@@ -0,0 +1 @@
+Add `download --range-size` mode, which fetches large files by byte ranges concurrently and retries each failed range on its own.
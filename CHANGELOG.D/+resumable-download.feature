@@ -0,0 +1 @@
+Downloads retry every file on its own with a jittered backoff and keep a journal of the completed files, so an interrupted download fetches only the missing or incomplete files when restarted.
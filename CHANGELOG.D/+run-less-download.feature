@@ -0,0 +1 @@
+Add `download --no-run` option and `use_run` argument of `download_artifact()`, which resolve the artifact with the W&B public API instead of starting a W&B run.
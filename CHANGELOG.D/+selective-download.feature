@@ -0,0 +1 @@
+Add `download --include` and `--exclude` glob options, so only the matching files of the artifact are downloaded. For packed artifacts only the shards holding the matching files are fetched.
@@ -0,0 +1 @@
+Add `--shared` and `--shard` options of `wabucket download` and `download-many`, which coordinate the processes of a distributed training downloading the same artifact into the same directory: either one process downloads it while the others wait, or every process downloads its shard of the files.
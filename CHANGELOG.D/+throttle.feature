@@ -0,0 +1 @@
+Add `--max-bandwidth` transfer rate cap and `--jobs auto`, adapting the number of concurrent transfers to the throughput and backing off on errors.
@@ -0,0 +1 @@
+Add `--timings` option, reporting the durations, bytes, files and retries of the upload, download and link phases as JSON lines, optionally stored in the W&B run summary.
@@ -0,0 +1 @@
+Record per-file checksums of the uploaded artifacts, hashed in a thread pool while the files are being uploaded, and add `download --verify` option to check the downloaded files against them in parallel.
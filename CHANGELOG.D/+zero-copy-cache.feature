@@ -0,0 +1 @@
+Populate the download destination from the artifact cache with reflinks or read-only hardlinks instead of copying the files.
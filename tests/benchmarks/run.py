@@ -0,0 +1,463 @@
+"""Offline benchmarks of `WaBucketRefAPI.upload_artifact`, `download_artifact`
+and `link`.
+
+Every artifact shape is uploaded, downloaded and linked, each call
+in a separate process, so the peak RSS is measured per call. The bucket is
+replaced by a stand-in: a local directory (`--target local`, `file://` bucket)
+or an S3 server (`--target s3`, moto) accessed with the direct S3 transfers.
+W&B is replaced by `wandb_stub.StubWandb`.
+
+    python -m tests.benchmarks.run --target s3 --scale 0.05 \\
+        --baseline tests/benchmarks/baseline-s3.json --output benchmark-s3.json
+
+The report of the previous run serves as the baseline. Exits with 1 if
+the throughput of any call dropped below the baseline by more than
+`--max-regression`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import urllib.request
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Iterator, Sequence
+
+from tests.benchmarks.wandb_stub import StubWandb
+from wabucketref.aliases import ALIAS_CACHE_DIR_ENV
+from wabucketref.const import DEFAULT_JOBS
+
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+OPERATIONS = ("upload_artifact", "download_artifact", "link")
+# phases moving the files, the throughput is measured on
+TRANSFER_PHASES = {"upload_artifact": "upload", "download_artifact": "download"}
+ART_TYPE = "benchmark"
+ART_ALIAS = "bench"
+NATIVE_BUCKET = "wabucket-benchmarks"
+MAX_REGRESSION = 0.25
+REPEAT = 3
+_WRITE_CHUNK = 8 * 1024**2
+
+
+@dataclass(frozen=True)
+class Shape:
+    name: str
+    files: int
+    file_size: int
+
+    def scaled(self, scale: float) -> Shape:
+        # a single file shape keeps the file count, the others keep the file size
+        if self.files == 1:
+            return Shape(self.name, 1, max(1, int(self.file_size * scale)))
+        return Shape(self.name, max(1, int(self.files * scale)), self.file_size)
+
+    @property
+    def bytes(self) -> int:
+        return self.files * self.file_size
+
+
+SHAPES = {
+    shape.name: shape
+    for shape in (
+        Shape("huge", 1, 1024**3),
+        Shape("medium", 1000, 1024**2),
+        Shape("tiny", 100_000, 1024),
+    )
+}
+
+
+def make_dataset(shape: Shape, dst: Path) -> None:
+    for i in range(shape.files):
+        # at most 1000 files per directory, as the real datasets are laid out
+        path = dst / f"{i // 1000:03d}" / f"{i:06d}.bin"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("wb") as f:
+            left = shape.file_size
+            while left > 0:
+                chunk = os.urandom(min(left, _WRITE_CHUNK))
+                f.write(chunk)
+                left -= len(chunk)
+
+
+def _stand_in_client(endpoint: str) -> Any:
+    """apolo_sdk.Client stand-in, serving the S3 server credentials."""
+    from apolo_sdk import Bucket, BucketCredentials
+
+    bucket = Bucket(
+        id="benchmark-bucket",
+        name="benchmarks",
+        owner="user",
+        cluster_name="cluster",
+        org_name="org",
+        project_name="project",
+        provider=Bucket.Provider.AWS,
+        created_at=datetime(2024, 1, 1, tzinfo=timezone.utc),
+        imported=False,
+    )
+
+    async def get(name: str, *args: Any, **kwargs: Any) -> Bucket:
+        return bucket
+
+    async def request_tmp_credentials(*args: Any, **kwargs: Any) -> BucketCredentials:
+        return BucketCredentials(
+            bucket_id=bucket.id,
+            provider=Bucket.Provider.AWS,
+            credentials={
+                "bucket_name": NATIVE_BUCKET,
+                "access_key_id": "key",
+                "secret_access_key": "secret",
+                "endpoint_url": endpoint,
+                "region_name": "us-east-1",
+            },
+        )
+
+    async def close() -> None:
+        pass
+
+    return SimpleNamespace(
+        buckets=SimpleNamespace(
+            get=get, request_tmp_credentials=request_tmp_credentials
+        ),
+        close=close,
+        closed=False,
+        _closed=False,
+    )
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss of the child process starts with the parent peak on Linux,
+    # VmHWM is reset on exec
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+def _events(path: Path) -> Iterator[dict[str, Any]]:
+    with path.open() as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def summarize(operation: str, timings: Path) -> dict[str, Any]:
+    """Scenario result out of the timings of the API call."""
+    summary: dict[str, Any] = {}
+    transfer = {"bytes": 0, "files": 0, "duration": 0.0}
+    for event in _events(timings):
+        if event["event"] == "operation" and event["operation"] == operation:
+            summary = event
+        elif event["event"] == "phase" and event["phase"] == TRANSFER_PHASES.get(
+            operation
+        ):
+            for key in transfer:
+                transfer[key] += event.get(key, 0)
+    if not summary:
+        raise RuntimeError(f"{operation} was not recorded in {timings}")
+    result: dict[str, Any] = {
+        "duration": summary["duration"],
+        "phases": summary["phases"],
+    }
+    if transfer["duration"]:
+        result["bytes"] = transfer["bytes"]
+        result["files"] = transfer["files"]
+        result["mb_s"] = round(transfer["bytes"] / 1e6 / transfer["duration"], 2)
+        result["files_s"] = round(transfer["files"] / transfer["duration"], 2)
+    return result
+
+
+def run_scenario(
+    target: str,
+    endpoint: str | None,
+    shape: Shape,
+    operation: str,
+    workdir: Path,
+    jobs: int,
+    attempt: int = 0,
+) -> dict[str, Any]:
+    """Run a single API call, in the current process.
+
+    Every attempt uploads, downloads and links the artifact of its own alias.
+    """
+    from wabucketref.api import WaBucketRefAPI
+
+    StubWandb(workdir / "wandb").install()
+    alias = f"{ART_ALIAS}-{attempt}"
+    timings = workdir / "timings" / f"{shape.name}-{operation}-{attempt}.jsonl"
+    timings.parent.mkdir(parents=True, exist_ok=True)
+    bucket = f"file:{workdir / 'bucket'}" if target == "local" else "benchmarks"
+    api = WaBucketRefAPI(
+        bucket=bucket,
+        project_name="benchmarks",
+        direct_s3=target == "s3",
+        timings=timings,
+    )
+    if endpoint is not None:
+        api._api._n_client = _stand_in_client(endpoint)
+    try:
+        if operation == "upload_artifact":
+            api.upload_artifact(
+                workdir / "data" / shape.name,
+                art_name=shape.name,
+                art_type=ART_TYPE,
+                art_alias=alias,
+                jobs=jobs,
+            )
+        elif operation == "download_artifact":
+            api.download_artifact(
+                shape.name,
+                ART_TYPE,
+                alias,
+                dst_folder=workdir / "download" / shape.name,
+                jobs=jobs,
+            )
+        else:
+            api.link(
+                f"{ART_TYPE}/{shape.name}/{alias}",
+                art_name=f"{shape.name}-link",
+                art_type=ART_TYPE,
+                art_alias=alias,
+            )
+    finally:
+        api.close()
+    result: dict[str, Any] = {"shape": shape.name, "operation": operation}
+    result.update(summarize(operation, timings))
+    result["peak_rss_mb"] = round(_peak_rss_mb(), 1)
+    return result
+
+
+def _spawn(
+    args: argparse.Namespace, shape: Shape, operation: str, attempt: int
+) -> dict[str, Any]:
+    result_path = args.workdir / "results" / f"{shape.name}-{operation}-{attempt}.json"
+    result_path.parent.mkdir(parents=True, exist_ok=True)
+    cmd = [
+        sys.executable,
+        "-m",
+        "tests.benchmarks.run",
+        "--target",
+        args.target,
+        "--scale",
+        str(args.scale),
+        "--jobs",
+        str(args.jobs),
+        "--workdir",
+        str(args.workdir),
+        "--scenario",
+        f"{shape.name}:{operation}:{attempt}",
+        "--result",
+        str(result_path),
+    ]
+    if args.endpoint:
+        cmd += ["--endpoint", args.endpoint]
+    env = {k: v for k, v in os.environ.items() if not k.startswith("WABUCKET_")}
+    # the aliases resolved by the previous runs refer to the removed buckets
+    env[ALIAS_CACHE_DIR_ENV] = str(args.workdir / "aliases")
+    proc = subprocess.run(
+        cmd,
+        cwd=REPO_ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise RuntimeError(f"{shape.name} {operation} failed.")
+    result: dict[str, Any] = json.loads(result_path.read_text())
+    return result
+
+
+def best(results: Sequence[dict[str, Any]]) -> dict[str, Any]:
+    """The fastest of the repeated runs, the slower ones are disturbed by the noise,
+    with the largest peak RSS.
+    """
+    if "mb_s" in results[0]:
+        fastest = max(results, key=lambda r: float(r["mb_s"]))
+    else:
+        fastest = min(results, key=lambda r: float(r["duration"]))
+    return {**fastest, "peak_rss_mb": max(r["peak_rss_mb"] for r in results)}
+
+
+def compare(
+    report: dict[str, Any], baseline: dict[str, Any], max_regression: float
+) -> list[str]:
+    """Throughput regressions of `report` against `baseline` report."""
+    for key in ("target", "scale"):
+        if report[key] != baseline[key]:
+            raise ValueError(
+                f"Baseline was measured with {key} {baseline[key]}, "
+                f"got {report[key]}."
+            )
+    expected = {(r["shape"], r["operation"]): r for r in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        base = expected.get((result["shape"], result["operation"]))
+        if base is None:
+            continue
+        for metric in ("mb_s", "files_s"):
+            if metric not in result or metric not in base:
+                continue
+            floor = base[metric] * (1 - max_regression)
+            if result[metric] < floor:
+                regressions.append(
+                    f"{result['shape']} {result['operation']}: {metric} "
+                    f"{result[metric]} < {floor:.2f} (baseline {base[metric]})"
+                )
+    return regressions
+
+
+def format_report(report: dict[str, Any]) -> str:
+    lines = [
+        f"target={report['target']} scale={report['scale']} jobs={report['jobs']} "
+        f"repeat={report['repeat']}",
+        f"{'shape':<8} {'operation':<18} {'files':>7} {'MB':>9} {'sec':>7} "
+        f"{'MB/s':>8} {'files/s':>9} {'RSS MB':>7}",
+    ]
+    for r in report["results"]:
+        lines.append(
+            f"{r['shape']:<8} {r['operation']:<18} {r.get('files', '-'):>7} "
+            f"{r.get('bytes', 0) / 1e6:>9.1f} {r['duration']:>7.2f} "
+            f"{r.get('mb_s', '-'):>8} {r.get('files_s', '-'):>9} "
+            f"{r['peak_rss_mb']:>7}"
+        )
+        phases = ", ".join(f"{k}={v:.3f}s" for k, v in r["phases"].items())
+        lines.append(f"{'':<8} {phases}")
+    return "\n".join(lines)
+
+
+def _start_s3_server() -> Any:
+    from moto.server import ThreadedMotoServer
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)  # request log
+    server = ThreadedMotoServer(port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    endpoint = f"http://{host}:{port}"
+    # moto does not check the request signatures
+    request = urllib.request.Request(f"{endpoint}/{NATIVE_BUCKET}", method="PUT")
+    urllib.request.urlopen(request).close()
+    return server, endpoint
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--target", choices=("local", "s3"), default="local")
+    parser.add_argument(
+        "--shapes",
+        nargs="+",
+        choices=sorted(SHAPES),
+        default=list(SHAPES),
+        help="Artifact shapes to benchmark.",
+    )
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="Multiplier of the file size of huge shape "
+        "and of the file count of the others.",
+    )
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS)
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=REPEAT,
+        help="Number of runs of every call, the fastest one is reported.",
+    )
+    parser.add_argument(
+        "--workdir", type=Path, help="Defaults to a new temporary directory."
+    )
+    parser.add_argument("--output", type=Path, help="Where to write JSON report.")
+    parser.add_argument("--baseline", type=Path, help="Report to compare with.")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=MAX_REGRESSION,
+        help="Allowed throughput drop against the baseline, as a fraction.",
+    )
+    # a single scenario, run in the child process
+    parser.add_argument("--scenario", help=argparse.SUPPRESS)
+    parser.add_argument("--result", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--endpoint", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = parse_args(argv)
+    if args.scenario:
+        shape_name, operation, attempt = args.scenario.split(":")
+        result = run_scenario(
+            args.target,
+            args.endpoint,
+            SHAPES[shape_name].scaled(args.scale),
+            operation,
+            args.workdir,
+            args.jobs,
+            int(attempt),
+        )
+        args.result.write_text(json.dumps(result))
+        return 0
+
+    with tempfile.TemporaryDirectory(prefix="wabucket-bench-") as tmp:
+        if args.workdir is None:
+            args.workdir = Path(tmp)
+        server = None
+        if args.target == "s3":
+            server, args.endpoint = _start_s3_server()
+        try:
+            report: dict[str, Any] = {
+                "target": args.target,
+                "scale": args.scale,
+                "jobs": args.jobs,
+                "repeat": args.repeat,
+                "results": [],
+            }
+            for name in args.shapes:
+                shape = SHAPES[name].scaled(args.scale)
+                make_dataset(shape, args.workdir / "data" / shape.name)
+                runs: dict[str, list[dict[str, Any]]] = {op: [] for op in OPERATIONS}
+                for attempt in range(args.repeat):
+                    for operation in OPERATIONS:
+                        runs[operation].append(_spawn(args, shape, operation, attempt))
+                    shutil.rmtree(args.workdir / "download", ignore_errors=True)
+                for operation in OPERATIONS:
+                    report["results"].append(best(runs[operation]))
+                # keep the data of the next shapes in the page cache
+                shutil.rmtree(args.workdir / "data")
+                shutil.rmtree(args.workdir / "bucket", ignore_errors=True)
+        finally:
+            if server is not None:
+                server.stop()
+
+    print(format_report(report))
+    if args.output is not None:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+    if args.baseline is not None:
+        regressions = compare(
+            report, json.loads(args.baseline.read_text()), args.max_regression
+        )
+        if regressions:
+            print("\nThroughput regressions:\n" + "\n".join(regressions))
+            return 1
+        print(f"\nNo throughput regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
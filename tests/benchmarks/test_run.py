@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from tests.benchmarks.run import SHAPES, Shape, best, compare, main
+
+
+def _report(**throughput: float) -> dict[str, Any]:
+    return {
+        "target": "local",
+        "scale": 0.1,
+        "jobs": 8,
+        "repeat": 1,
+        "results": [
+            {"shape": "medium", "operation": "upload_artifact", **throughput},
+            {"shape": "medium", "operation": "link", "duration": 1.0},
+        ],
+    }
+
+
+def test_scaled_shapes() -> None:
+    assert SHAPES["huge"].scaled(0.5) == Shape("huge", 1, 512 * 1024**2)
+    assert SHAPES["tiny"].scaled(0.01) == Shape("tiny", 1000, 1024)
+
+
+def test_best() -> None:
+    runs = [
+        {"mb_s": 10.0, "duration": 2.0, "peak_rss_mb": 100.0},
+        {"mb_s": 20.0, "duration": 1.0, "peak_rss_mb": 90.0},
+    ]
+    assert best(runs) == {"mb_s": 20.0, "duration": 1.0, "peak_rss_mb": 100.0}
+    runs = [
+        {"duration": 2.0, "peak_rss_mb": 1.0},
+        {"duration": 1.0, "peak_rss_mb": 1.0},
+    ]
+    assert best(runs)["duration"] == 1.0
+
+
+def test_compare() -> None:
+    baseline = _report(mb_s=100.0, files_s=100.0)
+
+    assert compare(_report(mb_s=80.0, files_s=120.0), baseline, 0.25) == []
+    regressions = compare(_report(mb_s=70.0, files_s=120.0), baseline, 0.25)
+    assert regressions == ["medium upload_artifact: mb_s 70.0 < 75.00 (baseline 100.0)"]
+
+
+def test_compare_other_scale() -> None:
+    baseline = {**_report(mb_s=100.0), "scale": 1.0}
+    with pytest.raises(ValueError, match="scale"):
+        compare(_report(mb_s=100.0), baseline, 0.25)
+
+
+def test_local_run(tmp_path: Path) -> None:
+    output = tmp_path / "report.json"
+    args = ["--shapes", "medium", "--scale", "0.005", "--repeat", "1"]
+    args += ["--output", str(output)]
+
+    assert main(args) == 0
+
+    report = json.loads(output.read_text())
+    results = {r["operation"]: r for r in report["results"]}
+    assert set(results) == {"upload_artifact", "download_artifact", "link"}
+    for operation in ("upload_artifact", "download_artifact"):
+        assert results[operation]["files"] == 5
+        assert results[operation]["mb_s"] > 0
+    assert "log_artifact" in results["link"]["phases"]
+    assert all(r["peak_rss_mb"] > 0 for r in report["results"])
+    # the report is the baseline of the next run
+    assert main(args + ["--baseline", str(output), "--max-regression", "1"]) == 0
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable
+
+import wandb
+
+
+class StubArtifact:
+    """The part of `wandb.Artifact` the API uses for the bucket references."""
+
+    def __init__(
+        self,
+        name: str,
+        type: str,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        self.name = name
+        self.type = type
+        self.metadata = metadata or {}
+        self.manifest = SimpleNamespace(entries={})
+
+    def add_reference(
+        self, uri: str, name: str | None = None, checksum: bool = True, **kwargs: Any
+    ) -> None:
+        self.manifest.entries[name or uri] = SimpleNamespace(ref=uri)
+
+    def add_dir(self, local_path: str, **kwargs: Any) -> None:
+        raise NotImplementedError("Only the bucket references are benchmarked.")
+
+
+class StubRun:
+    name = "benchmark"
+
+    def __init__(self, use_artifact: Callable[..., StubArtifact]) -> None:
+        self.config: dict[str, Any] = {}
+        self.summary: dict[str, Any] = {}
+        self.use_artifact = use_artifact
+
+
+class StubWandb:
+    """Offline stand-in of the W&B calls made by `WaBucketRefAPI`.
+
+    The logged artifacts are kept as JSON files in `registry` directory,
+    so they are resolved by the other benchmark processes as well.
+    """
+
+    def __init__(self, registry: Path) -> None:
+        self.registry = registry
+        self.registry.mkdir(parents=True, exist_ok=True)
+
+    def install(self) -> None:
+        setattr(wandb, "run", StubRun(self.use_artifact))
+        setattr(wandb, "Artifact", StubArtifact)
+        setattr(wandb, "log_artifact", self.log_artifact)
+        setattr(wandb, "use_artifact", self.use_artifact)
+
+    def _path(self, name: str, alias: str) -> Path:
+        return self.registry / f"{name}.{alias}.json"
+
+    def log_artifact(
+        self,
+        artifact: StubArtifact,
+        aliases: list[str] | None = None,
+        **kwargs: Any,
+    ) -> StubArtifact:
+        data = {
+            "name": artifact.name,
+            "type": artifact.type,
+            "metadata": artifact.metadata,
+            "refs": {
+                name: entry.ref for name, entry in artifact.manifest.entries.items()
+            },
+        }
+        for alias in aliases or ["latest"]:
+            self._path(artifact.name, alias).write_text(json.dumps(data))
+        return artifact
+
+    def use_artifact(
+        self, artifact_or_name: str, type: str | None = None, **kwargs: Any
+    ) -> StubArtifact:
+        name, alias = artifact_or_name.rsplit(":", 1)
+        path = self._path(name, alias)
+        if not path.exists():
+            raise ValueError(f"Artifact {artifact_or_name} was not logged.")
+        data = json.loads(path.read_text())
+        artifact = StubArtifact(data["name"], data["type"], data["metadata"])
+        for ref_name, ref in data["refs"].items():
+            artifact.add_reference(ref, ref_name, checksum=False)
+        return artifact
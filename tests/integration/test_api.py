@@ -1,3 +1,4 @@
+import asyncio
 import os
 import time
 import uuid
@@ -7,7 +8,7 @@ import pytest
 from apolo_sdk import Bucket
 
 from tests.integration.conftest import BucketArtifactPath, RecuresiveHasher
-from wabucketref.api import WaBucketRefAPI
+from wabucketref.api import AsyncWaBucketRefAPI, WaBucketRefAPI
 
 
 def test_upload_and_download(
@@ -62,3 +63,69 @@ def test_link_artifact(
     api.close()
     dst_hash = files_hasher(dst)
     assert bucket_artifact.hash == dst_hash
+
+
+def test_overwrite_artifact(
+    bucket: Bucket,
+    rand_artifact_dir: Path,
+    tmp_path: Path,
+    files_hasher: RecuresiveHasher,
+) -> None:
+    api = WaBucketRefAPI(bucket=bucket.name, project_name="wabucket-test")
+    api.wandb_start_run()
+    alias = api.upload_artifact(
+        src_folder=rand_artifact_dir,
+        art_name="my_test_artifact",
+        art_type="test",
+        art_alias=f"overwritten-{uuid.uuid4().hex[:10]}",
+    )
+    (rand_artifact_dir / "somedata.csv").unlink()
+    (rand_artifact_dir / "dir" / "deep_data.csv").write_text(uuid.uuid4().hex)
+    api.upload_artifact(
+        src_folder=rand_artifact_dir,
+        art_name="my_test_artifact",
+        art_type="test",
+        art_alias=alias,
+        overwrite=True,
+    )
+    time.sleep(5)  # wandb needs some time to start tracking the artifact :)
+    dst = api.download_artifact(
+        dst_folder=tmp_path / "dst",
+        art_name="my_test_artifact",
+        art_type="test",
+        art_alias=alias,
+    )
+    api.close()
+
+    assert files_hasher(rand_artifact_dir) == files_hasher(dst)
+
+
+async def test_async_concurrent_downloads(
+    bucket: Bucket,
+    rand_artifact_dir: Path,
+    tmp_path: Path,
+    files_hasher: RecuresiveHasher,
+) -> None:
+    async with AsyncWaBucketRefAPI(
+        bucket=bucket.name, project_name="wabucket-test"
+    ) as api:
+        alias = await api.upload_artifact(
+            src_folder=rand_artifact_dir,
+            art_name="my_test_artifact",
+            art_type="test",
+        )
+        await asyncio.sleep(5)  # wandb needs some time to start tracking the artifact
+        dsts = await asyncio.gather(
+            *(
+                api.download_artifact(
+                    dst_folder=tmp_path / f"dst-{i}",
+                    art_name="my_test_artifact",
+                    art_type="test",
+                    art_alias=alias,
+                )
+                for i in range(3)
+            )
+        )
+
+    src_hash = files_hasher(rand_artifact_dir)
+    assert [files_hasher(dst) for dst in dsts] == [src_hash] * 3
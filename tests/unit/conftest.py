@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator
+
+import pytest
+from aiohttp import ServerTimeoutError
+from apolo_sdk import BlobObject, Bucket, ResourceNotFound
+from apolo_sdk._buckets import BucketFS
+from yarl import URL
+
+
+BUCKET = Bucket(
+    id="bucket-id",
+    name="bucket",
+    owner="user",
+    cluster_name="cluster",
+    org_name="org",
+    project_name="project",
+    provider=Bucket.Provider.AWS,
+    created_at=datetime(2024, 1, 1, tzinfo=timezone.utc),
+    imported=False,
+)
+
+
+class FakeProvider:
+    """In-memory stand-in for the bucket provider, blobs are kept in `blobs` dict."""
+
+    chunk_size = 4
+
+    def __init__(self) -> None:
+        self.bucket = BUCKET
+        self.blobs: dict[str, bytes] = {}
+        self.fetch_failures = 0
+        self.put_failures = 0
+
+    async def head_blob(self, key: str) -> BlobObject:
+        if key not in self.blobs:
+            raise ResourceNotFound(key)
+        return BlobObject(key=key, bucket=BUCKET, size=len(self.blobs[key]))
+
+    async def put_blob(
+        self, key: str, body: AsyncIterator[bytes] | bytes, progress: Any = None
+    ) -> None:
+        if not isinstance(body, bytes):
+            body = b"".join([chunk async for chunk in body])
+        if self.put_failures:
+            self.put_failures -= 1
+            raise ServerTimeoutError("Injected failure")
+        self.blobs[key] = body
+
+    async def delete_blob(self, key: str) -> None:
+        if key not in self.blobs:
+            raise ResourceNotFound(key)
+        del self.blobs[key]
+
+    @asynccontextmanager
+    async def fetch_blob(
+        self, key: str, offset: int = 0
+    ) -> AsyncIterator[AsyncIterator[bytes]]:
+        if key not in self.blobs:
+            raise ResourceNotFound(key)
+        data = self.blobs[key]
+
+        async def _it() -> AsyncIterator[bytes]:
+            for pos in range(offset, len(data), self.chunk_size):
+                if self.fetch_failures:
+                    self.fetch_failures -= 1
+                    raise ServerTimeoutError("Injected failure")
+                end = pos + self.chunk_size
+                yield data[pos:end]
+
+        yield _it()
+
+    @asynccontextmanager
+    async def list_blobs(
+        self, prefix: str, recursive: bool = False, limit: int | None = None
+    ) -> AsyncIterator[AsyncIterator[BlobObject]]:
+        async def _it() -> AsyncIterator[BlobObject]:
+            found = 0
+            for key, data in sorted(self.blobs.items()):
+                if key.startswith(prefix) and (limit is None or found < limit):
+                    found += 1
+                    yield BlobObject(key=key, bucket=BUCKET, size=len(data))
+
+        yield _it()
+
+
+class FakeBuckets:
+    def __init__(self) -> None:
+        self.provider = FakeProvider()
+
+    @property
+    def blobs(self) -> dict[str, bytes]:
+        return self.provider.blobs
+
+    @blobs.setter
+    def blobs(self, value: dict[str, bytes]) -> None:
+        self.provider.blobs = value
+
+    @asynccontextmanager
+    async def _get_bucket_fs(self, uri: URL) -> AsyncIterator[BucketFS]:
+        yield BucketFS(self.provider)  # type: ignore
+
+    @asynccontextmanager
+    async def list_blobs(
+        self, uri: URL, recursive: bool = False, limit: int | None = None
+    ) -> AsyncIterator[AsyncIterator[BlobObject]]:
+        key = BUCKET.get_key_for_uri(uri)
+        async with self.provider.list_blobs(key, recursive, limit) as it:
+            yield it
+
+
+class FakeClient:
+    def __init__(self) -> None:
+        self.buckets = FakeBuckets()
+
+
+@pytest.fixture
+def client() -> FakeClient:
+    return FakeClient()
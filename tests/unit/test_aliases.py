@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import time
+from pathlib import Path
+
+import pytest
+
+from wabucketref.aliases import AliasCache, is_immutable_alias
+
+
+@pytest.mark.parametrize(
+    "alias,digest,immutable",
+    [
+        ("a" * 64, "a" * 64, True),  # !content-hash
+        ("a" * 64, "b" * 64, False),  # !run-config-hash
+        ("3f2b8a64-6b1e-4d6a-9d1f-0c2b7e8a9f10", None, False),
+        ("v12", None, True),
+        ("latest", None, False),
+        ("best-v1", None, False),
+    ],
+)
+def test_is_immutable_alias(alias: str, digest: str | None, immutable: bool) -> None:
+    assert is_immutable_alias(alias, digest) is immutable
+
+
+def test_mutable_alias_expires(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    cache = AliasCache(tmp_path, ttl=10)
+    latest = (None, "project", "model", "name", "latest")
+    pinned = (None, "project", "model", "name", "v3")
+    cache.put(latest, {"uri": "blob://a"})
+    cache.put(pinned, {"uri": "blob://b"})
+    assert cache.get(latest) == {"uri": "blob://a"}
+    assert cache.get(pinned) == {"uri": "blob://b"}
+    assert cache.get((None, "other", "model", "name", "v3")) is None
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert cache.get(latest) is None
+    assert cache.get(pinned) == {"uri": "blob://b"}
+
+
+def test_zero_ttl_disables_mutable_aliases(tmp_path: Path) -> None:
+    cache = AliasCache(tmp_path, ttl=0)
+    cache.put(("e", "p", "t", "n", "latest"), {"uri": "blob://a"})
+    assert cache.get(("e", "p", "t", "n", "latest")) is None
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from typing import Any, Coroutine
+from unittest import mock
+
+import pytest
+import wandb
+from wandb.wandb_run import Run
+
+from wabucketref.api import AsyncWaBucketRefAPI
+from wabucketref.hashing import hash_files
+from wabucketref.manifest import MANIFEST_SUFFIX, Manifest, local_files
+
+
+@pytest.fixture
+def api(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> AsyncWaBucketRefAPI:
+    # alias cache
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "home-cache"))
+    return AsyncWaBucketRefAPI(
+        project_name="project",
+        bucket=f"file:{tmp_path / 'bucket'}",
+        cache_dir=tmp_path / "cache",
+    )
+
+
+@pytest.fixture
+def wandb_run(monkeypatch: pytest.MonkeyPatch) -> mock.Mock:
+    """Active W&B run, the logged artifacts are recorded by `log_artifact` mock."""
+    run = mock.MagicMock(spec=Run)
+    monkeypatch.setattr(wandb, "run", run)
+    monkeypatch.setattr(wandb, "Artifact", mock.MagicMock())
+    monkeypatch.setattr(wandb, "log_artifact", mock.Mock())
+    return run
+
+
+@pytest.fixture
+def src(tmp_path: Path) -> Path:
+    src = tmp_path / "src"
+    (src / "dir").mkdir(parents=True)
+    for i in range(5):
+        (src / "dir" / f"file-{i}.txt").write_bytes(bytes([i]) * (i * 100))
+    return src
+
+
+def _upload(
+    api: AsyncWaBucketRefAPI,
+    src: Path,
+    alias: str,
+    overwrite: bool = False,
+    pack: bool = False,
+) -> Coroutine[Any, Any, str]:
+    return api._upload_artifact(
+        src, "n", "t", alias, None, True, overwrite, 4, pack, 2**20, None
+    )
+
+
+async def test_incomplete_content_hash_upload_is_repeated(
+    api: AsyncWaBucketRefAPI, src: Path, tmp_path: Path, wandb_run: mock.Mock
+) -> None:
+    alias = await _upload(api, src, "!content-hash")
+    blob = tmp_path / "bucket" / "t" / "n" / alias
+    # as left by the crashed upload, the manifest is written last
+    (blob / "dir" / "file-3.txt").unlink()
+    manifest = Path(str(blob) + MANIFEST_SUFFIX)
+    manifest.unlink()
+
+    assert await _upload(api, src, "!content-hash") == alias
+    assert (blob / "dir" / "file-3.txt").read_bytes() == bytes([3]) * 300
+    assert manifest.exists()
+
+    # the complete upload is skipped
+    (blob / "dir" / "file-4.txt").write_bytes(b"unchanged")
+    assert await _upload(api, src, "!content-hash") == alias
+    assert (blob / "dir" / "file-4.txt").read_bytes() == b"unchanged"
+
+
+async def test_interrupted_overwrite_is_uploaded_again(
+    api: AsyncWaBucketRefAPI,
+    src: Path,
+    tmp_path: Path,
+    wandb_run: mock.Mock,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    await _upload(api, src, "v1", pack=True)
+    blob = tmp_path / "bucket" / "t" / "n" / "v1"
+    manifest = Path(str(blob) + MANIFEST_SUFFIX)
+    assert manifest.exists()
+
+    with monkeypatch.context() as m:
+        m.setattr(api, "_put_files", mock.AsyncMock(side_effect=RuntimeError))
+        with pytest.raises(RuntimeError):
+            await _upload(api, src, "v1", overwrite=True)
+    # the files of the packed upload are gone, so is their manifest
+    assert not manifest.exists()
+
+    await _upload(api, src, "v1", overwrite=True)
+    for path in src.rglob("*.txt"):
+        assert (blob / path.relative_to(src)).read_bytes() == path.read_bytes()
+
+
+async def test_concurrent_calls_start_one_run(
+    api: AsyncWaBucketRefAPI, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(wandb, "run", None)
+    run = mock.MagicMock(spec=Run)
+
+    def _init(**kwargs: Any) -> Run:
+        wandb.run = run
+        return run
+
+    async def _apolo_init() -> None:
+        # let the other calls check the run meanwhile
+        await asyncio.sleep(0.01)
+
+    init = mock.Mock(side_effect=_init)
+    monkeypatch.setattr(wandb, "init", init)
+    monkeypatch.setattr(wandb, "Settings", mock.Mock())
+    monkeypatch.setattr(api, "_apolo_init_if_needed", _apolo_init)
+
+    runs = await asyncio.gather(*(api._wandb_init_if_needed() for _ in range(3)))
+
+    assert runs == [run, run, run]
+    init.assert_called_once()
+    with pytest.raises(RuntimeError, match="W&B has registerred run"):
+        await api.wandb_start_run()
+
+
+async def test_cached_alias_lineage_uses_active_run(
+    api: AsyncWaBucketRefAPI, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    key = (api._entity, "project", "t", "n", "v1")
+    api._aliases.put(key, {"uri": "file:///bucket/t/n/v1"})
+    init = mock.Mock()
+    monkeypatch.setattr(wandb, "init", init)
+    monkeypatch.setattr(wandb, "run", None)
+
+    ref = await api._resolve_artifact("n", "t", "v1")
+    assert str(ref.uri) == "file:///bucket/t/n/v1"
+    assert not api._lineage_tasks
+
+    run = mock.MagicMock(spec=Run)
+    monkeypatch.setattr(wandb, "run", run)
+    await api._resolve_artifact("n", "t", "v1")
+    # finished by the caller before the usage is recorded
+    monkeypatch.setattr(wandb, "run", None)
+    await asyncio.gather(*api._lineage_tasks)
+
+    run.use_artifact.assert_called_once_with(artifact_or_name="n:v1", type="t")
+    init.assert_not_called()
+
+
+async def test_overwritten_alias_is_resolved_again(
+    api: AsyncWaBucketRefAPI, src: Path, wandb_run: mock.Mock
+) -> None:
+    # e.g. `!run-config-hash` alias, re-logged by the overwriting upload
+    alias = "c" * 64
+    await _upload(api, src, alias)
+    key = api._alias_key("n", "t", alias)
+    api._aliases.put(key, {"uri": "file:///bucket/t/n/c", "digest": "d" * 64})
+    assert api._aliases.get(key) is not None
+
+    (src / "dir" / "file-1.txt").write_bytes(b"changed")
+    await _upload(api, src, alias, overwrite=True)
+
+    assert api._aliases.get(key) is None
+
+
+@pytest.mark.parametrize("pack", [False, True])
+async def test_files_are_hashed_while_uploading(
+    api: AsyncWaBucketRefAPI,
+    src: Path,
+    tmp_path: Path,
+    wandb_run: mock.Mock,
+    monkeypatch: pytest.MonkeyPatch,
+    pack: bool,
+) -> None:
+    # not by the separate read of the files
+    monkeypatch.setattr(Manifest, "build", mock.Mock(side_effect=AssertionError))
+
+    await _upload(api, src, "v1", pack=pack)
+
+    blob = tmp_path / "bucket" / "t" / "n" / "v1"
+    manifest = Manifest.loads(Path(str(blob) + MANIFEST_SUFFIX).read_bytes())
+    hashes = hash_files(src, local_files(src))
+    assert {p: r.sha256 for p, r in manifest.files.items()} == hashes
+
+
+async def test_file_modified_after_hashing(
+    api: AsyncWaBucketRefAPI,
+    src: Path,
+    tmp_path: Path,
+    wandb_run: mock.Mock,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    build = Manifest.build
+
+    def _build(*args: Any, **kwargs: Any) -> Manifest:
+        manifest = build(*args, **kwargs)
+        (src / "dir" / "file-2.txt").write_bytes(b"modified")
+        return manifest
+
+    monkeypatch.setattr(Manifest, "build", _build)
+    with pytest.raises(RuntimeError, match="file-2.txt was modified while uploading"):
+        await _upload(api, src, "!content-hash")
+    assert not list((tmp_path / "bucket" / "t" / "n").glob(f"*{MANIFEST_SUFFIX}"))
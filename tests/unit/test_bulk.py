@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from wabucketref.bulk import DownloadSpec, UploadSpec, load_downloads, load_uploads
+
+
+def test_load_uploads(tmp_path: Path) -> None:
+    manifest = tmp_path / "artifacts.yaml"
+    manifest.write_text(
+        """
+artifacts:
+  - src: features/users
+    name: users
+    type: features
+    alias: 1
+    metadata:
+      rows: 1000
+    suffix: users
+    compress: zstd
+  - src: features/items
+    name: items
+    type: features
+    pack: true
+"""
+    )
+    assert load_uploads(manifest) == [
+        UploadSpec(
+            Path("features/users"),
+            "users",
+            "features",
+            alias="1",
+            metadata={"rows": 1000},
+            suffix="users",
+            compression="zstd",
+        ),
+        UploadSpec(Path("features/items"), "items", "features", pack=True),
+    ]
+
+
+def test_load_downloads(tmp_path: Path) -> None:
+    manifest = tmp_path / "artifacts.json"
+    manifest.write_text(
+        json.dumps(
+            [
+                {"type": "model", "name": "m", "alias": "latest", "include": "*.pt"},
+                {"type": "ds", "name": "d", "alias": "v1", "destination": "/data"},
+            ]
+        )
+    )
+    assert load_downloads(manifest) == [
+        DownloadSpec("m", "model", "latest", Path("model/m/latest"), include=("*.pt",)),
+        DownloadSpec("d", "ds", "v1", Path("/data")),
+    ]
+
+
+@pytest.mark.parametrize(
+    "content,error",
+    [
+        ("artifacts: []", "non-empty `artifacts` list"),
+        ("artifacts: [users]", "#1 should be a mapping"),
+        ("- {src: a, name: n, type: t, size: 1}", "unknown keys of artifact #1: size"),
+        ("- {src: a, name: n}\n- {name: n}", "missing keys of artifact #1: type"),
+    ],
+)
+def test_wrong_manifest(tmp_path: Path, content: str, error: str) -> None:
+    manifest = tmp_path / "artifacts.yml"
+    manifest.write_text(content)
+    with pytest.raises(ValueError, match=error):
+        load_uploads(manifest)
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from yarl import URL
+
+from wabucketref.cache import ArtifactCache
+
+
+def _make_download(cache: ArtifactCache, size: int) -> Path:
+    staging = cache.staging_dir()
+    (staging / "dir").mkdir()
+    (staging / "dir" / "data.bin").write_bytes(b"x" * size)
+    return staging
+
+
+def test_put_and_lookup(tmp_path: Path) -> None:
+    cache = ArtifactCache(tmp_path / "cache")
+    uri = URL("blob://cluster/org/project/bucket/model/name/alias")
+    assert cache.lookup(uri, "fp") is None
+
+    cached = cache.put(uri, "fp", _make_download(cache, 10))
+    assert cache.lookup(uri, "fp") == cached
+    assert (cached / "dir" / "data.bin").read_bytes() == b"x" * 10
+
+    dst = tmp_path / "dst"
+    cache.copy_to(cached, dst)
+    assert (dst / "dir" / "data.bin").read_bytes() == b"x" * 10
+
+
+def test_outdated_entry_is_dropped(tmp_path: Path) -> None:
+    cache = ArtifactCache(tmp_path / "cache")
+    uri = URL("blob://cluster/org/project/bucket/model/name/latest")
+    cache.put(uri, "fp-old", _make_download(cache, 10))
+    assert cache.lookup(uri, "fp-new") is None
+    assert cache.lookup(uri, "fp-old") is None
+
+
+def test_lru_eviction(tmp_path: Path) -> None:
+    cache = ArtifactCache(tmp_path / "cache", max_size=25)
+    uris = [URL(f"blob://cluster/org/project/bucket/t/n/{i}") for i in range(3)]
+    cache.put(uris[0], "fp", _make_download(cache, 10))
+    cache.put(uris[1], "fp", _make_download(cache, 10))
+    assert cache.lookup(uris[0], "fp") is not None  # 0 is used more recently now
+    cache.put(uris[2], "fp", _make_download(cache, 10))
+
+    assert cache.lookup(uris[0], "fp") is not None
+    assert cache.lookup(uris[1], "fp") is None
+    assert cache.lookup(uris[2], "fp") is not None
+
+
+def test_staging_is_removed(tmp_path: Path) -> None:
+    cache = ArtifactCache(tmp_path)
+    uri = URL("blob:bucket/t/n/a")
+    with pytest.raises(RuntimeError):
+        with cache.staging() as staging:
+            (staging / "partial.bin").write_bytes(b"x")
+            raise RuntimeError("Download failed")
+    assert not staging.exists()
+
+    with cache.staging() as staging:
+        (staging / "data.bin").write_bytes(b"x")
+        cached = cache.put(uri, "fp", staging)
+    assert (cached / "data.bin").read_bytes() == b"x"
+    assert list((tmp_path / ".tmp").iterdir()) == []
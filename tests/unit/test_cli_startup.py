@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+
+# Bare CLI start, e.g. `wabucket --help`, should not load the heavy SDKs
+STARTUP_BUDGET = float(os.environ.get("WABUCKET_STARTUP_BUDGET", "1.0"))  # seconds
+HEAVY_MODULES = ("wandb", "apolo_sdk", "apolo_cli", "aiohttp")
+
+_SCRIPT = """
+import sys
+from wabucketref.cli import main
+
+try:
+    main([{args}])
+except SystemExit as e:
+    assert e.code == 0, e.code
+loaded = [m for m in {heavy!r} if m in sys.modules]
+assert not loaded, f"Heavy modules were imported: {{loaded}}"
+"""
+
+
+def _run_cli(*args: str) -> float:
+    script = _SCRIPT.format(args=", ".join(map(repr, args)), heavy=HEAVY_MODULES)
+    started = time.monotonic()
+    subprocess.run(
+        [sys.executable, "-c", script], check=True, stdout=subprocess.DEVNULL
+    )
+    return time.monotonic() - started
+
+
+@pytest.mark.parametrize(
+    "args", [("--help",), ("--version",), ("upload", "--help"), ("download", "--help")]
+)
+def test_cli_startup_time(args: tuple[str, ...]) -> None:
+    # best of several runs to reduce the noise of the shared CI runners
+    elapsed = min(_run_cli(*args) for _ in range(3))
+    assert elapsed < STARTUP_BUDGET, (
+        f"`wabucket {' '.join(args)}` took {elapsed:.2f}s, "
+        f"budget is {STARTUP_BUDGET:.2f}s"
+    )
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from aiohttp import ServerTimeoutError
+
+from tests.unit.conftest import BUCKET, FakeClient
+from wabucketref import transfer
+from wabucketref.compression import CODEC_NAMES, compress, decompress, get_codec
+from wabucketref.transfer import TransferEngine
+
+
+ROOT = BUCKET.uri / "t/n/a"
+
+
+@pytest.mark.parametrize("name", CODEC_NAMES)
+def test_roundtrip(name: str) -> None:
+    codec = get_codec(name)
+    data = b"abc" * 1000
+
+    compressed = compress(data, codec)
+
+    assert len(compressed) < len(data)
+    assert decompress(compressed, codec) == data
+
+
+def test_unknown_codec() -> None:
+    with pytest.raises(ValueError, match="Unknown compression codec"):
+        get_codec("lz4")
+
+
+@pytest.mark.parametrize("name", CODEC_NAMES)
+async def test_upload_download_compressed(
+    tmp_path: Path, client: FakeClient, monkeypatch: pytest.MonkeyPatch, name: str
+) -> None:
+    # streamed (multipart) and single PUT uploads
+    monkeypatch.setattr(transfer, "READ_CHUNK_SIZE", 16)
+    codec = get_codec(name)
+    src = tmp_path / "src"
+    (src / "dir").mkdir(parents=True)
+    (src / "big.bin").write_bytes(b"0123456789" * 10)
+    (src / "dir" / "small.txt").write_bytes(b"small")
+    engine = TransferEngine(client, jobs=2)  # type: ignore
+
+    stats = await engine.upload_files(src, ROOT, ["big.bin", "dir/small.txt"], codec)
+
+    assert stats.bytes == 105
+    assert set(client.buckets.blobs) == {
+        f"t/n/a/big.bin{codec.suffix}",
+        f"t/n/a/dir/small.txt{codec.suffix}",
+    }
+    assert decompress(client.buckets.blobs["t/n/a/big.bin" + codec.suffix], codec) == (
+        b"0123456789" * 10
+    )
+
+    dst = tmp_path / "dst"
+    stats = await engine.download_dir(ROOT, dst, range_size=10, codec=codec)
+
+    assert stats.bytes == 105
+    assert (dst / "big.bin").read_bytes() == b"0123456789" * 10
+    assert (dst / "dir" / "small.txt").read_bytes() == b"small"
+    assert sorted(p.name for p in dst.rglob("*") if p.is_file()) == [
+        "big.bin",
+        "small.txt",
+    ]
+
+    await engine.delete_files(ROOT, ["big.bin"], codec)
+
+    assert set(client.buckets.blobs) == {f"t/n/a/dir/small.txt{codec.suffix}"}
+
+
+@pytest.mark.parametrize("name", CODEC_NAMES)
+async def test_truncated_download_fails(
+    tmp_path: Path, client: FakeClient, name: str
+) -> None:
+    codec = get_codec(name)
+    compressed = compress(bytes(range(256)) * 100, codec)
+    truncated = compressed[: len(compressed) // 2]
+    with pytest.raises(ValueError, match="Truncated"):
+        decompress(truncated, codec)
+
+    client.buckets.blobs = {f"t/n/a/data.bin{codec.suffix}": truncated}
+    engine = TransferEngine(client, jobs=1)  # type: ignore
+    with pytest.raises(ServerTimeoutError, match="ended prematurely"):
+        await engine.download_dir(ROOT, tmp_path / "dst", retries=1, codec=codec)
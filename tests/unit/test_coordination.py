@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from wabucketref.coordination import SharedDownload, shard_from_env, shard_of
+
+
+def test_shards_split_files() -> None:
+    paths = [f"dir/file-{i}.bin" for i in range(1000)]
+    shards = [shard_of(path, 8) for path in paths]
+    # the same in every process
+    assert shards == [shard_of(path, 8) for path in paths]
+    assert set(shards) == set(range(8))
+    assert all(shards.count(rank) > 50 for rank in range(8))
+
+
+def test_shard_from_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("LOCAL_RANK", "3")
+    monkeypatch.setenv("LOCAL_WORLD_SIZE", "8")
+    assert shard_from_env() == (3, 8)
+    monkeypatch.setenv("LOCAL_RANK", "8")
+    with pytest.raises(ValueError, match="Wrong rank 8 of 8"):
+        shard_from_env()
+    monkeypatch.delenv("LOCAL_WORLD_SIZE")
+    with pytest.raises(ValueError, match="LOCAL_WORLD_SIZE"):
+        shard_from_env()
+
+
+def test_markers(tmp_path: Path) -> None:
+    dst = tmp_path / "model"
+    download = SharedDownload(dst, "blob://b/v1")
+    assert not download.is_done()
+    download.mark_done()
+    assert download.is_done()
+    # of the other artifact version
+    assert not SharedDownload(dst, "blob://b/v2").is_done()
+
+    download.mark_shard_done(0)
+    with pytest.raises(TimeoutError, match=r"Shards \[1\]"):
+        download.wait_shards(2, timeout=0.1)
+    download.mark_shard_done(1)
+    download.wait_shards(2, timeout=0.1)
+    # the markers are kept out of the downloaded directory
+    assert not dst.exists()
+
+
+async def test_lock_is_exclusive(tmp_path: Path) -> None:
+    events = []
+
+    async def _hold(name: str) -> None:
+        async with SharedDownload(tmp_path / "model", "key").locked():
+            events.append(f"{name} in")
+            await asyncio.sleep(0.05)
+            events.append(f"{name} out")
+
+    await asyncio.gather(_hold("a"), _hold("b"))
+    assert events in (
+        ["a in", "a out", "b in", "b out"],
+        ["b in", "b out", "a in", "a out"],
+    )
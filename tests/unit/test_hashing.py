@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+
+from wabucketref.hashing import file_sha256, files_digest, hash_files
+from wabucketref.manifest import Manifest
+
+
+def test_file_sha256(tmp_path: Path) -> None:
+    data = b"x" * 1000
+    (tmp_path / "data").write_bytes(data)
+    expected = hashlib.sha256(data).hexdigest()
+    assert file_sha256(tmp_path / "data") == expected
+    assert file_sha256(tmp_path / "data", bytearray(7)) == expected
+
+
+def test_hash_files(tmp_path: Path) -> None:
+    paths = [f"file-{i}" for i in range(20)]
+    for path in paths:
+        (tmp_path / path).write_text(path)
+
+    hashes = hash_files(tmp_path, paths, workers=4)
+
+    assert hashes == {p: hashlib.sha256(p.encode()).hexdigest() for p in paths}
+
+
+def test_content_digest(tmp_path: Path) -> None:
+    (tmp_path / "a").mkdir()
+    (tmp_path / "a" / "data").write_text("data")
+    first = Manifest.build(tmp_path).digest()
+    (tmp_path / "a" / "data").touch()  # mtime does not matter
+    assert Manifest.build(tmp_path).digest() == first
+
+    (tmp_path / "a" / "data").rename(tmp_path / "data")
+    assert Manifest.build(tmp_path).digest() != first
+    assert files_digest({}) == hashlib.sha256().hexdigest()
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from wabucketref.journal import ArtifactRecord, Journal
+
+
+def _record(name: str, **kwargs: Any) -> ArtifactRecord:
+    return ArtifactRecord(
+        name=name, type="model", alias="v1", uri=f"blob://b/model/{name}", **kwargs
+    )
+
+
+def test_append_and_remove(tmp_path: Path) -> None:
+    journal = Journal(tmp_path / "journal")
+    assert journal.pending() == []
+
+    first = journal.append(_record("a", metadata={"acc": 0.9}, tags=["job_id:1"]))
+    second = journal.append(_record("b", run_id="run1"))
+
+    pending = journal.pending()
+    assert [path for path, _ in pending] == [first, second]
+    assert pending[0][1] == _record("a", metadata={"acc": 0.9}, tags=["job_id:1"])
+    assert pending[0][1].run_key == (None, None, None, ("job_id:1",))
+    assert pending[1][1].run_key == (None, None, "run1", ())
+
+    journal.remove(first)
+    journal.remove(first)
+    assert [r.name for _, r in journal.pending()] == ["b"]
+
+
+def test_incomplete_records_are_skipped(
+    tmp_path: Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    journal = Journal(tmp_path)
+    journal.append(_record("a"))
+    # left by the crash while writing, and by the older version
+    (tmp_path / ".0-tmp.json").write_text('{"name": ')
+    (tmp_path / "1-broken.json").write_text('{"name": "b"}')
+
+    assert [r.name for _, r in journal.pending()] == ["a"]
+    assert "Skipping broken journal record" in caplog.text
+
+
+def test_from_env(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.delenv("WABUCKET_JOURNAL_DIR", raising=False)
+    assert Journal.from_env().root == tmp_path / "wabucket" / "journal"
+    monkeypatch.setenv("WABUCKET_JOURNAL_DIR", str(tmp_path / "j"))
+    assert Journal.from_env().root == tmp_path / "j"
+
+
+def test_import_without_fcntl() -> None:
+    # as on Windows, the file locks are only needed by the journal flush
+    script = (
+        "import sys; sys.modules['fcntl'] = None; "
+        "from wabucketref import WaBucketRefAPI"
+    )
+    subprocess.run([sys.executable, "-c", script], check=True)
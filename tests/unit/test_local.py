@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from yarl import URL
+
+from wabucketref.compression import get_codec
+from wabucketref.local import LocalBackend
+from wabucketref.packing import pack_upload, read_pack_index, unpack_download
+
+
+@pytest.fixture
+def src(tmp_path: Path) -> Path:
+    src = tmp_path / "src"
+    (src / "dir").mkdir(parents=True)
+    for i in range(10):
+        (src / "dir" / f"file-{i}.txt").write_bytes(bytes([i]) * (i * 300))
+    (src / "empty").write_bytes(b"")
+    return src
+
+
+@pytest.fixture
+def root(tmp_path: Path) -> URL:
+    return URL(f"file:{tmp_path / 'bucket'}") / "t/n/a"
+
+
+def _paths(src: Path) -> list[str]:
+    return sorted(f.relative_to(src).as_posix() for f in src.rglob("*") if f.is_file())
+
+
+async def test_upload_and_download(src: Path, tmp_path: Path, root: URL) -> None:
+    backend = LocalBackend(jobs=3)
+    assert not await backend.exists(root)
+
+    stats = await backend.upload_files(src, root, _paths(src))
+
+    assert stats.files == 11
+    assert await backend.exists(root)
+    listed = await backend.list_files(root)
+    assert [f.path for f in listed] == _paths(src)
+    assert all(f.modified for f in listed)
+
+    done: list[str] = []
+    dst = tmp_path / "dst"
+    await backend.download_dir(root, dst, on_file_done=done.append)
+    assert sorted(done) == _paths(src)
+    for path in _paths(src):
+        assert (dst / path).read_bytes() == (src / path).read_bytes()
+
+    await backend.delete_files(root, ["empty"])
+    assert "empty" not in [f.path for f in await backend.list_files(root)]
+    await backend.delete_dir(root)
+    assert not await backend.exists(root)
+
+
+async def test_compressed(src: Path, tmp_path: Path, root: URL) -> None:
+    backend = LocalBackend()
+    codec = get_codec("gzip")
+    await backend.upload_files(src, root, _paths(src), codec)
+    assert all(f.path.endswith(".gz") for f in await backend.list_files(root))
+
+    dst = tmp_path / "dst"
+    await backend.download_dir(
+        root, dst, codec=codec, selected=lambda p: p.startswith("dir/")
+    )
+    assert _paths(dst) == [p for p in _paths(src) if p.startswith("dir/")]
+    for path in _paths(dst):
+        assert (dst / path).read_bytes() == (src / path).read_bytes()
+
+    blob = Path(root.path) / "dir" / "file-9.txt.gz"
+    blob.write_bytes(blob.read_bytes()[:-10])
+    with pytest.raises(ValueError, match="truncated gzip data"):
+        await backend.download_dir(root, tmp_path / "other", codec=codec)
+
+
+async def test_packed(src: Path, tmp_path: Path, root: URL) -> None:
+    backend = LocalBackend(jobs=2)
+    await pack_upload(backend, src, _paths(src), root, shard_size=2048)
+    index = await read_pack_index(backend, root)
+    assert index is not None
+
+    dst = tmp_path / "dst"
+    await unpack_download(backend, root, index, dst)
+    assert _paths(dst) == _paths(src)
+    for path in _paths(src):
+        assert (dst / path).read_bytes() == (src / path).read_bytes()
+
+
+async def test_blobs(root: URL) -> None:
+    backend = LocalBackend()
+    assert await backend.read_blob(root / "blob") is None
+    await backend.write_blob(root / "blob", b"data")
+    assert await backend.read_blob(root / "blob") == b"data"
+    async with backend.read_stream(root / "blob", 2) as chunks:
+        assert b"".join([chunk async for chunk in chunks]) == b"ta"
+
+
+async def test_not_local() -> None:
+    with pytest.raises(ValueError, match="file://"):
+        await LocalBackend().exists(URL("blob://cluster/org/project/bucket"))
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+
+from wabucketref.hashing import file_sha256
+from wabucketref.manifest import Manifest, local_files
+
+
+def test_build_and_diff(tmp_path: Path) -> None:
+    (tmp_path / "same.txt").write_text("same")
+    (tmp_path / "changed.txt").write_text("old")
+    (tmp_path / "removed.txt").write_text("removed")
+    old = Manifest.build(tmp_path)
+    assert old.files["same.txt"].sha256 == file_sha256(tmp_path / "same.txt")
+
+    (tmp_path / "changed.txt").write_text("new")
+    (tmp_path / "removed.txt").unlink()
+    (tmp_path / "dir").mkdir()
+    (tmp_path / "dir" / "added.txt").write_text("added")
+    new = Manifest.build(tmp_path)
+
+    changed, removed = new.diff(old)
+    assert sorted(changed) == ["changed.txt", "dir/added.txt"]
+    assert removed == ["removed.txt"]
+
+
+def test_hash_is_reused_for_unmodified_files(tmp_path: Path) -> None:
+    file = tmp_path / "data.txt"
+    file.write_text("data")
+    old = Manifest.build(tmp_path)
+    # same size and mtime, but different contents -> the old hash is trusted
+    file.write_text("DATA")
+    stat = file.stat()
+    os.utime(file, ns=(stat.st_atime_ns, int(old.files["data.txt"].mtime * 1e9)))
+    if file.stat().st_mtime != old.files["data.txt"].mtime:
+        pytest.skip("File system does not preserve mtime precisely")
+
+    assert Manifest.build(tmp_path, previous=old).files == old.files
+    assert Manifest.build(tmp_path).files != old.files
+
+
+def test_serialization(tmp_path: Path) -> None:
+    (tmp_path / "data.txt").write_text("data")
+    manifest = Manifest.build(tmp_path)
+    assert Manifest.loads(manifest.dumps()) == manifest
+    with pytest.raises(ValueError, match="Unsupported manifest version"):
+        Manifest.loads(b'{"version": 0, "files": []}')
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"[]",
+        b'{"version": 1}',
+        b'{"version": 1, "files": {}}',
+        b'{"version": 1, "files": [], "codec": 1}',
+        b'{"version": 1, "files": ["data.txt"]}',
+        b'{"version": 1, "files": [{"path": "data.txt"}]}',
+        b'{"version": 1, "files": [{"path": "data.txt", "size": "1", '
+        b'"mtime": 0, "sha256": ""}]}',
+        b"not json",
+    ],
+)
+def test_malformed(data: bytes) -> None:
+    with pytest.raises(ValueError):
+        Manifest.loads(data)
+
+
+def test_verify(tmp_path: Path) -> None:
+    src = tmp_path / "src"
+    (src / "dir").mkdir(parents=True)
+    (src / "ok.txt").write_text("ok")
+    (src / "corrupted.txt").write_text("good")
+    (src / "dir" / "missing.txt").write_text("missing")
+    manifest = Manifest.build(src)
+    assert local_files(src) == ["corrupted.txt", "dir/missing.txt", "ok.txt"]
+    assert manifest.verify(src) == []
+
+    (src / "corrupted.txt").write_text("evil")
+    (src / "dir" / "missing.txt").unlink()
+    (src / "extra.txt").write_text("extra")
+
+    assert manifest.verify(src) == ["corrupted.txt", "dir/missing.txt"]
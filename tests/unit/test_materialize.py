@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+
+from wabucketref.materialize import COPY, HARDLINK, REFLINK, Materializer
+
+
+@pytest.fixture
+def src(tmp_path: Path) -> Path:
+    src = tmp_path / "src"
+    (src / "dir").mkdir(parents=True)
+    (src / "a.bin").write_bytes(b"a" * 100)
+    (src / "dir" / "b.bin").write_bytes(b"b" * 100)
+    return src
+
+
+def test_materialize_tree(src: Path, tmp_path: Path) -> None:
+    dst = tmp_path / "dst"
+    (dst / "dir").mkdir(parents=True)
+    (dst / "dir" / "b.bin").write_bytes(b"stale")
+    materializer = Materializer()
+
+    materializer.materialize_tree(src, dst)
+
+    assert (dst / "a.bin").read_bytes() == b"a" * 100
+    assert (dst / "dir" / "b.bin").read_bytes() == b"b" * 100
+    assert sum(materializer.stats.values()) == 2
+    if materializer.stats[HARDLINK]:
+        assert os.path.samefile(src / "a.bin", dst / "a.bin")
+        assert not os.access(dst / "a.bin", os.W_OK) or os.geteuid() == 0
+    elif materializer.stats[REFLINK]:
+        assert not os.path.samefile(src / "a.bin", dst / "a.bin")
+
+
+def test_copy_fallback(src: Path, tmp_path: Path) -> None:
+    dst = tmp_path / "dst"
+    materializer = Materializer(hardlinks=False)
+
+    materializer.materialize_tree(src, dst, ["a.bin"])
+
+    assert (dst / "a.bin").read_bytes() == b"a" * 100
+    assert not (dst / "dir").exists()
+    assert set(materializer.stats) <= {REFLINK, COPY}
+    (dst / "a.bin").write_bytes(b"changed")
+    assert (src / "a.bin").read_bytes() == b"a" * 100
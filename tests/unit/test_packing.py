@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import io
+import tarfile
+from pathlib import Path
+
+import pytest
+from aiohttp import ServerTimeoutError
+
+from tests.unit.conftest import BUCKET, FakeClient
+from wabucketref.packing import (
+    PACK_INDEX_NAME,
+    pack_upload,
+    read_member,
+    read_pack_index,
+    unpack_download,
+)
+from wabucketref.transfer import TransferEngine
+
+
+ROOT = BUCKET.uri / "t/n/a"
+
+
+@pytest.fixture
+def src(tmp_path: Path) -> Path:
+    src = tmp_path / "src"
+    (src / "dir").mkdir(parents=True)
+    for i in range(10):
+        (src / "dir" / f"file-{i}.txt").write_bytes(bytes([i]) * (i * 300))
+    (src / ("long-name-" * 15 + ".bin")).write_bytes(b"long")
+    return src
+
+
+def _paths(src: Path) -> list[str]:
+    return [f.relative_to(src).as_posix() for f in src.rglob("*") if f.is_file()]
+
+
+async def test_pack_and_unpack(src: Path, tmp_path: Path, client: FakeClient) -> None:
+    engine = TransferEngine(client, jobs=3)  # type: ignore
+
+    stats = await pack_upload(engine, src, _paths(src), ROOT, shard_size=2048)
+
+    assert stats.files == 11
+    shards = sorted(k for k in client.buckets.blobs if k.endswith(".tar"))
+    assert len(shards) > 1
+    assert f"t/n/a/{PACK_INDEX_NAME}" in client.buckets.blobs
+    # shards are valid tar archives
+    with tarfile.open(fileobj=io.BytesIO(client.buckets.blobs[shards[0]])) as tar:
+        assert tar.getnames()
+
+    index = await read_pack_index(engine, ROOT)
+    assert index is not None
+    dst = tmp_path / "dst"
+    await unpack_download(engine, ROOT, index, dst)
+    for path in _paths(src):
+        assert (dst / path).read_bytes() == (src / path).read_bytes()
+
+
+async def test_failed_shard_is_retried(
+    src: Path, tmp_path: Path, client: FakeClient
+) -> None:
+    client.buckets.provider.put_failures = 2
+    engine = TransferEngine(client, jobs=1)  # type: ignore
+
+    await pack_upload(engine, src, _paths(src), ROOT, shard_size=2048, retries=3)
+
+    index = await read_pack_index(engine, ROOT)
+    assert index is not None
+    dst = tmp_path / "dst"
+    await unpack_download(engine, ROOT, index, dst)
+    for path in _paths(src):
+        assert (dst / path).read_bytes() == (src / path).read_bytes()
+
+
+async def test_read_member(src: Path, client: FakeClient) -> None:
+    engine = TransferEngine(client)  # type: ignore
+    await pack_upload(engine, src, _paths(src), ROOT, shard_size=2048)
+    index = await read_pack_index(engine, ROOT)
+    assert index is not None
+
+    data = await read_member(engine, ROOT, index, "dir/file-7.txt")
+    assert data == (src / "dir" / "file-7.txt").read_bytes()
+    with pytest.raises(FileNotFoundError):
+        await read_member(engine, ROOT, index, "dir/missing.txt")
+
+
+async def test_truncated_shard_is_retried(
+    src: Path, tmp_path: Path, client: FakeClient
+) -> None:
+    engine = TransferEngine(client)  # type: ignore
+    await pack_upload(engine, src, _paths(src), ROOT, shard_size=2048)
+    index = await read_pack_index(engine, ROOT)
+    assert index is not None
+    blobs = client.buckets.blobs
+    key = next(k for k in blobs if k.endswith(index.shards[0]))
+    blobs[key] = blobs[key][:100]
+
+    with pytest.raises(ServerTimeoutError, match="ended prematurely"):
+        await unpack_download(engine, ROOT, index, tmp_path / "dst", retries=2)
+    assert engine.retries == 1
+    member = index.shard_members(0)[-1].path
+    with pytest.raises(ServerTimeoutError, match="ended prematurely"):
+        await read_member(engine, ROOT, index, member, retries=2)
+    assert engine.retries == 2
+
+
+async def test_not_packed(client: FakeClient) -> None:
+    engine = TransferEngine(client)  # type: ignore
+    assert await read_pack_index(engine, ROOT) is None
+
+
+async def test_unpack_selected(src: Path, tmp_path: Path, client: FakeClient) -> None:
+    engine = TransferEngine(client, jobs=3)  # type: ignore
+    await pack_upload(engine, src, _paths(src), ROOT, shard_size=2048)
+    index = await read_pack_index(engine, ROOT)
+    assert index is not None
+    dst = tmp_path / "dst"
+
+    stats = await unpack_download(
+        engine, ROOT, index, dst, selected=lambda p: p.endswith(("-3.txt", "-8.txt"))
+    )
+
+    assert stats.files == 2
+    assert stats.bytes == 11 * 300
+    assert sorted(_paths(dst)) == ["dir/file-3.txt", "dir/file-8.txt"]
+    assert (dst / "dir/file-8.txt").read_bytes() == bytes([8]) * 2400
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from wabucketref.loop import LoopThread
+from wabucketref.prefetch import PrefetchHandle
+
+
+async def _download(
+    handle: PrefetchHandle, started: asyncio.Event, release: asyncio.Event
+) -> Path:
+    (handle.dst_folder / "config.json").write_text("{}")
+    handle._file_done("config.json")
+    started.set()
+    await release.wait()
+    (handle.dst_folder / "weights.bin").write_bytes(b"w")
+    handle._file_done("weights.bin")
+    return handle.dst_folder
+
+
+def test_wait_files_before_completion(tmp_path: Path) -> None:
+    loop = LoopThread()
+    handle = PrefetchHandle(tmp_path)
+    release = loop.run(_make_event())
+    started = loop.run(_make_event())
+    handle._attach(loop.submit(_download(handle, started, release)))
+    try:
+        assert handle.wait_file("config.json", timeout=5) == tmp_path / "config.json"
+        assert not handle.done()
+        with pytest.raises(TimeoutError):
+            handle.wait_file("weights.bin", timeout=0.05)
+
+        loop.submit(_set(release))
+        assert handle.wait_file("weights.bin", timeout=5).read_bytes() == b"w"
+        assert handle.result(timeout=5) == tmp_path
+        assert handle.wait(timeout=0)
+        with pytest.raises(FileNotFoundError):
+            handle.wait_file("missing.txt")
+    finally:
+        loop.stop()
+
+
+def test_download_error_is_raised(tmp_path: Path) -> None:
+    async def _fail() -> Path:
+        raise RuntimeError("boom")
+
+    loop = LoopThread()
+    handle = PrefetchHandle(tmp_path)
+    handle._attach(loop.submit(_fail()))
+    try:
+        assert handle.wait(timeout=5)
+        with pytest.raises(RuntimeError, match="boom"):
+            handle.wait_file("config.json")
+        with pytest.raises(RuntimeError, match="boom"):
+            handle.result()
+    finally:
+        loop.stop()
+
+
+async def _make_event() -> asyncio.Event:
+    return asyncio.Event()
+
+
+async def _set(event: asyncio.Event) -> None:
+    event.set()
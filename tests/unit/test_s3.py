@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Iterator
+
+import pytest
+from apolo_sdk import Bucket, BucketCredentials
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+from tests.unit.conftest import BUCKET
+from wabucketref.compression import get_codec
+from wabucketref.packing import pack_upload, read_pack_index, unpack_download
+from wabucketref.s3 import MIN_PART_SIZE, S3Backend, S3Connection
+
+
+moto_server = pytest.importorskip("moto.server")
+
+NATIVE_BUCKET = "native-bucket"
+ROOT = BUCKET.uri / "t/n/a"
+
+
+@pytest.fixture(scope="module")
+def endpoint() -> Iterator[str]:
+    server = moto_server.ThreadedMotoServer(port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f"http://{host}:{port}"
+    server.stop()
+
+
+@pytest.fixture
+async def conn(endpoint: str) -> AsyncIterator[S3Connection]:
+    credentials = BucketCredentials(
+        bucket_id=BUCKET.id,
+        provider=Bucket.Provider.AWS,
+        credentials={
+            "bucket_name": NATIVE_BUCKET,
+            "access_key_id": "key",
+            "secret_access_key": "secret",
+            "endpoint_url": endpoint,
+            "region_name": "us-east-1",
+        },
+    )
+
+    async def request_tmp_credentials(*args: str) -> BucketCredentials:
+        return credentials
+
+    client = SimpleNamespace(
+        buckets=SimpleNamespace(request_tmp_credentials=request_tmp_credentials)
+    )
+    async with S3Connection.open(client, BUCKET) as conn:  # type: ignore
+        await conn.s3.create_bucket(Bucket=NATIVE_BUCKET)
+        yield conn
+        paginator = conn.s3.get_paginator("list_objects_v2")
+        async for page in paginator.paginate(Bucket=NATIVE_BUCKET):
+            for obj in page.get("Contents", []):
+                await conn.s3.delete_object(Bucket=NATIVE_BUCKET, Key=obj["Key"])
+        await conn.s3.delete_bucket(Bucket=NATIVE_BUCKET)
+
+
+@pytest.fixture
+def src(tmp_path: Path) -> Path:
+    src = tmp_path / "src"
+    (src / "dir").mkdir(parents=True)
+    for i in range(5):
+        (src / "dir" / f"file-{i}.txt").write_bytes(bytes([i]) * (i * 300))
+    # multipart upload and ranged download
+    (src / "big.bin").write_bytes(os.urandom(2 * MIN_PART_SIZE + 123))
+    return src
+
+
+def _paths(src: Path) -> list[str]:
+    return sorted(f.relative_to(src).as_posix() for f in src.rglob("*") if f.is_file())
+
+
+async def test_upload_and_download(
+    src: Path, tmp_path: Path, conn: S3Connection
+) -> None:
+    backend = S3Backend(conn, jobs=4, part_size=MIN_PART_SIZE)
+    assert not await backend.exists(ROOT)
+
+    stats = await backend.upload_files(src, ROOT, _paths(src))
+
+    assert stats.files == 6
+    assert await backend.exists(ROOT)
+    listed = await backend.list_files(ROOT)
+    assert [f.path for f in listed] == _paths(src)
+    head = await conn.s3.head_object(Bucket=NATIVE_BUCKET, Key="t/n/a/big.bin")
+    assert "-3" in head["ETag"]  # uploaded in 3 parts
+
+    dst = tmp_path / "dst"
+    done: list[str] = []
+    await backend.download_dir(ROOT, dst, on_file_done=done.append)
+    assert sorted(done) == _paths(src)
+    for path in _paths(src):
+        assert (dst / path).read_bytes() == (src / path).read_bytes()
+
+    await backend.delete_files(ROOT, ["big.bin"])
+    assert "big.bin" not in [f.path for f in await backend.list_files(ROOT)]
+    await backend.delete_dir(ROOT)
+    assert not await backend.exists(ROOT)
+
+
+async def test_compressed(src: Path, tmp_path: Path, conn: S3Connection) -> None:
+    backend = S3Backend(conn, part_size=MIN_PART_SIZE)
+    codec = get_codec("gzip")
+    await backend.upload_files(src, ROOT, _paths(src), codec)
+    assert all(f.path.endswith(".gz") for f in await backend.list_files(ROOT))
+
+    dst = tmp_path / "dst"
+    await backend.download_dir(ROOT, dst, codec=codec)
+    assert _paths(dst) == _paths(src)
+    for path in _paths(src):
+        assert (dst / path).read_bytes() == (src / path).read_bytes()
+
+
+async def test_packed(src: Path, tmp_path: Path, conn: S3Connection) -> None:
+    backend = S3Backend(conn, jobs=2)
+    await pack_upload(backend, src, _paths(src), ROOT, shard_size=2048)
+    index = await read_pack_index(backend, ROOT)
+    assert index is not None
+
+    dst = tmp_path / "dst"
+    await unpack_download(backend, ROOT, index, dst)
+    for path in _paths(src):
+        assert (dst / path).read_bytes() == (src / path).read_bytes()
+
+
+async def test_blobs(conn: S3Connection) -> None:
+    backend = S3Backend(conn)
+    assert await backend.read_blob(ROOT / "blob") is None
+    await backend.write_blob(ROOT / "blob", b"data")
+    assert await backend.read_blob(ROOT / "blob") == b"data"
+    async with backend.read_stream(ROOT / "blob", 2) as chunks:
+        assert b"".join([chunk async for chunk in chunks]) == b"ta"
+
+
+def test_small_part_size(conn: S3Connection) -> None:
+    with pytest.raises(ValueError, match="Part size"):
+        S3Backend(conn, part_size=1024)
+
+
+async def test_failed_upload_is_retried(
+    src: Path, conn: S3Connection, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    backend = S3Backend(conn)
+    put_object = conn.s3.put_object
+    errors = [
+        EndpointConnectionError(endpoint_url="http://s3"),
+        ClientError({"Error": {"Code": "AccessDenied"}}, "PutObject"),
+    ]
+
+    async def _put_object(**kwargs: Any) -> Any:
+        if errors:
+            raise errors.pop(0)
+        return await put_object(**kwargs)
+
+    monkeypatch.setattr(conn.s3, "put_object", _put_object)
+
+    with pytest.raises(ClientError, match="AccessDenied"):
+        await backend.upload_files(src, ROOT, ["dir/file-1.txt"])
+    # the connection error is retried, the denied access is not
+    assert backend.retries == 1
+    await backend.upload_files(src, ROOT, ["dir/file-1.txt"])
+    assert await backend.read_blob(ROOT / "dir/file-1.txt") == bytes([1]) * 300
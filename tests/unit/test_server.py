@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import json
+import os
+import socket
+import stat
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Iterator
+
+import pytest
+
+from wabucketref.server import AgentServer, ApiPool, _is_listening, _peer_uid, delegate
+
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+class FakeApi:
+    """Reports the calls to stdout, which is streamed to the caller."""
+
+    created = 0
+
+    def __init__(self, **params: Any) -> None:
+        FakeApi.created += 1
+        self.params = params
+
+    def _report(self, method: str, **kwargs: Any) -> None:
+        event = {
+            "method": method,
+            "params": self.params,
+            "kwargs": kwargs,
+            "created": FakeApi.created,
+            "job_id": os.environ.get("NEURO_JOB_ID"),
+        }
+        print(json.dumps(event, default=str))
+
+    def wandb_start_run(self, **kwargs: Any) -> None:
+        self._report("wandb_start_run")
+
+    def download_artifact(self, dst_folder: Path, **kwargs: Any) -> None:
+        self._report("download_artifact", dst_folder=dst_folder.resolve())
+
+    def link(self, bucket_path: str, **kwargs: Any) -> None:
+        if bucket_path == "missing":
+            raise ValueError(f"{bucket_path} does not exist or not a directory.")
+        self._report("link", bucket_path=bucket_path)
+
+    def finish_run(self) -> None:
+        self._report("finish_run")
+
+    def close(self) -> None:
+        pass
+
+
+def run_agent(socket_path: str) -> None:
+    server = AgentServer(Path(socket_path), ApiPool(FakeApi))  # type: ignore
+    server.serve_until_idle(idle_timeout=60)
+
+
+@pytest.fixture
+def agent(tmp_path: Path) -> Iterator[Path]:
+    # the agent redirects the process stdout, so it runs in its own process
+    socket_path = tmp_path / "agent.sock"
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "from tests.unit.test_server import run_agent; "
+            f"run_agent({str(socket_path)!r})",
+        ],
+        cwd=REPO_ROOT,
+    )
+    deadline = time.monotonic() + 30
+    # the socket file is created before the agent starts listening on it
+    while not _is_listening(socket_path):
+        assert proc.poll() is None, "Agent failed to start"
+        assert time.monotonic() < deadline, "Agent did not start in time"
+        time.sleep(0.05)
+    yield socket_path
+    proc.terminate()
+    proc.wait()
+
+
+def _events(out: str) -> list[dict[str, Any]]:
+    return [json.loads(line) for line in out.splitlines() if line.startswith("{")]
+
+
+def test_delegate(
+    agent: Path,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("NEURO_JOB_ID", "job-1")
+
+    link = ["--bucket", "b", "link", "t/n/a", "-n", "n", "-t", "t"]
+    download = ["--bucket", "b", "download", "t", "n", "a", "--no-run"]
+    other_link = ["--bucket", "other", "link", "p", "-n", "n", "-t", "t"]
+    for args in (link, download, other_link):
+        assert delegate(args, agent) == 0
+
+    events = _events(capsys.readouterr().out)
+    assert [e["method"] for e in events] == [
+        "link",
+        "finish_run",
+        "download_artifact",
+        "finish_run",
+        "link",
+        "finish_run",
+        "finish_run",  # every API of the agent
+    ]
+    assert events[0]["params"]["bucket"] == "b"
+    assert events[0]["kwargs"] == {"bucket_path": "t/n/a"}
+    assert events[0]["job_id"] == "job-1"  # caller environment
+    # relative paths are resolved in the caller directory
+    assert events[2]["kwargs"]["dst_folder"] == str(tmp_path / "t" / "n" / "a")
+    # the API is reused by the commands with the same arguments
+    assert [e["created"] for e in events] == [1, 1, 1, 1, 2, 2, 2]
+    assert events[4]["params"]["bucket"] == "other"
+
+
+def test_delegate_errors(agent: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    assert delegate(["link", "missing", "-n", "n", "-t", "t"], agent) == 1
+    err = capsys.readouterr().err
+    assert "ValueError: missing does not exist" in err
+
+    assert delegate(["link", "path"], agent) == 2
+    assert "Missing option" in capsys.readouterr().err
+
+
+def test_shard_is_not_delegated(
+    agent: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    # the ranks would wait for each other's shards behind one another
+    download = ["download", "t", "n", "a", "--no-run", "--shard"]
+    assert delegate(download, agent) is None
+    assert delegate(["download-many", "m.yaml", "--shard"], agent) is None
+    assert _events(capsys.readouterr().out) == []
+
+
+def test_no_agent(tmp_path: Path) -> None:
+    assert delegate(["link", "path"], tmp_path / "missing.sock") is None
+    stale = tmp_path / "stale.sock"
+    stale.touch()
+    assert delegate(["link", "path"], stale) is None
+
+
+def test_other_version(agent: Path) -> None:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(str(agent))
+        request = {"version": "0.0.0", "args": [], "cwd": "/", "env": {}}
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        response = json.loads(sock.makefile().readline())
+    assert response["exit_code"] is None
+    assert "0.0.0" in response["error"]
+
+
+def test_socket_is_private(tmp_path: Path) -> None:
+    socket_path = tmp_path / "agent.sock"
+    umask = os.umask(0o022)
+    try:
+        server = AgentServer(socket_path, ApiPool(FakeApi))  # type: ignore
+        server.server_close()
+        assert not stat.S_IMODE(socket_path.stat().st_mode) & 0o077
+        assert os.umask(0o022) == 0o022  # restored
+    finally:
+        os.umask(umask)
+
+
+@pytest.mark.skipif(not hasattr(socket, "SO_PEERCRED"), reason="No SO_PEERCRED")
+def test_peer_uid() -> None:
+    left, right = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+    with left, right:
+        assert _peer_uid(left) == os.getuid()
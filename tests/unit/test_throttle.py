@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+from aiohttp import ServerTimeoutError
+
+from wabucketref.const import AUTO_JOBS
+from wabucketref.throttle import AdaptiveConcurrency, TokenBucket
+from wabucketref.transfer import JobRunner
+
+
+async def test_token_bucket() -> None:
+    bucket = TokenBucket(rate=1000, capacity=100)
+    started = time.monotonic()
+    await bucket.consume(100)  # burst
+    assert time.monotonic() - started < 0.05
+    await bucket.consume(200)
+    assert time.monotonic() - started >= 0.18
+
+
+def test_wrong_bandwidth() -> None:
+    with pytest.raises(ValueError, match="positive"):
+        TokenBucket(0)
+
+
+async def test_adaptive_increase_and_backoff() -> None:
+    adaptive = AdaptiveConcurrency(max_limit=6, initial=2, window=0)
+    for transferred in (100, 200, 400, 800, 1600, 3200):
+        await adaptive.acquire()
+        await asyncio.sleep(0.01)
+        await adaptive.release(transferred)
+    assert adaptive.limit == 6  # capped
+
+    adaptive.backoff()
+    assert adaptive.limit == 3
+    for _ in range(3):
+        adaptive.backoff()
+    assert adaptive.limit == 1
+
+
+async def test_adaptive_runner_limits_concurrency() -> None:
+    runner = JobRunner(AUTO_JOBS)
+    assert runner._adaptive is not None
+    runner._adaptive.limit = 2
+    active = 0
+    peak = 0
+
+    async def _job() -> int:
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return 1
+
+    stats = await runner.run([_job] * 10)
+
+    assert stats.files == 10
+    assert peak <= 2
+
+
+async def test_retry_backs_off(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("wabucketref.transfer.random.uniform", lambda a, b: 0)
+    runner = JobRunner(AUTO_JOBS)
+    assert runner._adaptive is not None
+    runner._adaptive.limit = 8
+    failures = 1
+
+    async def _flaky() -> int:
+        nonlocal failures
+        if failures:
+            failures -= 1
+            raise ServerTimeoutError("Injected failure")
+        return 1
+
+    assert await runner.retry(_flaky, retries=2) == 1
+    assert runner._adaptive.limit == 4
+    assert runner.retries == 1
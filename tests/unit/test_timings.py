@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from wabucketref.timings import Timings
+from wabucketref.transfer import TransferStats
+
+
+def _events(path: Path) -> list[dict]:  # type: ignore
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_phases_are_emitted(tmp_path: Path) -> None:
+    sink = tmp_path / "timings.jsonl"
+    timings = Timings(sink)
+
+    with timings.operation("upload_artifact", artifact="model"):
+        with timings.phase("wandb_init"):
+            pass
+        with timings.phase("upload") as phase:
+            phase.add(TransferStats(files=2, bytes=100, retries=1))
+        with timings.phase("upload") as phase:
+            phase.add(TransferStats(files=1, bytes=10))
+
+    phases = _events(sink)[:-1]
+    assert [e["phase"] for e in phases] == ["wandb_init", "upload", "upload"]
+    assert {e["operation"] for e in phases} == {"upload_artifact"}
+    assert phases[1]["bytes"] == 100 and phases[1]["retries"] == 1
+    assert "bytes" not in phases[0]
+
+    summary = _events(sink)[-1]
+    assert summary["event"] == "operation"
+    assert summary["status"] == "ok"
+    assert summary["artifact"] == "model"
+    assert summary["id"] == phases[0]["id"]
+    assert set(summary["phases"]) == {"wandb_init", "upload"}
+    assert summary["bytes"] == 110
+    assert summary["files"] == 3
+
+
+def test_failed_operation(tmp_path: Path) -> None:
+    sink = tmp_path / "timings.jsonl"
+    timings = Timings(sink)
+
+    with pytest.raises(RuntimeError):
+        with timings.operation("download_artifact"):
+            with timings.phase("resolve"):
+                raise RuntimeError("Not found")
+
+    phase, summary = _events(sink)
+    assert phase["phase"] == "resolve"
+    assert summary["status"] == "error"
+
+
+def test_phase_without_operation(tmp_path: Path) -> None:
+    sink = tmp_path / "timings.jsonl"
+    timings = Timings(sink)
+
+    with timings.phase("wandb_init", "link"):
+        pass
+
+    (event,) = _events(sink)
+    assert event["operation"] == "link"
+    assert "id" not in event
+
+
+def test_disabled(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("WABUCKET_TIMINGS", raising=False)
+    timings = Timings.from_env()
+    assert not timings.enabled
+    with timings.operation("link"):
+        with timings.phase("exists") as phase:
+            pass
+    assert phase.duration >= 0
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from typing import Any
+
+import pytest
+from aiohttp import ServerTimeoutError
+
+from tests.unit.conftest import BUCKET, FakeClient
+from wabucketref import transfer
+from wabucketref.manifest import FileRecord, Manifest
+from wabucketref.transfer import JOURNAL_NAME, TransferEngine, shared_jobs
+
+
+ROOT = BUCKET.uri / "t/n/a"
+
+
+async def test_upload_dir(tmp_path: Path, client: FakeClient) -> None:
+    (tmp_path / "a.txt").write_text("a")
+    (tmp_path / "dir").mkdir()
+    (tmp_path / "dir" / "b.txt").write_text("bb")
+    engine = TransferEngine(client, jobs=2)  # type: ignore
+
+    stats = await engine.upload_dir(tmp_path, ROOT)
+
+    assert stats.files == 2
+    assert stats.bytes == 3
+    assert client.buckets.blobs == {"t/n/a/a.txt": b"a", "t/n/a/dir/b.txt": b"bb"}
+
+
+async def test_upload_records_checksums(
+    tmp_path: Path, client: FakeClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # streamed and single PUT uploads
+    monkeypatch.setattr(transfer, "READ_CHUNK_SIZE", 16)
+    (tmp_path / "big.bin").write_bytes(bytes(range(100)))
+    (tmp_path / "small.txt").write_bytes(b"small")
+    (tmp_path / "empty").write_bytes(b"")
+    engine = TransferEngine(client, jobs=2)  # type: ignore
+    records: dict[str, FileRecord] = {}
+
+    await engine.upload_files(
+        tmp_path, ROOT, ["big.bin", "small.txt", "empty"], records=records
+    )
+
+    assert records == Manifest.build(tmp_path).files
+
+
+@pytest.mark.parametrize("range_size", [None, 5, 100])
+async def test_download_dir(
+    tmp_path: Path, client: FakeClient, range_size: int | None
+) -> None:
+    client.buckets.blobs = {
+        "t/n/a/big.bin": bytes(range(23)),
+        "t/n/a/dir/small.txt": b"small",
+        "t/n/a-sibling/other.txt": b"not ours",
+    }
+    engine = TransferEngine(client, jobs=3)  # type: ignore
+
+    stats = await engine.download_dir(ROOT, tmp_path, range_size=range_size)
+
+    assert stats.files == 2
+    assert stats.bytes == 28
+    assert (tmp_path / "big.bin").read_bytes() == bytes(range(23))
+    assert (tmp_path / "dir" / "small.txt").read_bytes() == b"small"
+    assert not (tmp_path / "other.txt").exists()
+
+
+async def test_failed_download_is_retried(tmp_path: Path, client: FakeClient) -> None:
+    client.buckets.blobs = {"t/n/a/big.bin": bytes(range(40))}
+    client.buckets.provider.fetch_failures = 2
+    engine = TransferEngine(client, jobs=2)  # type: ignore
+
+    await engine.download_dir(ROOT, tmp_path, retries=3)
+
+    assert (tmp_path / "big.bin").read_bytes() == bytes(range(40))
+
+
+async def test_platform_download_is_not_split(
+    tmp_path: Path, client: FakeClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    client.buckets.blobs = {"t/n/a/big.bin": bytes(range(40))}
+    provider = client.buckets.provider
+    fetch_blob = provider.fetch_blob
+    offsets: list[int] = []
+
+    def _fetch_blob(key: str, offset: int = 0) -> Any:
+        offsets.append(offset)
+        return fetch_blob(key, offset)
+
+    monkeypatch.setattr(provider, "fetch_blob", _fetch_blob)
+    engine = TransferEngine(client, jobs=2)  # type: ignore
+
+    await engine.download_dir(ROOT, tmp_path, range_size=10)
+
+    # the SDK could not stop the fetch at the end of a range
+    assert offsets == [0]
+    assert (tmp_path / "big.bin").read_bytes() == bytes(range(40))
+
+
+async def test_run_is_bounded(client: FakeClient) -> None:
+    running = 0
+    max_running = 0
+
+    async def _job() -> int:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return 1
+
+    engine = TransferEngine(client, jobs=3)  # type: ignore
+    stats = await engine.run(_job for _ in range(10))
+    assert stats.files == 10
+    assert max_running == 3
+
+
+async def test_shared_jobs_bound_all_runs(client: FakeClient) -> None:
+    running = 0
+    max_running = 0
+
+    async def _job() -> int:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return 1
+
+    engines = [TransferEngine(client, jobs=3) for _ in range(3)]  # type: ignore
+    with shared_jobs(4):
+        results = await asyncio.gather(
+            *(engine.run(_job for _ in range(10)) for engine in engines)
+        )
+    assert [stats.files for stats in results] == [10, 10, 10]
+    assert max_running == 4
+
+
+async def test_run_propagates_errors(client: FakeClient) -> None:
+    async def _fail() -> int:
+        raise RuntimeError("boom")
+
+    engine = TransferEngine(client, jobs=3)  # type: ignore
+    with pytest.raises(RuntimeError, match="boom"):
+        await engine.run([_fail] * 5)
+
+
+async def test_delete_and_small_blobs(client: FakeClient) -> None:
+    client.buckets.blobs = {"t/n/a/x.txt": b"x", "t/n/a/y.txt": b"y"}
+    engine = TransferEngine(client)  # type: ignore
+
+    await engine.delete_files(ROOT, ["x.txt", "missing.txt"])
+    assert list(client.buckets.blobs) == ["t/n/a/y.txt"]
+
+    assert await engine.read_blob(BUCKET.uri / "t/n/a.json") is None
+    await engine.write_blob(BUCKET.uri / "t/n/a.json", b"{}")
+    assert await engine.read_blob(BUCKET.uri / "t/n/a.json") == b"{}"
+
+
+async def test_interrupted_download_is_resumed(
+    tmp_path: Path, client: FakeClient
+) -> None:
+    client.buckets.blobs = {
+        "t/n/a/1.txt": b"first",
+        "t/n/a/2.txt": b"second",
+        "t/n/a/empty.txt": b"",
+    }
+    # the first file completes, the second one fails and is not retried
+    engine = TransferEngine(client, jobs=1)  # type: ignore
+    original = engine._download_range
+    calls: list[str] = []
+    failures = 1
+
+    async def _flaky(read, info, dst, offset, length):  # type: ignore
+        nonlocal failures
+        calls.append(info.path)
+        if info.path == "2.txt" and failures:
+            failures -= 1
+            raise ServerTimeoutError("Injected failure")
+        return await original(read, info, dst, offset, length)
+
+    engine._download_range = _flaky  # type: ignore
+    with pytest.raises(ServerTimeoutError):
+        await engine.download_dir(ROOT, tmp_path, retries=1)
+    assert (tmp_path / JOURNAL_NAME).exists()
+
+    calls.clear()
+    stats = await engine.download_dir(ROOT, tmp_path, retries=1)
+
+    assert calls == ["2.txt"]
+    assert stats.files == 1
+    assert (tmp_path / "1.txt").read_bytes() == b"first"
+    assert (tmp_path / "2.txt").read_bytes() == b"second"
+    assert (tmp_path / "empty.txt").read_bytes() == b""
+    assert not (tmp_path / JOURNAL_NAME).exists()
+
+
+async def test_download_reports_complete_files(
+    tmp_path: Path, client: FakeClient
+) -> None:
+    client.buckets.blobs = {
+        "t/n/a/big.bin": bytes(range(23)),
+        "t/n/a/dir/small.txt": b"small",
+    }
+    engine = TransferEngine(client, jobs=3)  # type: ignore
+    done: list[str] = []
+
+    await engine.download_dir(ROOT, tmp_path, range_size=5, on_file_done=done.append)
+
+    assert sorted(done) == ["big.bin", "dir/small.txt"]
+
+
+async def test_download_selected(tmp_path: Path, client: FakeClient) -> None:
+    client.buckets.blobs = {
+        "t/n/a/config.json": b"{}",
+        "t/n/a/shards/0.bin": b"0",
+        "t/n/a/shards/1.bin": b"1",
+    }
+    engine = TransferEngine(client)  # type: ignore
+
+    stats = await engine.download_dir(
+        ROOT, tmp_path, selected=lambda p: p in ("config.json", "shards/1.bin")
+    )
+
+    assert stats.files == 2
+    assert sorted(p.name for p in tmp_path.rglob("*") if p.is_file()) == [
+        "1.bin",
+        "config.json",
+    ]
@@ -0,0 +1,47 @@
+import pytest
+
+from wabucketref.utils import parse_meta, parse_size, path_matches
+
+
+def test_parse_meta() -> None:
+    assert parse_meta(["a=1", "b=c=d"]) == {"a": "1", "b": "c=d"}
+    with pytest.raises(ValueError):
+        parse_meta(["a"])
+
+
+@pytest.mark.parametrize(
+    "size,expected",
+    [
+        ("100", 100),
+        ("100B", 100),
+        ("2K", 2048),
+        ("512M", 512 * 1024**2),
+        ("1.5G", int(1.5 * 1024**3)),
+        ("50GB", 50 * 1024**3),
+        ("1TiB", 1024**4),
+    ],
+)
+def test_parse_size(size: str, expected: int) -> None:
+    assert parse_size(size) == expected
+
+
+def test_parse_size_wrong() -> None:
+    with pytest.raises(ValueError, match="Wrong size value"):
+        parse_size("lots")
+
+
+@pytest.mark.parametrize(
+    "path,include,exclude,expected",
+    [
+        ("config.json", (), (), True),
+        ("dir/config.json", ("*.json",), (), True),
+        ("shard-001.bin", ("config.json", "shard-000.*"), (), False),
+        ("shard-000.bin", ("config.json", "shard-000.*"), (), True),
+        ("dir/data.bin", (), ("dir/*",), False),
+        ("data.bin", ("*.bin",), ("data.*",), False),
+    ],
+)
+def test_path_matches(
+    path: str, include: tuple[str, ...], exclude: tuple[str, ...], expected: bool
+) -> None:
+    assert path_matches(path, include, exclude) is expected
@@ -1,7 +1,33 @@
-__version__ = "24.9.0"
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
 
-from .api import WaBucketRefAPI
+from .bulk import DownloadSpec, UploadSpec
+from .prefetch import PrefetchHandle
 from .utils import parse_meta
 
 
-__all__ = ("WaBucketRefAPI", "parse_meta")
+if TYPE_CHECKING:
+    from .api import AsyncWaBucketRefAPI, WaBucketRefAPI
+
+
+__version__ = "24.9.0"
+
+__all__ = (
+    "AsyncWaBucketRefAPI",
+    "DownloadSpec",
+    "PrefetchHandle",
+    "UploadSpec",
+    "WaBucketRefAPI",
+    "parse_meta",
+)
+
+
+def __getattr__(name: str) -> Any:
+    # the API module imports W&B and Apolo SDKs, which are slow to load,
+    # so it is imported on the first access only
+    if name in ("AsyncWaBucketRefAPI", "WaBucketRefAPI"):
+        from . import api
+
+        return getattr(api, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+ALIAS_CACHE_DIR_ENV = "WABUCKET_ALIAS_CACHE_DIR"
+ALIAS_TTL_ENV = "WABUCKET_ALIAS_TTL"
+DEFAULT_ALIAS_TTL = 60.0  # seconds
+
+# entity, project, artifact type, name and alias
+ArtifactKey = Tuple[Optional[str], Optional[str], str, str, str]
+
+# W&B version numbers
+_VERSION_ALIAS = re.compile(r"v\d+")
+
+
+def is_immutable_alias(alias: str, digest: str | None = None) -> bool:
+    """Whether the alias always points to the same artifact version:
+    W&B version numbers and `!content-hash` aliases, equal to the `digest`
+    of the artifact files. The other aliases, e.g. `!run-config-hash` ones,
+    could be re-logged by the overwriting upload.
+    """
+    return _VERSION_ALIAS.fullmatch(alias) is not None or alias == digest
+
+
+class AliasCache:
+    """Persistent mapping of the artifact aliases to the resolved blob references.
+
+    Saves W&B API round-trips on the repeated downloads. Immutable aliases
+    (see `is_immutable_alias()`) never expire, the mutable ones, like `latest`,
+    are trusted for `ttl` seconds only; `ttl=0` disables caching them.
+    """
+
+    def __init__(self, root: Path, ttl: float = DEFAULT_ALIAS_TTL):
+        self.root = root.expanduser()
+        self.ttl = ttl
+
+    @classmethod
+    def from_env(cls, ttl: float | None = None) -> AliasCache:
+        root = os.environ.get(ALIAS_CACHE_DIR_ENV)
+        if root is None:
+            cache_home = os.environ.get("XDG_CACHE_HOME", "~/.cache")
+            root = os.path.join(cache_home, "wabucket", "aliases")
+        if ttl is None:
+            ttl = float(os.environ.get(ALIAS_TTL_ENV, DEFAULT_ALIAS_TTL))
+        return cls(Path(root), ttl)
+
+    def _path(self, key: ArtifactKey) -> Path:
+        digest = hashlib.sha256(json.dumps(list(key)).encode("utf-8")).hexdigest()
+        return self.root / f"{digest}.json"
+
+    def get(self, key: ArtifactKey) -> dict[str, Any] | None:
+        alias = key[4]
+        try:
+            with self._path(key).open() as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        value = entry["value"]
+        assert isinstance(value, dict)
+        if (
+            not is_immutable_alias(alias, value.get("digest"))
+            and time.time() - entry["time"] > self.ttl
+        ):
+            return None
+        return value
+
+    def put(self, key: ArtifactKey, value: dict[str, Any]) -> None:
+        alias = key[4]
+        if not is_immutable_alias(alias, value.get("digest")) and self.ttl <= 0:
+            return
+        path = self._path(key)
+        tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}")
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(json.dumps({"time": time.time(), "value": value}))
+            os.replace(tmp, path)
+        except OSError as e:
+            # the cache is an optimization only
+            logger.warning(f"Failed to cache resolved alias {alias}: {e}")
+
+    def drop(self, key: ArtifactKey) -> None:
+        """Forget the alias, e.g. once it is logged again by this process."""
+        try:
+            self._path(key).unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Failed to drop cached alias {key[4]}: {e}")
@@ -1,52 +1,179 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
 import hashlib
+import json
 import logging
 import os
+import subprocess
 import sys
 import tempfile
-import time
 import uuid
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+from functools import partial
 from pathlib import Path, PurePosixPath
-from typing import Any, Dict, Union
+from typing import Any, Callable, Coroutine, Dict, Sequence, TypeVar, Union
 
 import wandb
-from aiohttp import ClientError, ServerTimeoutError
-from apolo_cli.asyncio_utils import Runner
 from apolo_sdk import Bucket, Client, Factory
 from wandb.wandb_run import Run
 from yarl import URL
 
+from .aliases import AliasCache, ArtifactKey
+from .backends import StorageBackend
+from .bulk import DownloadSpec, UploadSpec
+from .cache import DEFAULT_CACHE_SIZE, ArtifactCache
+from .compression import CODEC_METADATA_KEY, Codec, decompress, get_codec
+from .const import DEFAULT_JOBS, DEFAULT_RETRIES
+from .coordination import Shard, SharedDownload, check_shard, shard_of
+from .journal import DEFER_LOGGING_ENV, JOURNAL_DIR_ENV, ArtifactRecord, Journal, RunKey
+from .local import LocalBackend
+from .loop import LoopThread
+from .manifest import (
+    DIGEST_METADATA_KEY,
+    FileRecord,
+    Manifest,
+    local_files,
+    manifest_uri,
+)
+from .packing import (
+    DEFAULT_SHARD_SIZE,
+    pack_upload,
+    read_member,
+    read_pack_index,
+    unpack_download,
+)
+from .prefetch import PrefetchHandle
+from .s3 import DIRECT_S3_ENV, S3Backend, S3Connection
+from .throttle import TokenBucket
+from .timings import Timings
+from .transfer import (
+    JOURNAL_NAME,
+    BlobEngine,
+    TransferEngine,
+    TransferStats,
+    blob_path,
+    shared_jobs,
+)
+from .utils import path_matches
+
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 RunArgsType = Union[argparse.Namespace, Dict[str, Any], str]
 DEFAULT_REF_NAME = "platform_blob"
+CONTENT_HASH_ALIAS = "!content-hash"
+# of the runs started to log the journal records, see `WaBucketRefAPI.flush_journal()`
+FLUSH_JOB_TYPE = "wabucket-flush"
 
+_T = TypeVar("_T")
+
+
+@dataclass(frozen=True)
+class ArtifactRef:
+    """Bucket location of the artifact files and the codec they are stored with."""
+
+    uri: URL
+    codec: Codec | None = None
+    digest: str | None = None
+
+
+async def _in_thread(func: Callable[..., _T], *args: Any, **kwargs: Any) -> _T:
+    """Run blocking call (W&B API, disk-bound work) without blocking the loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, partial(func, *args, **kwargs))
+
+
+def _reference_artifact(
+    art_name: str, art_type: str, metadata: dict | None, uri: str  # type: ignore
+) -> wandb.Artifact:
+    artifact = wandb.Artifact(name=art_name, type=art_type, metadata=metadata)
+    artifact.add_reference(name=DEFAULT_REF_NAME, uri=uri, checksum=False)
+    return artifact
+
+
+class AsyncWaBucketRefAPI:
+    """Asyncio version of `WaBucketRefAPI`.
+
+    All the coroutines share a single apolo client, so several artifacts
+    could be transferred concurrently, e.g. with `asyncio.gather()`.
+    The W&B SDK is synchronous, its calls are run in the default executor.
+    """
 
-class WaBucketRefAPI:
     def __init__(
         self,
         bucket: str | None = None,
         project_name: str | None = None,
         entity: str | None = None,
+        cache_dir: Path | None = None,
+        cache_size: int | None = None,
+        alias_ttl: float | None = None,
+        direct_s3: bool | None = None,
+        timings: str | Path | None = None,
+        timings_to_wandb: bool | None = None,
+        max_bandwidth: int | None = None,
+        defer_logging: bool | None = None,
     ):
         self._wab_project_name = project_name or os.environ.get("WANDB_PROJECT")
 
-        self._runner = Runner()
-
         self._n_client: Client | None = None
+        self._init_lock: asyncio.Lock | None = None
+        # serializes W&B run start of the concurrent calls
+        self._run_lock: asyncio.Lock | None = None
 
         self._bucket_name = bucket or self._wab_project_name
         self._bucket: Bucket | None = None
+        # artifacts are kept in the local (or mounted) directory
+        self._local_root: URL | None = None
+        if self._bucket_name and self._bucket_name.startswith("file:"):
+            self._local_root = URL(self._bucket_name)
         self._entity = entity or os.environ.get("WANDB_ENTITY")
 
+        self._cache: ArtifactCache | None
+        if cache_dir is not None:
+            self._cache = ArtifactCache(cache_dir, cache_size or DEFAULT_CACHE_SIZE)
+        else:
+            self._cache = ArtifactCache.from_env()
+        self._aliases = AliasCache.from_env(alias_ttl)
+        self._lineage_tasks: set[asyncio.Future[wandb.Artifact]] = set()
+        self._wandb_api: wandb.Api | None = None
+
+        if direct_s3 is None:
+            direct_s3 = os.environ.get(DIRECT_S3_ENV, "").lower() in ("1", "true")
+        self._direct_s3 = direct_s3
+        self._s3: S3Connection | None = None
+        self._s3_lock: asyncio.Lock | None = None
+        self._exit_stack = AsyncExitStack()
+        # phase durations of the calls, see `timings.Timings`
+        self._timings = Timings.from_env(timings, timings_to_wandb)
+        # shared by all transfers of the bucket, bytes per second
+        self._bandwidth = TokenBucket(max_bandwidth) if max_bandwidth else None
+
+        if defer_logging is None:
+            defer_logging = os.environ.get(DEFER_LOGGING_ENV, "").lower() in (
+                "1",
+                "true",
+            )
+        # bucket references are logged to W&B after the call, see `_log_reference()`
+        self._journal = Journal.from_env() if defer_logging else None
+        self._log_tasks: set[asyncio.Future[None]] = set()
+        self._flush_pending = False
+
+    async def __aenter__(self) -> AsyncWaBucketRefAPI:
+        await self._apolo_init_if_needed()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
     async def _init_client(self) -> Client:
         if self._n_client is not None and not self._n_client._closed:
             return self._n_client
-        client = await Factory().get()
+        with self._timings.phase("apolo_client"):
+            client = await Factory().get()
         self._n_client = client
         return self._n_client
 
@@ -58,7 +185,8 @@ class WaBucketRefAPI:
     async def _init_bucket(self) -> Bucket:
         if not self._bucket:
             assert self._bucket_name, "Bucket name is not provided."
-            self._bucket = await self.client.buckets.get(self._bucket_name)
+            with self._timings.phase("bucket_get"):
+                self._bucket = await self.client.buckets.get(self._bucket_name)
         return self._bucket
 
     @property
@@ -66,19 +194,69 @@ class WaBucketRefAPI:
         assert self._bucket is not None
         return self._bucket
 
-    def close(self) -> None:
+    @property
+    def _root_uri(self) -> URL:
+        """URI the artifact bucket paths are relative to."""
+        if self._local_root is not None:
+            return self._local_root
+        return self.bucket.uri
+
+    async def _backend(self, uri: URL, jobs: int = DEFAULT_JOBS) -> StorageBackend:
+        """Storage backend of the blobs under `uri`."""
+        if uri.scheme == "file":
+            return LocalBackend(jobs=jobs)
+        client = await self._init_client()
+        s3 = await self._s3_connection(uri)
+        if s3 is not None:
+            return S3Backend(s3, jobs=jobs, bandwidth=self._bandwidth)
+        return TransferEngine(client, jobs=jobs, bandwidth=self._bandwidth)
+
+    async def _s3_connection(self, uri: URL) -> S3Connection | None:
+        """Connection to the object store of the bucket, shared by the transfers,
+        if the direct S3 transfers are enabled and the bucket supports them.
+        """
+        if not self._direct_s3 or self._local_root is not None:
+            return None
+        if self._s3_lock is None:
+            self._s3_lock = asyncio.Lock()
+        async with self._s3_lock:
+            if self._s3 is None:
+                bucket = await self._init_bucket()
+                try:
+                    self._s3 = await self._exit_stack.enter_async_context(
+                        S3Connection.open(self.client, bucket)
+                    )
+                except Exception as e:
+                    logger.warning(
+                        f"Direct S3 transfers are not available: {e}, "
+                        "falling back to the platform SDK."
+                    )
+                    self._direct_s3 = False
+                    return None
+        if not str(uri).startswith(str(self._s3.bucket.uri).rstrip("/") + "/"):
+            # the artifact was logged from the other bucket
+            return None
+        return self._s3
+
+    async def _wait_background(self) -> None:
+        """Wait for W&B calls left in the background by the API calls."""
+        if self._lineage_tasks:
+            logger.info("Waiting for the artifact usage to be recorded in W&B")
+            await asyncio.gather(*self._lineage_tasks, return_exceptions=True)
+        if self._log_tasks:
+            logger.info("Waiting for the deferred artifacts to be logged to W&B")
+            await asyncio.gather(*self._log_tasks, return_exceptions=True)
+        if self._flush_pending:
+            self._flush_pending = False
+            self._start_flush()
+
+    async def close(self) -> None:
+        await self._wait_background()
+        await self._exit_stack.aclose()
         if self._n_client is not None and not self._n_client.closed:
-            self._runner.run(self._n_client.close())
-        try:
-            # Suppress prints unhandled exceptions
-            # on event loop closing
-            sys.stderr = None
-            if self._runner._started:
-                self._runner.__exit__(*sys.exc_info())
-        finally:
-            sys.stderr = sys.__stderr__
+            await self._n_client.close()
 
-    def upload_artifact(
+    async def upload_artifact(
         self,
         src_folder: Path,
         art_name: str,
@@ -88,74 +266,342 @@ class WaBucketRefAPI:
         as_refference: bool = True,
         overwrite: bool = False,
         suffix: str | None = None,
+        jobs: int = DEFAULT_JOBS,
+        pack: bool = False,
+        shard_size: int = DEFAULT_SHARD_SIZE,
+        compression: str | None = None,
+    ) -> str:
+        """Upload `src_folder` to the bucket and log W&B artifact referring it.
+
+        Args:
+            src_folder (Path): Directory to upload
+            art_name (str): Artifact name for W&B
+            art_type (str): Artifact type for W&B
+            art_alias (str | None, optional): Artifact alias for W&B,
+                see `_get_artifact_alias()` for the special values.
+                Defaults to None, a UUID4 will be assigned.
+            art_metadata (dict | None, optional): Metadata attached to the W&B artifact.
+            as_refference (bool, optional): Upload to the bucket and log the reference
+                to W&B, otherwise the files are uploaded to W&B. Defaults to True.
+            overwrite (bool, optional): Whether the existing blob could be
+                overwritten. Only the changed files are uploaded. Defaults to False.
+            suffix (str | None, optional): Suffix of the Apolo-Flow output names.
+            jobs (int, optional): Maximum number of concurrent file transfers.
+                `AUTO_JOBS` adapts it to the throughput and the transfer errors.
+            pack (bool, optional): Stream files into tar shards of about
+                `shard_size` bytes instead of uploading them one by one.
+                Speeds up the artifacts of many small files. Defaults to False.
+            shard_size (int, optional): Size of the tar shard in bytes.
+            compression (str | None, optional): Codec to compress every file with
+                on its way to the bucket, "zstd" or "gzip". It is recorded in
+                the artifact metadata and the files are decompressed on download.
+                Defaults to None, files are stored as is.
+
+        Returns:
+            str: artifact alias
+        """
+        with self._timings.operation(
+            "upload_artifact", artifact=art_name, type=art_type
+        ):
+            artifact_alias = await self._upload_artifact(
+                src_folder,
+                art_name,
+                art_type,
+                art_alias,
+                art_metadata,
+                as_refference,
+                overwrite,
+                jobs,
+                pack,
+                shard_size,
+                compression,
+            )
+            await self._set_apolo_flow_outputs(
+                art_name, art_type, artifact_alias, suffix
+            )
+            return artifact_alias
+
+    async def _upload_artifact(
+        self,
+        src_folder: Path,
+        art_name: str,
+        art_type: str,
+        art_alias: str | None,
+        art_metadata: dict | None,  # type: ignore
+        as_refference: bool,
+        overwrite: bool,
+        jobs: int,
+        pack: bool,
+        shard_size: int,
+        compression: str | None,
     ) -> str:
-        self._apolo_init_if_needed()
-        self._wandb_init_if_needed()
-        artifact = wandb.Artifact(name=art_name, type=art_type, metadata=art_metadata)
-        artifact_alias = self._get_artifact_alias(art_alias)
+        codec = get_codec(compression) if compression else None
+        if codec is not None and (pack or not as_refference):
+            raise ValueError(
+                "Compression is supported for the unpacked bucket references only."
+            )
+        await self._apolo_init_if_needed()
+        if self._journal is None or not as_refference:
+            await self._wandb_init_if_needed()
+        metadata = dict(art_metadata or {})
+        manifest: Manifest | None = None
+        if art_alias == CONTENT_HASH_ALIAS:
+            with self._timings.phase("hash"):
+                manifest = await _in_thread(
+                    Manifest.build, src_folder, codec=compression
+                )
+            artifact_alias = manifest.digest()
+        else:
+            artifact_alias = self._get_artifact_alias(art_alias)
         if as_refference:
             src_as_uri = URL(f"file:{src_folder.resolve()}")
             bucket_path: str = f"{art_type}/{art_name}/{artifact_alias}"
-            artifact_bucket_root: URL = self.bucket.uri / bucket_path
-            logger.info(
-                f"Uploading artifact from '{src_as_uri}' to {artifact_bucket_root} ..."
+            artifact_bucket_root: URL = self._root_uri / bucket_path
+            backend = await self._backend(artifact_bucket_root, jobs)
+            with self._timings.phase("exists"):
+                root_exists = await backend.exists(artifact_bucket_root)
+            existing: Manifest | None = None
+            if root_exists and art_alias == CONTENT_HASH_ALIAS:
+                # the manifest is written last, so it marks the complete upload
+                existing = await self._read_manifest(backend, artifact_bucket_root)
+                if existing is None or existing.digest() != artifact_alias:
+                    logger.warning(
+                        f"Blob {artifact_bucket_root} is incomplete, "
+                        "will be uploaded again."
+                    )
+                    existing = None
+                    # the same content, nothing to keep
+                    overwrite = True
+            if existing is not None:
+                logger.info(
+                    f"Blob {artifact_bucket_root} with the same content "
+                    "already exists, skipping upload."
+                )
+                # keep the codec the existing files were stored with
+                compression = existing.codec
+            else:
+                logger.info(
+                    f"Uploading artifact from '{src_as_uri}' "
+                    f"to {artifact_bucket_root} ..."
+                )
+                manifest = await self._upload_to_bucket(
+                    backend,
+                    src_folder,
+                    artifact_bucket_root,
+                    root_exists=root_exists,
+                    overwrite=overwrite,
+                    manifest=manifest,
+                    shard_size=shard_size if pack else None,
+                    codec=codec,
+                )
+                logger.info(f"Artifact uploaded to {artifact_bucket_root}")
+            assert manifest is not None
+            # per-file checksums are stored in the manifest next to the blob,
+            # the digest pins the manifest to this artifact version
+            metadata[DIGEST_METADATA_KEY] = manifest.digest()
+            if compression:
+                metadata[CODEC_METADATA_KEY] = compression
+            await self._log_reference(
+                art_name, art_type, artifact_alias, metadata, artifact_bucket_root
             )
+        else:
+            logger.info(f"Uploading artifact {src_folder} as directory...")
+            artifact = wandb.Artifact(name=art_name, type=art_type, metadata=metadata)
+            with self._timings.phase("add_dir"):
+                await _in_thread(artifact.add_dir, str(src_folder))
+            with self._timings.phase("log_artifact"):
+                await _in_thread(wandb.log_artifact, artifact, aliases=[artifact_alias])
+            self._aliases.drop(self._alias_key(art_name, art_type, artifact_alias))
+        return artifact_alias
 
-            root_exists = self._runner.run(self._dir_exists_in_bucket(bucket_path))
-            if not overwrite and root_exists:
-                raise RuntimeError(
-                    f"Blob at {artifact_bucket_root} already exists, "
-                    "overwrite is not enabled."
-                )
-            elif overwrite and root_exists:
+    async def _upload_to_bucket(
+        self,
+        engine: StorageBackend,
+        src_folder: Path,
+        artifact_bucket_root: URL,
+        root_exists: bool,
+        overwrite: bool,
+        manifest: Manifest | None,
+        shard_size: int | None = None,
+        codec: Codec | None = None,
+    ) -> Manifest:
+        codec_name = codec.name if codec is not None else None
+        old_manifest: Manifest | None = None
+        if not overwrite and root_exists:
+            raise RuntimeError(
+                f"Blob at {artifact_bucket_root} already exists, "
+                "overwrite is not enabled."
+            )
+        elif overwrite and root_exists:
+            # shards could not be updated partially
+            with self._timings.phase("read_manifest"):
+                if (
+                    shard_size is None
+                    and await read_pack_index(engine, artifact_bucket_root) is None
+                ):
+                    old_manifest = await self._read_manifest(
+                        engine, artifact_bucket_root
+                    )
+            if old_manifest is not None and old_manifest.codec != codec_name:
+                # every file is stored under the other key, nothing to reuse
+                old_manifest = None
+            if old_manifest is None:
                 logger.warning(
                     f"Blob {artifact_bucket_root} exists, will be overwriten!"
                 )
-                self._runner.run(
-                    self.client.buckets.blob_rm(artifact_bucket_root / "*")
-                )
+                with self._timings.phase("delete"):
+                    # the manifest goes first, so the interrupted re-upload
+                    # is not diffed against the files which were deleted
+                    manifest_blob = manifest_uri(artifact_bucket_root)
+                    await engine.delete_files(
+                        manifest_blob.parent, [manifest_blob.name]
+                    )
+                    await engine.delete_dir(artifact_bucket_root)
 
-            self._runner.run(
-                self.client.buckets.upload_dir(
-                    src=src_as_uri,
-                    dst=artifact_bucket_root,
+        if old_manifest is not None:
+            if manifest is None:
+                with self._timings.phase("hash"):
+                    manifest = await _in_thread(
+                        Manifest.build,
+                        src_folder,
+                        previous=old_manifest,
+                        codec=codec_name,
+                    )
+            changed, removed = manifest.diff(old_manifest)
+            logger.warning(
+                f"Blob {artifact_bucket_root} exists, overwriting "
+                f"{len(changed)} changed and removing {len(removed)} stale files."
+            )
+            records: dict[str, FileRecord] = {}
+            with self._timings.phase("upload") as phase:
+                phase.add(
+                    await engine.upload_files(
+                        src_folder, artifact_bucket_root, changed, codec, records
+                    )
+                )
+            manifest.check_uploaded(records)
+            with self._timings.phase("delete"):
+                await engine.delete_files(artifact_bucket_root, removed, codec)
+        elif manifest is not None:
+            records = {}
+            with self._timings.phase("upload") as phase:
+                phase.add(
+                    await self._put_files(
+                        engine,
+                        src_folder,
+                        artifact_bucket_root,
+                        list(manifest.files),
+                        shard_size,
+                        codec,
+                        records,
+                    )
+                )
+            manifest.check_uploaded(records)
+        else:
+            # nothing to compare with, the files are hashed as they are uploaded
+            records = {}
+            with self._timings.phase("upload") as phase:
+                paths = await _in_thread(local_files, src_folder)
+                phase.add(
+                    await self._put_files(
+                        engine,
+                        src_folder,
+                        artifact_bucket_root,
+                        paths,
+                        shard_size,
+                        codec,
+                        records,
+                    )
                 )
+            manifest = Manifest({path: records[path] for path in paths}, codec_name)
+        with self._timings.phase("write_manifest"):
+            await engine.write_blob(
+                manifest_uri(artifact_bucket_root), manifest.dumps()
             )
-            logger.info(f"Artifact uploaded to {artifact_bucket_root}")
-            artifact.add_reference(
-                name=DEFAULT_REF_NAME,
-                uri=str(artifact_bucket_root),
-                checksum=False,
+        return manifest
+
+    async def _put_files(
+        self,
+        engine: StorageBackend,
+        src_folder: Path,
+        artifact_bucket_root: URL,
+        paths: list[str],
+        shard_size: int | None,
+        codec: Codec | None,
+        records: dict[str, FileRecord] | None = None,
+    ) -> TransferStats:
+        if shard_size is not None:
+            return await pack_upload(
+                engine,
+                src_folder,
+                paths,
+                artifact_bucket_root,
+                shard_size,
+                records=records,
             )
-        else:
-            logger.info(f"Uploading artifact {src_folder} as directory...")
-            artifact.add_dir(str(src_folder))
-        wandb.log_artifact(artifact, aliases=[artifact_alias])
-        self._set_apolo_flow_outputs(art_name, art_type, artifact_alias, suffix)
-        return artifact_alias
+        return await engine.upload_files(
+            src_folder, artifact_bucket_root, paths, codec, records
+        )
 
-    async def _dir_exists_in_bucket(self, path: str) -> bool:
-        assert self._bucket_name
-        async with self.client.buckets._get_bucket_fs(self.bucket.uri) as bfs:
-            return await bfs.is_dir(PurePosixPath(path))
+    async def _read_manifest(
+        self, engine: StorageBackend, artifact_root: URL
+    ) -> Manifest | None:
+        data = await engine.read_blob(manifest_uri(artifact_root))
+        if data is None:
+            return None
+        try:
+            return Manifest.loads(data)
+        except ValueError as e:
+            logger.warning(f"Ignoring broken manifest of {artifact_root}: {e}")
+            return None
 
-    def _wandb_init_if_needed(self, run_args: RunArgsType | None = None) -> None:
-        if wandb.run is None:
+    async def _wandb_init_if_needed(self, run_args: RunArgsType | None = None) -> Run:
+        await self._apolo_init_if_needed()
+        async with self._get_run_lock():
+            # the run might be started by the concurrent call meanwhile
+            if wandb.run is not None:
+                return wandb.run
             logger.info(
                 "Active W&B run was not found, starting one to upload the artifact."
             )
-            self.wandb_start_run(run_args=run_args)
+            with self._timings.phase("wandb_init"):
+                return await self._wandb_start_run(None, None, run_args)
 
-    def wandb_start_run(
+    async def wandb_start_run(
         self,
         w_run_name: str | None = None,
         w_job_type: str | None = None,
         run_args: RunArgsType | None = None,
     ) -> Run:
-        self._apolo_init_if_needed()
-        if wandb.run is not None:
-            raise RuntimeError(f"W&B has registerred run {wandb.run.name}")
+        await self._apolo_init_if_needed()
+        async with self._get_run_lock():
+            if wandb.run is not None:
+                raise RuntimeError(f"W&B has registerred run {wandb.run.name}")
+            return await self._wandb_start_run(w_run_name, w_job_type, run_args)
+
+    def _get_run_lock(self) -> asyncio.Lock:
+        if self._run_lock is None:
+            self._run_lock = asyncio.Lock()
+        return self._run_lock
 
+    async def _wandb_start_run(
+        self,
+        w_run_name: str | None,
+        w_job_type: str | None,
+        run_args: RunArgsType | None,
+    ) -> Run:
+        tags = await self._try_get_apolo_tags()
+        # wandb.init() forks the service process and should be called
+        # from the main thread, so it blocks the loop until the run is started
+        return self._wandb_init(w_run_name, w_job_type, run_args, tags)
+
+    def _wandb_init(
+        self,
+        w_run_name: str | None,
+        w_job_type: str | None,
+        run_args: RunArgsType | None,
+        tags: list[str] | None,
+    ) -> Run:
         wandb_run = wandb.init(
             project=self._wab_project_name,
             entity=self._entity,
@@ -163,7 +609,7 @@ class WaBucketRefAPI:
             job_type=w_job_type,
             settings=wandb.Settings(start_method="fork"),
             config=run_args,  # type: ignore
-            tags=self._try_get_apolo_tags(),
+            tags=tags,
         )
         if not isinstance(wandb_run, Run):
             raise RuntimeError(f"Failed to initialize W&B run, got: {wandb_run:r}")
@@ -176,9 +622,15 @@ class WaBucketRefAPI:
             None object               -> the UUID4 will be assigned
             "!run-config-hash" string -> the values of wandb.run.config dict
                                          will be sorted and hashed
+            "!content-hash" string    -> the digest of the uploaded files,
+                                         computed by `upload_artifact()`
             other string object       -> itself will be used
             other object              -> error will be raised
         """
+        if art_alias == CONTENT_HASH_ALIAS:
+            raise ValueError(
+                f"'{CONTENT_HASH_ALIAS}' alias is supported for the uploads only."
+            )
         if art_alias is None:
             alias = str(uuid.uuid4())
         elif art_alias == "!run-config-hash" and wandb.run and wandb.run.config:
@@ -191,43 +643,424 @@ class WaBucketRefAPI:
             raise ValueError(f"Wrong value for artifact alias: {art_alias}.")
         return alias
 
-    def download_artifact(
+    async def download_artifact(
         self,
         art_name: str,
         art_type: str,
         art_alias: str,
         dst_folder: Path | None = None,
-        retries: int = 5,
+        retries: int = DEFAULT_RETRIES,
+        range_size: int | None = None,
+        jobs: int = DEFAULT_JOBS,
+        verify: bool = False,
+        use_run: bool = True,
+        on_file_done: Callable[[str], None] | None = None,
+        include: Sequence[str] = (),
+        exclude: Sequence[str] = (),
+        shared: bool = False,
+        shard: Shard | None = None,
     ) -> Path:
-        self._apolo_init_if_needed()
-        self._wandb_init_if_needed()
-        artifact: wandb.Artifact = wandb.use_artifact(
-            artifact_or_name=f"{art_name}:{art_alias}", type=art_type
-        )
-        blob_uri = self._get_artifact_ref(artifact, art_name, art_type, art_alias)
+        """Download artifact binaries from the bucket.
 
-        if dst_folder is None:
-            dst_folder = Path(tempfile.mkdtemp())
-        dst_uri = URL(f"file:{dst_folder.resolve()}")
-        for i in range(retries):
-            try:
-                logger.info(f"Downloading {blob_uri} -> {dst_folder}")
-                self._runner.run(
-                    self.client.buckets.download_dir(
-                        src=blob_uri,
-                        dst=dst_uri,
-                        continue_=bool(i),
+        Args:
+            art_name (str): Artifact name in W&B
+            art_type (str): Artifact type in W&B
+            art_alias (str): Artifact alias in W&B
+            dst_folder (Path | None, optional): Where to put the artifact.
+                Defaults to a new temporary directory.
+            retries (int, optional): Number of download attempts of every file
+                or range. Defaults to 5.
+            range_size (int | None, optional): If set, blobs larger than this
+                number of bytes are split into ranges, which are fetched
+                concurrently and retried independently. Applies to the direct
+                S3 transfers, the platform SDK could not fetch bounded ranges.
+                Defaults to None, every file is fetched with a single stream.
+            jobs (int, optional): Maximum number of concurrent file or range
+                transfers. `AUTO_JOBS` adapts it to the throughput
+                and the transfer errors.
+            verify (bool, optional): Check the downloaded files against
+                the checksums recorded on upload. Defaults to False.
+            use_run (bool, optional): Record the artifact as the input
+                of the active W&B run, starting one if needed. Otherwise,
+                the artifact is resolved with the W&B public API, which is
+                much faster to start. Defaults to True.
+            on_file_done (Callable[[str], None] | None, optional): Called with
+                the path of every file, relative to `dst_folder`, once it is there.
+            include (Sequence[str], optional): Glob patterns of the file paths,
+                relative to the artifact root, to download. Defaults to all files.
+            exclude (Sequence[str], optional): Glob patterns of the file paths
+                to skip. See `utils.path_matches()` for the pattern syntax.
+            shared (bool, optional): Coordinate with the other processes
+                downloading the artifact to the same `dst_folder`, e.g. the ranks
+                of a distributed training on the node: the first process
+                downloads it, while the others wait and reuse the result.
+                Defaults to False.
+            shard (Shard | None, optional): Rank of this process and the number
+                of the processes, see `coordination.shard_from_env()`. Every
+                process downloads its part of the files and waits for the others,
+                as with `shared`. Defaults to None, the files are not split.
+
+        Returns:
+            Path: the directory the artifact was downloaded to
+        """
+        with self._timings.operation(
+            "download_artifact", artifact=art_name, type=art_type, alias=art_alias
+        ):
+            with self._timings.phase("resolve"):
+                ref = await self._resolve_artifact(
+                    art_name, art_type, art_alias, use_run
+                )
+            if dst_folder is None:
+                dst_folder = Path(tempfile.mkdtemp())
+            selected: Callable[[str], bool] | None = None
+            if include or exclude:
+                selected = partial(path_matches, include=include, exclude=exclude)
+            if shared or shard is not None:
+                key = json.dumps(
+                    [str(ref.uri), ref.digest, list(include), list(exclude)]
+                )
+                await self._download_shared(
+                    SharedDownload(dst_folder, key),
+                    ref,
+                    dst_folder,
+                    retries,
+                    range_size,
+                    jobs,
+                    verify,
+                    on_file_done,
+                    selected,
+                    shard,
+                )
+            else:
+                await self._download(
+                    ref,
+                    dst_folder,
+                    retries,
+                    range_size,
+                    jobs,
+                    verify,
+                    on_file_done,
+                    selected,
+                )
+            logger.info(f"Artifact was downloaded to '{dst_folder}'")
+            return dst_folder
+
+    async def _download(
+        self,
+        ref: ArtifactRef,
+        dst_folder: Path,
+        retries: int,
+        range_size: int | None,
+        jobs: int,
+        verify: bool,
+        on_file_done: Callable[[str], None] | None,
+        selected: Callable[[str], bool] | None,
+    ) -> None:
+        blob_uri = ref.uri
+        cached: Path | None = None
+        if self._cache is not None:
+            with self._timings.phase("fingerprint"):
+                fingerprint = await self._blob_fingerprint(blob_uri)
+            cached = self._cache.lookup(blob_uri, fingerprint)
+            # partial downloads are not cached, but could be served from the cache
+            if cached is None and selected is None:
+                with self._cache.staging() as staging:
+                    with self._timings.phase("download") as phase:
+                        phase.add(
+                            await self._download_dir(
+                                ref, staging, retries, range_size, jobs
+                            )
+                        )
+                    with self._timings.phase("cache_put"):
+                        cached = self._cache.put(blob_uri, fingerprint, staging)
+        if self._cache is not None and cached is not None:
+            paths = [
+                path
+                for path in await _in_thread(local_files, cached)
+                if selected is None or selected(path)
+            ]
+            logger.info(f"Materializing cached {blob_uri} -> {dst_folder}")
+            with self._timings.phase("materialize") as phase:
+                await _in_thread(self._cache.copy_to, cached, dst_folder, paths)
+                phase.files = len(paths)
+            if on_file_done is not None:
+                for path in paths:
+                    on_file_done(path)
+        else:
+            with self._timings.phase("download") as phase:
+                phase.add(
+                    await self._download_dir(
+                        ref,
+                        dst_folder,
+                        retries,
+                        range_size,
+                        jobs,
+                        on_file_done,
+                        selected,
+                    )
+                )
+        if verify:
+            with self._timings.phase("verify"):
+                await self._verify(ref, dst_folder, selected)
+
+    async def _download_shared(
+        self,
+        coordination: SharedDownload,
+        ref: ArtifactRef,
+        dst_folder: Path,
+        retries: int,
+        range_size: int | None,
+        jobs: int,
+        verify: bool,
+        on_file_done: Callable[[str], None] | None,
+        selected: Callable[[str], bool] | None,
+        shard: Shard | None,
+    ) -> None:
+        reported: set[str] = set()
+
+        def _file_done(path: str) -> None:
+            reported.add(path)
+            if on_file_done is not None:
+                on_file_done(path)
+
+        if shard is None:
+            async with AsyncExitStack() as stack:
+                with self._timings.phase("wait_shared"):
+                    await stack.enter_async_context(coordination.locked())
+                if coordination.is_done():
+                    logger.info(f"Reusing {ref.uri} downloaded to '{dst_folder}'")
+                else:
+                    await self._download(
+                        ref,
+                        dst_folder,
+                        retries,
+                        range_size,
+                        jobs,
+                        verify,
+                        _file_done,
+                        selected,
                     )
+                    coordination.mark_done()
+        elif not coordination.is_done():
+            rank, world_size = check_shard(shard)
+
+            def _in_shard(path: str) -> bool:
+                if selected is not None and not selected(path):
+                    return False
+                return shard_of(path, world_size) == rank
+
+            if not coordination.is_shard_done(rank):
+                logger.info(f"Downloading shard {rank + 1}/{world_size} of {ref.uri}")
+                await self._download(
+                    ref,
+                    dst_folder,
+                    retries,
+                    range_size,
+                    jobs,
+                    verify,
+                    _file_done,
+                    _in_shard,
                 )
-                break
-            except (ServerTimeoutError, ClientError) as e:
-                logger.error(e)
-                backoff_time = 2 ** (i + 1) - 1
-                logger.warning(f"Retry {i + 1}/{retries} in {backoff_time} sec.")
-                time.sleep(backoff_time)
-                self._apolo_init_if_needed()
-        logger.info(f"Artifact was downloaded to '{dst_folder}'")
-        return dst_folder
+                coordination.mark_shard_done(rank)
+            with self._timings.phase("wait_shards"):
+                await _in_thread(coordination.wait_shards, world_size)
+            coordination.mark_done()
+        if on_file_done is not None:
+            # the files downloaded by the other processes
+            for path in await _in_thread(local_files, dst_folder):
+                if path == JOURNAL_NAME or path in reported:
+                    continue
+                if selected is None or selected(path):
+                    on_file_done(path)
+
+    async def _verify(
+        self,
+        ref: ArtifactRef,
+        dst_folder: Path,
+        selected: Callable[[str], bool] | None = None,
+    ) -> None:
+        manifest = await self._read_manifest(await self._backend(ref.uri), ref.uri)
+        if manifest is None:
+            raise RuntimeError(
+                f"{ref.uri} has no checksums recorded, it could not be verified."
+            )
+        if ref.digest is not None and manifest.digest() != ref.digest:
+            raise RuntimeError(
+                f"Checksums of {ref.uri} do not match the artifact, "
+                "the blob was overwritten after the artifact was logged."
+            )
+        logger.info(f"Verifying downloaded files in '{dst_folder}'")
+        mismatched = await _in_thread(manifest.verify, dst_folder, selected)
+        if mismatched:
+            raise RuntimeError(
+                f"{len(mismatched)} files in '{dst_folder}' do not match "
+                f"the checksums of {ref.uri}: {', '.join(mismatched[:10])}"
+            )
+
+    async def fetch_artifact_file(
+        self,
+        art_name: str,
+        art_type: str,
+        art_alias: str,
+        path: str,
+    ) -> bytes:
+        """Read a single file of the artifact without downloading the rest of it.
+
+        For the packed artifacts the file is fetched
+        with the ranged read of its tar shard.
+        `FileNotFoundError` is raised if the artifact has no such file.
+        """
+        ref = await self._resolve_artifact(art_name, art_type, art_alias)
+        engine = await self._backend(ref.uri)
+        index = await read_pack_index(engine, ref.uri)
+        if index is not None:
+            return await read_member(engine, ref.uri, index, path)
+        file_uri = ref.uri / str(blob_path(PurePosixPath(path), ref.codec))
+        data = await engine.read_blob(file_uri)
+        if data is None:
+            raise FileNotFoundError(f"{file_uri} does not exist.")
+        if ref.codec is not None:
+            data = await _in_thread(decompress, data, ref.codec)
+        return data
+
+    async def _resolve_artifact(
+        self, art_name: str, art_type: str, art_alias: str, use_run: bool = True
+    ) -> ArtifactRef:
+        """Use W&B artifact as the run input and return its blob reference.
+
+        Previously resolved aliases are served from the alias cache,
+        the artifact usage is recorded in the background then.
+        If `use_run` is False, the artifact is resolved with the public API
+        without starting a W&B run, the usage is not recorded.
+        """
+        await self._apolo_init_if_needed()
+        key = self._alias_key(art_name, art_type, art_alias)
+        cached = self._aliases.get(key)
+        if cached is not None:
+            logger.info(f"Using cached reference of {art_name}:{art_alias}")
+            # the run active now, the task should not start a new one
+            # if the caller finishes it meanwhile
+            run = wandb.run
+            if use_run and run is not None:
+                task = asyncio.ensure_future(
+                    self._use_artifact(run, art_name, art_type, art_alias)
+                )
+                self._lineage_tasks.add(task)
+                task.add_done_callback(self._lineage_done)
+            elif use_run:
+                logger.info(
+                    f"No active W&B run, usage of {art_name}:{art_alias} "
+                    "is not recorded."
+                )
+            ref_data = cached
+        else:
+            if use_run:
+                run = await self._wandb_init_if_needed()
+                artifact = await self._use_artifact(run, art_name, art_type, art_alias)
+            else:
+                artifact = await _in_thread(
+                    self._public_api().artifact,
+                    f"{art_name}:{art_alias}",
+                    type=art_type,
+                )
+            metadata = artifact.metadata or {}
+            ref_data = {
+                "uri": str(
+                    self._get_artifact_ref(artifact, art_name, art_type, art_alias)
+                ),
+                "codec": metadata.get(CODEC_METADATA_KEY),
+                "digest": metadata.get(DIGEST_METADATA_KEY),
+            }
+            self._aliases.put(key, ref_data)
+        codec = ref_data.get("codec")
+        return ArtifactRef(
+            URL(ref_data["uri"]),
+            get_codec(codec) if codec else None,
+            ref_data.get("digest"),
+        )
+
+    def _alias_key(self, art_name: str, art_type: str, art_alias: str) -> ArtifactKey:
+        return (self._entity, self._wab_project_name, art_type, art_name, art_alias)
+
+    async def _use_artifact(
+        self, run: Run, art_name: str, art_type: str, art_alias: str
+    ) -> wandb.Artifact:
+        artifact: wandb.Artifact = await _in_thread(
+            run.use_artifact,
+            artifact_or_name=f"{art_name}:{art_alias}",
+            type=art_type,
+        )
+        return artifact
+
+    def _public_api(self) -> wandb.Api:
+        if self._wandb_api is None:
+            overrides = {"entity": self._entity, "project": self._wab_project_name}
+            self._wandb_api = wandb.Api(
+                overrides={k: v for k, v in overrides.items() if v}
+            )
+        return self._wandb_api
+
+    def _lineage_done(self, task: asyncio.Future[wandb.Artifact]) -> None:
+        self._lineage_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Failed to record the artifact usage: {task.exception()}")
+
+    async def _download_dir(
+        self,
+        ref: ArtifactRef,
+        dst_folder: Path,
+        retries: int,
+        range_size: int | None = None,
+        jobs: int = DEFAULT_JOBS,
+        on_file_done: Callable[[str], None] | None = None,
+        selected: Callable[[str], bool] | None = None,
+    ) -> TransferStats:
+        blob_uri = ref.uri
+        engine = await self._backend(blob_uri, jobs)
+        index = await read_pack_index(engine, blob_uri)
+        if index is not None:
+            logger.info(f"Downloading and unpacking {blob_uri} -> {dst_folder}")
+            stats = await unpack_download(
+                engine, blob_uri, index, dst_folder, retries, selected
+            )
+            if on_file_done is not None:
+                for path in index.members:
+                    if selected is None or selected(path):
+                        on_file_done(path)
+            return stats
+        if ref.codec is not None:
+            logger.info(
+                f"Downloading and decompressing ({ref.codec.name}) "
+                f"{blob_uri} -> {dst_folder}"
+            )
+        elif (
+            range_size is not None
+            and isinstance(engine, BlobEngine)
+            and engine.ranged_reads
+        ):
+            logger.info(f"Downloading {blob_uri} -> {dst_folder} by ranges")
+        else:
+            logger.info(f"Downloading {blob_uri} -> {dst_folder}")
+        return await engine.download_dir(
+            blob_uri,
+            dst_folder,
+            range_size,
+            retries,
+            ref.codec,
+            on_file_done,
+            selected,
+        )
+
+    async def _blob_fingerprint(self, blob_uri: URL) -> str:
+        """Hash of the blob directory listing, changes once the blob is overwritten."""
+        hasher = hashlib.sha256()
+        entries = []
+        backend = await self._backend(blob_uri)
+        for entry in await backend.list_files(blob_uri):
+            entries.append(f"{entry.path}:{entry.size}:{entry.modified or 0}")
+        for line in sorted(entries):
+            hasher.update(line.encode("utf-8"))
+        return hasher.hexdigest()
 
     def _get_artifact_ref(
         self,
@@ -242,7 +1075,7 @@ class WaBucketRefAPI:
         except KeyError:
             # backward support, artifact was saved with wabucket version < 22.7.0
             bucket_path = f"{art_type}/{art_name}/{art_alias}"
-            blob_ref = str(self.bucket.uri / bucket_path)
+            blob_ref = str(self._root_uri / bucket_path)
             logger.warning(
                 f"Artifact ref for {bucket_path} was not found. "
                 f"Trying to fetch from: {blob_ref}"
@@ -250,7 +1083,7 @@ class WaBucketRefAPI:
 
         return URL(blob_ref)
 
-    def _try_get_apolo_tags(self) -> list[str] | None:
+    async def _try_get_apolo_tags(self) -> list[str] | None:
         job_id = os.environ.get("NEURO_JOB_ID")
         if job_id:
             # assuming the platform job
@@ -259,24 +1092,37 @@ class WaBucketRefAPI:
                 f"job_name:{os.environ.get('NEURO_JOB_NAME')}",
                 f"owner:{os.environ.get('NEURO_JOB_OWNER')}",
             ]
-            result.extend(self._get_apolo_job_tags(job_id))
+            result.extend(await self._get_apolo_job_tags(job_id))
             return result
         else:
             return None
 
-    def _get_apolo_job_tags(self, job_id: str) -> list[str]:
-        assert self._runner
-        assert self._n_client
-        job_description = self._runner.run(self._n_client.jobs.status(job_id))
+    async def _get_apolo_job_tags(self, job_id: str) -> list[str]:
+        client = await self._init_client()
+        job_description = await client.jobs.status(job_id)
         return list(job_description.tags)
 
-    def _apolo_init_if_needed(self) -> None:
-        if not self._runner._started:
-            self._runner.__enter__()
-        self._runner.run(self._init_client())
-        self._runner.run(self._init_bucket())
+    async def _apolo_init_if_needed(self) -> None:
+        if self._init_lock is None:
+            self._init_lock = asyncio.Lock()
+        async with self._init_lock:
+            if self._local_root is not None:
+                # no platform calls are needed to access the local directory
+                return
+            await self._init_client()
+            await self._init_bucket()
+
+    async def _set_apolo_flow_outputs(
+        self,
+        art_name: str,
+        art_type: str,
+        art_alias: str | None = None,
+        suffix: str | None = None,
+    ) -> None:
+        self._print_flow_outputs(art_name, art_type, art_alias, suffix)
+        await self._flow_outputs_delay()
 
-    def _set_apolo_flow_outputs(
+    def _print_flow_outputs(
         self,
         art_name: str,
         art_type: str,
@@ -300,9 +1146,93 @@ class WaBucketRefAPI:
             flush=True,
             file=sys.stdout,
         )
-        time.sleep(1)  # https://github.com/neuro-inc/mlops-wandb-bucket-ref/issues/16
 
-    def link(
+    async def _flow_outputs_delay(self) -> None:
+        # https://github.com/neuro-inc/mlops-wandb-bucket-ref/issues/16
+        with self._timings.phase("flow_outputs"):
+            await asyncio.sleep(1)
+
+    async def _log_reference(
+        self,
+        art_name: str,
+        art_type: str,
+        art_alias: str,
+        metadata: dict | None,  # type: ignore
+        blob_uri: URL,
+    ) -> None:
+        """Log W&B artifact referring the blob, or record it in the journal
+        if the logging is deferred.
+
+        The recorded artifact is logged to the active W&B run in the background,
+        or, if there is none, by the detached `wabucket flush` process
+        once the API is closed. So the caller does not wait for W&B.
+        The alias resolved before points to the other version then.
+        """
+        self._aliases.drop(self._alias_key(art_name, art_type, art_alias))
+        if self._journal is None:
+            artifact = _reference_artifact(art_name, art_type, metadata, str(blob_uri))
+            with self._timings.phase("log_artifact"):
+                await _in_thread(wandb.log_artifact, artifact, aliases=[art_alias])
+            return
+        run = wandb.run
+        record = ArtifactRecord(
+            name=art_name,
+            type=art_type,
+            alias=art_alias,
+            uri=str(blob_uri),
+            metadata=dict(metadata or {}),
+            entity=run.entity if run is not None else self._entity,
+            project=run.project if run is not None else self._wab_project_name,
+            run_id=run.id if run is not None else None,
+            tags=await self._try_get_apolo_tags() if run is None else None,
+        )
+        with self._timings.phase("journal"):
+            path = await _in_thread(self._journal.append, record)
+        logger.info(f"Artifact {art_name}:{art_alias} is recorded to {path}")
+        if run is not None:
+            task = asyncio.ensure_future(
+                _in_thread(self._log_record, run, path, record)
+            )
+            self._log_tasks.add(task)
+            task.add_done_callback(self._log_done)
+        else:
+            self._flush_pending = True
+
+    def _log_record(self, run: Run, path: Path, record: ArtifactRecord) -> None:
+        assert self._journal is not None
+        artifact = _reference_artifact(
+            record.name, record.type, record.metadata, record.uri
+        )
+        run.log_artifact(artifact, aliases=[record.alias])
+        if not run.offline:
+            artifact.wait()
+        self._journal.remove(path)
+
+    def _log_done(self, task: asyncio.Future[None]) -> None:
+        self._log_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(
+                f"Failed to log the deferred artifact: {task.exception()}, "
+                "it is kept in the journal for `wabucket flush`."
+            )
+
+    def _start_flush(self) -> None:
+        """Log the journal records in the detached process, which outlives this one."""
+        assert self._journal is not None
+        root = self._journal.root
+        root.mkdir(parents=True, exist_ok=True)
+        logger.info("Logging the deferred artifacts to W&B in the background")
+        with open(root / "flush.log", "ab") as log:
+            subprocess.Popen(
+                [sys.executable, "-m", "wabucketref", "--no-daemon", "flush"],
+                env={**os.environ, JOURNAL_DIR_ENV: str(root)},
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=log,
+                start_new_session=True,
+            )
+
+    async def link(
         self,
         bucket_path: str,
         art_name: str,
@@ -331,20 +1261,512 @@ class WaBucketRefAPI:
         Returns:
             str: artifact alias
         """
-        self._apolo_init_if_needed()
-        full_path = self.bucket.uri / bucket_path
-        logger.info(f"Creating W&B Artifact from '{full_path}'")
-        if not self._runner.run(self._dir_exists_in_bucket(bucket_path)):
-            raise ValueError(f"{full_path} does not exist or not a directory.")
-
-        self._wandb_init_if_needed()
-        artifact = wandb.Artifact(name=art_name, type=art_type, metadata=art_metadata)
-        artifact_alias = self._get_artifact_alias(art_alias)
-        artifact.add_reference(
-            name=DEFAULT_REF_NAME,
-            uri=str(full_path),
-            checksum=False,
+        with self._timings.operation("link", artifact=art_name, type=art_type):
+            await self._apolo_init_if_needed()
+            full_path = self._root_uri / bucket_path
+            logger.info(f"Creating W&B Artifact from '{full_path}'")
+            backend = await self._backend(full_path)
+            with self._timings.phase("exists"):
+                exists = await backend.exists(full_path)
+            if not exists:
+                raise ValueError(f"{full_path} does not exist or not a directory.")
+
+            if self._journal is None:
+                await self._wandb_init_if_needed()
+            artifact_alias = self._get_artifact_alias(art_alias)
+            await self._log_reference(
+                art_name, art_type, artifact_alias, art_metadata, full_path
+            )
+            await self._set_apolo_flow_outputs(
+                art_name, art_type, artifact_alias, suffix
+            )
+            return artifact_alias
+
+    async def upload_many(
+        self,
+        artifacts: Sequence[UploadSpec],
+        jobs: int = DEFAULT_JOBS,
+        shard_size: int = DEFAULT_SHARD_SIZE,
+    ) -> list[str]:
+        """Upload several artifacts concurrently, within the same W&B run.
+
+        Args:
+            artifacts (Sequence[UploadSpec]): Artifacts to upload, see
+                `upload_artifact()` for the fields. Apolo-Flow outputs of every
+                artifact are suffixed with its `suffix`, or name if it is not set,
+                and printed once all the uploads have finished.
+            jobs (int, optional): Maximum number of concurrent file transfers
+                of all the artifacts.
+            shard_size (int, optional): Size of the tar shard of the packed artifacts.
+
+        Raises:
+            RuntimeError: If any of the uploads failed, once the others have finished.
+
+        Returns:
+            list[str]: artifact aliases, in the order of `artifacts`
+        """
+        with self._timings.operation("upload_many", artifacts=len(artifacts)):
+            await self._apolo_init_if_needed()
+
+            async def _upload(spec: UploadSpec) -> str:
+                with self._timings.operation(
+                    "upload_artifact", artifact=spec.name, type=spec.type
+                ):
+                    return await self._upload_artifact(
+                        spec.src_folder,
+                        spec.name,
+                        spec.type,
+                        spec.alias,
+                        spec.metadata,
+                        as_refference=True,
+                        overwrite=False,
+                        jobs=jobs,
+                        pack=spec.pack,
+                        shard_size=shard_size,
+                        compression=spec.compression,
+                    )
+
+            with shared_jobs(jobs):
+                results = await asyncio.gather(
+                    *(_upload(spec) for spec in artifacts), return_exceptions=True
+                )
+            for spec, result in zip(artifacts, results):
+                if isinstance(result, str):
+                    self._print_flow_outputs(
+                        spec.name, spec.type, result, spec.suffix or spec.name
+                    )
+            await self._flow_outputs_delay()
+            _raise_failed("upload", [a.name for a in artifacts], results)
+            return [result for result in results if isinstance(result, str)]
+
+    async def download_many(
+        self,
+        artifacts: Sequence[DownloadSpec],
+        retries: int = DEFAULT_RETRIES,
+        range_size: int | None = None,
+        jobs: int = DEFAULT_JOBS,
+        verify: bool = False,
+        use_run: bool = True,
+        shared: bool = False,
+        shard: Shard | None = None,
+    ) -> list[Path]:
+        """Download several artifacts concurrently, within the same W&B run.
+
+        Args:
+            artifacts (Sequence[DownloadSpec]): Artifacts to download, see
+                `download_artifact()` for the fields.
+            jobs (int, optional): Maximum number of concurrent file or range
+                transfers of all the artifacts.
+            See `download_artifact()` for the other arguments.
+
+        Raises:
+            RuntimeError: If any of the downloads failed,
+                once the others have finished.
+
+        Returns:
+            list[Path]: the directories the artifacts were downloaded to,
+                in the order of `artifacts`
+        """
+        with self._timings.operation("download_many", artifacts=len(artifacts)):
+            with shared_jobs(jobs):
+                results = await asyncio.gather(
+                    *(
+                        self.download_artifact(
+                            art_name=spec.name,
+                            art_type=spec.type,
+                            art_alias=spec.alias,
+                            dst_folder=spec.dst_folder,
+                            retries=retries,
+                            range_size=range_size,
+                            jobs=jobs,
+                            verify=verify,
+                            use_run=use_run,
+                            include=spec.include,
+                            exclude=spec.exclude,
+                            shared=shared,
+                            shard=shard,
+                        )
+                        for spec in artifacts
+                    ),
+                    return_exceptions=True,
+                )
+            _raise_failed("download", [a.name for a in artifacts], results)
+            return [result for result in results if isinstance(result, Path)]
+
+
+def _raise_failed(operation: str, names: list[str], results: list[Any]) -> None:
+    failed = [
+        (name, result)
+        for name, result in zip(names, results)
+        if isinstance(result, BaseException)
+    ]
+    for name, error in failed:
+        logger.error(f"Failed to {operation} artifact {name}: {error!r}")
+    if failed:
+        raise RuntimeError(
+            f"Failed to {operation} {len(failed)} of {len(names)} artifacts: "
+            f"{', '.join(name for name, _ in failed)}."
+        ) from failed[0][1]
+
+
+class WaBucketRefAPI:
+    """Synchronous facade of `AsyncWaBucketRefAPI`,
+    which runs its coroutines on the private event loop in the background thread.
+
+    W&B runs are started from the calling thread before the coroutines are
+    submitted, since `wandb.init()` should be called from the main thread.
+    """
+
+    def __init__(
+        self,
+        bucket: str | None = None,
+        project_name: str | None = None,
+        entity: str | None = None,
+        cache_dir: Path | None = None,
+        cache_size: int | None = None,
+        alias_ttl: float | None = None,
+        direct_s3: bool | None = None,
+        timings: str | Path | None = None,
+        timings_to_wandb: bool | None = None,
+        max_bandwidth: int | None = None,
+        defer_logging: bool | None = None,
+    ):
+        self._loop = LoopThread()
+        self._api = AsyncWaBucketRefAPI(
+            bucket=bucket,
+            project_name=project_name,
+            entity=entity,
+            cache_dir=cache_dir,
+            cache_size=cache_size,
+            alias_ttl=alias_ttl,
+            direct_s3=direct_s3,
+            timings=timings,
+            timings_to_wandb=timings_to_wandb,
+            max_bandwidth=max_bandwidth,
+            defer_logging=defer_logging,
+        )
+
+    def _run(self, coro: Coroutine[Any, Any, _T]) -> _T:
+        return self._loop.run(coro)
+
+    def _wandb_init_if_needed(self, operation: str) -> None:
+        if wandb.run is None:
+            logger.info("Active W&B run was not found, starting one.")
+            with self._api._timings.phase("wandb_init", operation):
+                self.wandb_start_run()
+
+    @property
+    def defer_logging(self) -> bool:
+        """Whether the bucket references are logged to W&B after the calls return."""
+        return self._api._journal is not None
+
+    @property
+    def client(self) -> Client:
+        return self._api.client
+
+    @property
+    def bucket(self) -> Bucket:
+        return self._api.bucket
+
+    def close(self) -> None:
+        if not self._loop.started:
+            return
+        self._run(self._api.close())
+        try:
+            # Suppress prints unhandled exceptions
+            # on event loop closing
+            sys.stderr = None
+            self._loop.stop()
+        finally:
+            sys.stderr = sys.__stderr__
+
+    def upload_artifact(
+        self,
+        src_folder: Path,
+        art_name: str,
+        art_type: str,
+        art_alias: str | None = None,
+        art_metadata: dict | None = None,  # type: ignore
+        as_refference: bool = True,
+        overwrite: bool = False,
+        suffix: str | None = None,
+        jobs: int = DEFAULT_JOBS,
+        pack: bool = False,
+        shard_size: int = DEFAULT_SHARD_SIZE,
+        compression: str | None = None,
+    ) -> str:
+        """Upload `src_folder` to the bucket and log W&B artifact referring it.
+        See `AsyncWaBucketRefAPI.upload_artifact()` for the arguments.
+        """
+        if not (self.defer_logging and as_refference):
+            self._wandb_init_if_needed("upload_artifact")
+        return self._run(
+            self._api.upload_artifact(
+                src_folder=src_folder,
+                art_name=art_name,
+                art_type=art_type,
+                art_alias=art_alias,
+                art_metadata=art_metadata,
+                as_refference=as_refference,
+                overwrite=overwrite,
+                suffix=suffix,
+                jobs=jobs,
+                pack=pack,
+                shard_size=shard_size,
+                compression=compression,
+            )
+        )
+
+    def wandb_start_run(
+        self,
+        w_run_name: str | None = None,
+        w_job_type: str | None = None,
+        run_args: RunArgsType | None = None,
+    ) -> Run:
+        self._run(self._api._apolo_init_if_needed())
+        if wandb.run is not None:
+            raise RuntimeError(f"W&B has registerred run {wandb.run.name}")
+        tags = self._run(self._api._try_get_apolo_tags())
+        return self._api._wandb_init(w_run_name, w_job_type, run_args, tags)
+
+    def finish_run(self) -> None:
+        """Wait until the artifact usage is recorded and finish the active W&B run,
+        keeping the clients open for the next run.
+        """
+        if self._loop.started:
+            self._run(self._api._wait_background())
+        if wandb.run is not None:
+            wandb.finish()
+
+    def flush_journal(self) -> int:
+        """Log the artifacts recorded in the journal by the deferred logging to W&B.
+
+        Artifacts are logged in batches, one per the run they were produced by,
+        which is resumed, or a new run of `FLUSH_JOB_TYPE` job type if there
+        was no active run. Failed batches are kept in the journal.
+
+        Raises:
+            RuntimeError: If W&B run is active in this process.
+
+        Returns:
+            int: number of the artifacts left in the journal.
+        """
+        if wandb.run is not None:
+            raise RuntimeError(
+                f"W&B has registerred run {wandb.run.name}, "
+                "finish it to flush the journal."
+            )
+        journal = self._api._journal or Journal.from_env()
+        with journal.lock():
+            batches: dict[RunKey, list[tuple[Path, ArtifactRecord]]] = {}
+            for path, record in journal.pending():
+                batches.setdefault(record.run_key, []).append((path, record))
+            for (entity, project, run_id, _), records in batches.items():
+                try:
+                    self._log_records(journal, records)
+                except Exception as e:
+                    logger.warning(
+                        f"Failed to log {len(records)} artifacts "
+                        f"to W&B project {entity}/{project}: {e}"
+                    )
+            left = len(journal.pending())
+        return left
+
+    def _log_records(
+        self, journal: Journal, records: list[tuple[Path, ArtifactRecord]]
+    ) -> None:
+        first = records[0][1]
+        run = wandb.init(
+            project=first.project,
+            entity=first.entity,
+            id=first.run_id,
+            resume="allow" if first.run_id else None,
+            job_type=None if first.run_id else FLUSH_JOB_TYPE,
+            tags=first.tags,
+        )
+        if not isinstance(run, Run):
+            raise RuntimeError(f"Failed to initialize W&B run, got: {run!r}")
+        logged = []
+        try:
+            for path, record in records:
+                artifact = _reference_artifact(
+                    record.name, record.type, record.metadata, record.uri
+                )
+                run.log_artifact(artifact, aliases=[record.alias])
+                logged.append((path, artifact))
+            if not run.offline:
+                for _, artifact in logged:
+                    artifact.wait()
+        finally:
+            run.finish()
+        # committed, or saved with the offline run, it is safe to forget
+        for path, _ in logged:
+            journal.remove(path)
+        logger.info(f"Logged {len(logged)} artifacts to W&B run {run.path}")
+
+    def download_artifact(
+        self,
+        art_name: str,
+        art_type: str,
+        art_alias: str,
+        dst_folder: Path | None = None,
+        retries: int = DEFAULT_RETRIES,
+        range_size: int | None = None,
+        jobs: int = DEFAULT_JOBS,
+        verify: bool = False,
+        use_run: bool = True,
+        include: Sequence[str] = (),
+        exclude: Sequence[str] = (),
+        shared: bool = False,
+        shard: Shard | None = None,
+    ) -> Path:
+        """Download artifact binaries from the bucket.
+        See `AsyncWaBucketRefAPI.download_artifact()` for the arguments.
+        """
+        if use_run:
+            self._wandb_init_if_needed("download_artifact")
+        return self._run(
+            self._api.download_artifact(
+                art_name=art_name,
+                art_type=art_type,
+                art_alias=art_alias,
+                dst_folder=dst_folder,
+                retries=retries,
+                range_size=range_size,
+                jobs=jobs,
+                verify=verify,
+                use_run=use_run,
+                include=include,
+                exclude=exclude,
+                shared=shared,
+                shard=shard,
+            )
+        )
+
+    def prefetch_artifact(
+        self,
+        art_name: str,
+        art_type: str,
+        art_alias: str,
+        dst_folder: Path | None = None,
+        retries: int = DEFAULT_RETRIES,
+        range_size: int | None = None,
+        jobs: int = DEFAULT_JOBS,
+        verify: bool = False,
+        use_run: bool = True,
+        include: Sequence[str] = (),
+        exclude: Sequence[str] = (),
+        shared: bool = False,
+        shard: Shard | None = None,
+    ) -> PrefetchHandle:
+        """Start downloading the artifact in the background and return at once.
+        See `AsyncWaBucketRefAPI.download_artifact()` for the arguments.
+
+        The download shares the apolo client with the other calls. Use
+        `.result()` of the returned handle to wait for the whole artifact,
+        or `.wait_file()` to wait for the individual files.
+        """
+        if use_run:
+            self._wandb_init_if_needed("download_artifact")
+        if dst_folder is None:
+            dst_folder = Path(tempfile.mkdtemp())
+        handle = PrefetchHandle(dst_folder)
+        handle._attach(
+            self._loop.submit(
+                self._api.download_artifact(
+                    art_name=art_name,
+                    art_type=art_type,
+                    art_alias=art_alias,
+                    dst_folder=dst_folder,
+                    retries=retries,
+                    range_size=range_size,
+                    jobs=jobs,
+                    verify=verify,
+                    use_run=use_run,
+                    on_file_done=handle._file_done,
+                    include=include,
+                    exclude=exclude,
+                    shared=shared,
+                    shard=shard,
+                )
+            )
+        )
+        return handle
+
+    def fetch_artifact_file(
+        self, art_name: str, art_type: str, art_alias: str, path: str
+    ) -> bytes:
+        """Read a single file of the artifact without downloading the rest of it."""
+        self._wandb_init_if_needed("fetch_artifact_file")
+        return self._run(
+            self._api.fetch_artifact_file(art_name, art_type, art_alias, path)
+        )
+
+    def link(
+        self,
+        bucket_path: str,
+        art_name: str,
+        art_type: str,
+        art_alias: str | None = None,
+        art_metadata: dict | None = None,  # type: ignore
+        suffix: str | None = None,
+    ) -> str:
+        """Create Artifact in W&B system out of existing binaries in Neu.ro bucket.
+        See `AsyncWaBucketRefAPI.link()` for the arguments.
+        """
+        if not self.defer_logging:
+            self._wandb_init_if_needed("link")
+        return self._run(
+            self._api.link(
+                bucket_path=bucket_path,
+                art_name=art_name,
+                art_type=art_type,
+                art_alias=art_alias,
+                art_metadata=art_metadata,
+                suffix=suffix,
+            )
+        )
+
+    def upload_many(
+        self,
+        artifacts: Sequence[UploadSpec],
+        jobs: int = DEFAULT_JOBS,
+        shard_size: int = DEFAULT_SHARD_SIZE,
+    ) -> list[str]:
+        """Upload several artifacts concurrently, within the same W&B run.
+        See `AsyncWaBucketRefAPI.upload_many()` for the arguments.
+        """
+        if not self.defer_logging:
+            self._wandb_init_if_needed("upload_many")
+        return self._run(
+            self._api.upload_many(artifacts, jobs=jobs, shard_size=shard_size)
+        )
+
+    def download_many(
+        self,
+        artifacts: Sequence[DownloadSpec],
+        retries: int = DEFAULT_RETRIES,
+        range_size: int | None = None,
+        jobs: int = DEFAULT_JOBS,
+        verify: bool = False,
+        use_run: bool = True,
+        shared: bool = False,
+        shard: Shard | None = None,
+    ) -> list[Path]:
+        """Download several artifacts concurrently, within the same W&B run.
+        See `AsyncWaBucketRefAPI.download_many()` for the arguments.
+        """
+        if use_run:
+            self._wandb_init_if_needed("download_many")
+        return self._run(
+            self._api.download_many(
+                artifacts,
+                retries=retries,
+                range_size=range_size,
+                jobs=jobs,
+                verify=verify,
+                use_run=use_run,
+                shared=shared,
+                shard=shard,
+            )
         )
-        wandb.log_artifact(artifact, aliases=[artifact_alias])
-        self._set_apolo_flow_outputs(art_name, art_type, artifact_alias, suffix)
-        return artifact_alias
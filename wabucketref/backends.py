@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    AsyncContextManager,
+    AsyncIterator,
+    Callable,
+    Iterable,
+    Optional,
+    Protocol,
+)
+
+from yarl import URL
+
+
+if TYPE_CHECKING:
+    from .compression import Codec
+    from .manifest import FileRecord
+    from .transfer import TransferJob, TransferStats
+
+
+@dataclass(frozen=True)
+class FileInfo:
+    path: str  # relative to the listed root
+    size: int
+    modified: Optional[float] = None  # timestamp
+
+
+class StorageBackend(Protocol):
+    """Storage the artifact files are kept in, addressed by URIs.
+
+    Implemented by `transfer.TransferEngine` for the platform buckets
+    and `local.LocalBackend` for the local (or mounted) `file://` directories.
+    """
+
+    async def exists(self, uri: URL) -> bool: ...  # is an existing directory
+
+    async def list_files(self, root: URL) -> list[FileInfo]: ...
+
+    async def upload_files(
+        self,
+        src: Path,
+        dst: URL,
+        paths: Iterable[str],
+        codec: Codec | None = None,
+        records: dict[str, FileRecord] | None = None,
+    ) -> TransferStats: ...
+
+    async def download_dir(
+        self,
+        src: URL,
+        dst: Path,
+        range_size: int | None = None,
+        retries: int = ...,
+        codec: Codec | None = None,
+        on_file_done: Callable[[str], None] | None = None,
+        selected: Callable[[str], bool] | None = None,
+    ) -> TransferStats: ...
+
+    async def delete_files(
+        self, root: URL, paths: Iterable[str], codec: Codec | None = None
+    ) -> TransferStats: ...
+
+    async def delete_dir(self, root: URL) -> None: ...
+
+    async def read_blob(self, uri: URL) -> bytes | None: ...
+
+    async def write_blob(self, uri: URL, data: bytes) -> None: ...
+
+    async def write_stream(self, uri: URL, chunks: AsyncIterator[bytes]) -> None: ...
+
+    def read_stream(
+        self, uri: URL, offset: int = 0
+    ) -> AsyncContextManager[AsyncIterator[bytes]]: ...
+
+    async def retry(self, job: TransferJob, retries: int) -> int: ...
+
+    async def run(self, jobs: Iterable[TransferJob]) -> TransferStats: ...
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Sequence
+
+
+@dataclass(frozen=True)
+class UploadSpec:
+    """Artifact to upload with `WaBucketRefAPI.upload_many()`,
+    see `upload_artifact()` for the fields.
+    """
+
+    src_folder: Path
+    name: str
+    type: str
+    alias: str | None = None
+    metadata: dict[str, Any] = field(default_factory=dict)
+    # of the Apolo-Flow outputs, defaults to the artifact name
+    suffix: str | None = None
+    pack: bool = False
+    compression: str | None = None
+
+
+@dataclass(frozen=True)
+class DownloadSpec:
+    """Artifact to download with `WaBucketRefAPI.download_many()`,
+    see `download_artifact()` for the fields.
+    """
+
+    name: str
+    type: str
+    alias: str
+    dst_folder: Path | None = None
+    include: Sequence[str] = ()
+    exclude: Sequence[str] = ()
+
+
+# manifest keys, named as the options of the single artifact commands
+_UPLOAD_KEYS = {
+    "src": "src_folder",
+    "name": "name",
+    "type": "type",
+    "alias": "alias",
+    "metadata": "metadata",
+    "suffix": "suffix",
+    "pack": "pack",
+    "compress": "compression",
+}
+_DOWNLOAD_KEYS = {
+    "type": "type",
+    "name": "name",
+    "alias": "alias",
+    "destination": "dst_folder",
+    "include": "include",
+    "exclude": "exclude",
+}
+
+
+def _load(path: Path, keys: dict[str, str], required: set[str]) -> list[dict[str, Any]]:
+    """Read the artifacts of the YAML or JSON manifest:
+
+        artifacts:
+          - name: users
+            type: features
+            ...
+
+    A plain list of the artifacts is accepted as well.
+    """
+    text = path.read_text()
+    if path.suffix == ".json":
+        data = json.loads(text)
+    else:
+        import yaml
+
+        data = yaml.safe_load(text)
+    if isinstance(data, dict):
+        data = data.get("artifacts")
+    if not isinstance(data, list) or not data:
+        raise ValueError(f"{path}: a non-empty `artifacts` list is expected.")
+    result = []
+    for i, item in enumerate(data):
+        if not isinstance(item, dict):
+            raise ValueError(f"{path}: artifact #{i + 1} should be a mapping.")
+        unknown = set(item) - set(keys)
+        if unknown:
+            raise ValueError(
+                f"{path}: unknown keys of artifact #{i + 1}: "
+                f"{', '.join(sorted(unknown))}."
+            )
+        missing = required - set(item)
+        if missing:
+            raise ValueError(
+                f"{path}: missing keys of artifact #{i + 1}: "
+                f"{', '.join(sorted(missing))}."
+            )
+        result.append({keys[k]: v for k, v in item.items()})
+    return result
+
+
+def load_uploads(path: Path) -> list[UploadSpec]:
+    """Artifacts of the `upload-many` manifest. Relative `src` directories
+    are resolved in the current directory.
+    """
+    specs = []
+    for item in _load(path, _UPLOAD_KEYS, {"src", "name", "type"}):
+        item["src_folder"] = Path(item["src_folder"])
+        if item.get("alias") is not None:
+            item["alias"] = str(item["alias"])
+        item["metadata"] = dict(item.get("metadata") or {})
+        specs.append(UploadSpec(**item))
+    return specs
+
+
+def load_downloads(path: Path) -> list[DownloadSpec]:
+    """Artifacts of the `download-many` manifest. Like with the `download`
+    command, the `destination` defaults to `./{type}/{name}/{alias}`.
+    """
+    specs = []
+    for item in _load(path, _DOWNLOAD_KEYS, {"type", "name", "alias"}):
+        item["alias"] = str(item["alias"])
+        dst = item.get("dst_folder")
+        if dst is None:
+            dst = Path() / item["type"] / item["name"] / item["alias"]
+        item["dst_folder"] = Path(dst)
+        for key in ("include", "exclude"):
+            patterns = item.get(key, ())
+            item[key] = (patterns,) if isinstance(patterns, str) else tuple(patterns)
+        specs.append(DownloadSpec(**item))
+    return specs
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Iterator, Sequence
+
+from yarl import URL
+
+from .materialize import Materializer
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR_ENV = "WABUCKET_CACHE_DIR"
+CACHE_SIZE_ENV = "WABUCKET_CACHE_SIZE"
+DEFAULT_CACHE_SIZE = 50 * 1024**3  # 50 GB
+
+_DATA_DIR = "data"
+_META_FILE = "meta.json"
+_TMP_DIR = ".tmp"
+
+
+class ArtifactCache:
+    """Node-local cache of downloaded artifacts.
+
+    Entries are keyed by the blob reference the artifact points to and
+    validated with a fingerprint of the bucket listing (keys, sizes and
+    modification times), so an overwritten blob is never served stale.
+    Least recently used entries are evicted once the cache grows over `max_size`.
+
+    Layout:
+        <root>/<sha256(blob_uri)>/meta.json
+        <root>/<sha256(blob_uri)>/data/...
+        <root>/.tmp/...  staging area for the in-flight downloads
+    """
+
+    def __init__(self, root: Path, max_size: int = DEFAULT_CACHE_SIZE):
+        self.root = root.expanduser().resolve()
+        self.max_size = max_size
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> ArtifactCache | None:
+        from .utils import parse_size
+
+        root = os.environ.get(CACHE_DIR_ENV)
+        if not root:
+            return None
+        size = os.environ.get(CACHE_SIZE_ENV)
+        return cls(Path(root), parse_size(size) if size else DEFAULT_CACHE_SIZE)
+
+    @staticmethod
+    def key(blob_uri: URL) -> str:
+        return hashlib.sha256(str(blob_uri).rstrip("/").encode("utf-8")).hexdigest()
+
+    def lookup(self, blob_uri: URL, fingerprint: str) -> Path | None:
+        entry = self.root / self.key(blob_uri)
+        meta = self._read_meta(entry)
+        if meta is None:
+            return None
+        if meta.get("fingerprint") != fingerprint:
+            logger.info(f"Cached copy of {blob_uri} is outdated, dropping it.")
+            self._remove(entry)
+            return None
+        meta["last_used"] = time.time()
+        self._write_meta(entry, meta)
+        logger.info(f"Cache hit for {blob_uri} at '{entry / _DATA_DIR}'")
+        return entry / _DATA_DIR
+
+    def staging_dir(self) -> Path:
+        path = self.root / _TMP_DIR / uuid.uuid4().hex
+        path.mkdir(parents=True)
+        return path
+
+    @contextlib.contextmanager
+    def staging(self) -> Iterator[Path]:
+        """Staging directory for the download, removed on exit unless it was
+        moved into the cache by `put()`, so the failed downloads do not leak.
+        """
+        path = self.staging_dir()
+        try:
+            yield path
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def put(self, blob_uri: URL, fingerprint: str, src_dir: Path) -> Path:
+        """Move downloaded `src_dir` into the cache and return the cached copy."""
+        entry = self.root / self.key(blob_uri)
+        meta = self._read_meta(entry)
+        if meta is not None and meta.get("fingerprint") == fingerprint:
+            # another process has already populated the entry
+            shutil.rmtree(src_dir, ignore_errors=True)
+            return entry / _DATA_DIR
+        self._remove(entry)
+
+        size = _dir_size(src_dir)
+        self.evict(reserve=size)
+        staged_entry = self.staging_dir()
+        os.replace(src_dir, staged_entry / _DATA_DIR)
+        self._write_meta(
+            staged_entry,
+            {
+                "uri": str(blob_uri),
+                "fingerprint": fingerprint,
+                "size": size,
+                "last_used": time.time(),
+            },
+        )
+        try:
+            os.replace(staged_entry, entry)
+        except OSError:
+            # lost the race to a concurrent writer, use its entry
+            shutil.rmtree(staged_entry, ignore_errors=True)
+        return entry / _DATA_DIR
+
+    def evict(self, reserve: int = 0) -> None:
+        entries = []
+        for entry in self.root.iterdir():
+            if entry.name == _TMP_DIR:
+                continue
+            meta = self._read_meta(entry)
+            if meta is None:
+                continue
+            entries.append((meta.get("last_used", 0), meta.get("size", 0), entry))
+        total = sum(size for _, size, _ in entries) + reserve
+        for _, size, entry in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_size:
+                break
+            logger.info(f"Evicting cached artifact '{entry}'")
+            self._remove(entry)
+            total -= size
+
+    def copy_to(
+        self, cached: Path, dst_folder: Path, paths: Sequence[str] | None = None
+    ) -> None:
+        """Put the cached artifact, or only its `paths`, into `dst_folder`.
+
+        Files are reflinked or hardlinked where possible, see `Materializer`.
+        """
+        Materializer().materialize_tree(cached, dst_folder, paths)
+
+    def _read_meta(self, entry: Path) -> dict[str, Any] | None:
+        try:
+            with (entry / _META_FILE).open() as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not (entry / _DATA_DIR).is_dir():
+            return None
+        assert isinstance(meta, dict)
+        return meta
+
+    def _write_meta(self, entry: Path, meta: dict[str, Any]) -> None:
+        tmp = entry / f"{_META_FILE}.{uuid.uuid4().hex}"
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, entry / _META_FILE)
+
+    def _remove(self, entry: Path) -> None:
+        if not entry.exists():
+            return
+        # rename first, so readers never observe a half-removed entry
+        trash = self.root / _TMP_DIR / f"rm-{uuid.uuid4().hex}"
+        trash.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.replace(entry, trash)
+        except OSError:
+            return
+        shutil.rmtree(trash, ignore_errors=True)
+
+
+def _dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
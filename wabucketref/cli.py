@@ -1,15 +1,49 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Sequence
+from typing import TYPE_CHECKING, Sequence
 
 import click
 from click import Context
 
-from . import WaBucketRefAPI, __version__, parse_meta
+from . import __version__
+from .compression import CODEC_NAMES
+from .const import AUTO_JOBS, DEFAULT_JOBS
+from .server import DELEGATED_COMMANDS, SOCKET_ENV
+from .utils import parse_meta, parse_size
 
 
-@click.group()
+if TYPE_CHECKING:
+    from .api import WaBucketRefAPI
+    from .coordination import Shard
+
+
+def _parse_jobs(ctx: Context, param: click.Parameter, value: str) -> int:
+    """Positive number of jobs or `auto`."""
+    if str(value).lower() == "auto":
+        return AUTO_JOBS
+    try:
+        jobs = int(value)
+    except ValueError:
+        jobs = 0
+    if jobs < 1:
+        raise click.BadParameter(
+            f"{value!r} is neither a positive integer nor `auto`.", ctx, param
+        )
+    return jobs
+
+
+class _Group(click.Group):
+    def parse_args(self, ctx: Context, args: list[str]) -> list[str]:
+        # kept to pass the command line to the agent as is
+        ctx.meta[_ARGS_META] = list(args)
+        return super().parse_args(ctx, args)
+
+
+_ARGS_META = "wabucket.args"
+
+
+@click.group(cls=_Group)
 @click.version_option(
     version=__version__, message="W&B bucket artifacts package version: %(version)s"
 )
@@ -19,6 +53,8 @@ from . import WaBucketRefAPI, __version__, parse_meta
     help=(
         "Platform bucket ID or string name, which will be used to store the artifacts. "
         "If not set, the bucket with the name equal to the project name will be used. "
+        "A local directory, e.g. the bucket NFS mount, could be used instead "
+        "with `file:///path/to/dir` value. "
         "Each download or upload execution creates a dedicated W&B Run. "
         "All corresponding artifacts are attached to this run as either output "
         "(if uploading), or input (if downloading) for lineage. "
@@ -53,6 +89,96 @@ from . import WaBucketRefAPI, __version__, parse_meta
         "See https://docs.wandb.ai/ref/python/init for more details."
     ),
 )
+@click.option(
+    "--cache-dir",
+    type=Path,
+    envvar="WABUCKET_CACHE_DIR",
+    help=(
+        "Node-local directory to cache downloaded artifacts in. "
+        "Repeated downloads of the same artifact are served from the cache. "
+        "Alternatively, use the corresponding env var (`WABUCKET_CACHE_DIR`). "
+        "Caching is disabled if not set."
+    ),
+)
+@click.option(
+    "--cache-size",
+    type=str,
+    envvar="WABUCKET_CACHE_SIZE",
+    help=(
+        "Cache size limit, e.g. `100G`. Least recently used artifacts are "
+        "evicted once the limit is exceeded. Defaults to 50G."
+    ),
+)
+@click.option(
+    "--alias-ttl",
+    type=click.FloatRange(min=0),
+    envvar="WABUCKET_ALIAS_TTL",
+    help=(
+        "For how many seconds the resolved mutable aliases, like `latest`, "
+        "are cached locally. Immutable aliases (UUIDs, hashes, versions) "
+        "are cached forever. Defaults to 60, 0 disables the caching."
+    ),
+)
+@click.option(
+    "--direct-s3",
+    is_flag=True,
+    envvar="WABUCKET_DIRECT_S3",
+    help=(
+        "Transfer the files directly from and to the S3-compatible object store "
+        "behind the bucket, with the bucket credentials, using concurrent "
+        "multipart uploads and ranged downloads. Falls back to the platform SDK "
+        "if the credentials are not available."
+    ),
+)
+@click.option(
+    "--max-bandwidth",
+    type=str,
+    envvar="WABUCKET_MAX_BANDWIDTH",
+    help=(
+        "Cap the total transfer rate with the bucket, in bytes per second, "
+        "e.g. `100M`, so the uploads and downloads leave room for the other "
+        "workloads sharing the link. Unlimited by default."
+    ),
+)
+@click.option(
+    "--timings",
+    is_flag=True,
+    help=(
+        "Write durations of the command phases (W&B run start, bucket listing, "
+        "transfers, etc.), with the transferred bytes, files and retries, "
+        "as JSON lines to stderr."
+    ),
+)
+@click.option(
+    "--timings-file",
+    type=click.Path(dir_okay=False, path_type=Path),
+    envvar="WABUCKET_TIMINGS",
+    help="Append the phase durations, see `--timings`, to this file instead.",
+)
+@click.option(
+    "--timings-to-wandb",
+    is_flag=True,
+    envvar="WABUCKET_TIMINGS_WANDB",
+    help="Store the phase durations in the summary of the W&B run.",
+)
+@click.option(
+    "--defer-logging",
+    is_flag=True,
+    envvar="WABUCKET_DEFER_LOGGING",
+    help=(
+        "Record the uploaded and linked artifacts in the local journal "
+        "(`WABUCKET_JOURNAL_DIR`, `~/.cache/wabucket/journal` by default) and "
+        "return without waiting for W&B. The records are logged to W&B "
+        "by the background process, in batches. Those it fails to log "
+        "are logged by `wabucket flush`."
+    ),
+)
+@click.option(
+    "--no-daemon",
+    is_flag=True,
+    envvar="WABUCKET_NO_DAEMON",
+    help="Run the command in this process even if `wabucket serve` agent is running.",
+)
 @click.pass_context
 def main(
     ctx: Context,
@@ -61,6 +187,16 @@ def main(
     run_name: str | None,
     job_type: str | None,
     entity: str | None,
+    cache_dir: Path | None,
+    cache_size: str | None,
+    alias_ttl: float | None,
+    direct_s3: bool,
+    max_bandwidth: str | None,
+    timings: bool,
+    timings_file: Path | None,
+    timings_to_wandb: bool,
+    defer_logging: bool,
+    no_daemon: bool,
 ) -> None:
     """
     Upload to and download from platform buckets artifacts, stored in W&B.
@@ -68,19 +204,70 @@ def main(
     `bucket:<bucket_name>/<artifact_type>/<artifact_name>/<artifact_alias>`.
     The same path is assumed while downloading the bucket.
     """
-    api = WaBucketRefAPI(
-        bucket=bucket,
-        project_name=project_name,
-        entity=entity,
-    )
+    # set by the agent running the command
+    api_pool = ctx.obj["api_pool"] if ctx.obj else None
+    if (
+        api_pool is None
+        and not no_daemon
+        and ctx.invoked_subcommand in DELEGATED_COMMANDS
+    ):
+        from .server import delegate
+
+        exit_code = delegate(ctx.meta[_ARGS_META])
+        if exit_code is not None:
+            ctx.exit(exit_code)
     ctx.obj = {
-        "wabucket": api,
+        "api_pool": api_pool,
+        "wabucket": None,
+        "api_params": {
+            "bucket": bucket,
+            "project_name": project_name,
+            "entity": entity,
+            "cache_dir": cache_dir,
+            "cache_size": parse_size(cache_size) if cache_size else None,
+            "alias_ttl": alias_ttl,
+            "direct_s3": direct_s3,
+            "max_bandwidth": parse_size(max_bandwidth) if max_bandwidth else None,
+            "timings": timings_file or ("-" if timings else None),
+            "timings_to_wandb": timings_to_wandb,
+            "defer_logging": defer_logging,
+        },
         "run_params": {
             "w_run_name": run_name,
             "w_job_type": job_type,
         },
     }
-    ctx.call_on_close(api.close)
+
+
+def _get_shard(shard: bool) -> Shard | None:
+    if not shard:
+        return None
+    from .coordination import shard_from_env
+
+    try:
+        return shard_from_env()
+    except ValueError as e:
+        raise click.UsageError(str(e)) from None
+
+
+def _get_api(ctx: Context) -> WaBucketRefAPI:
+    """Create API client on the first use.
+
+    W&B and Apolo SDKs take seconds to import, so they are loaded
+    only if the command actually needs them, not for `--help` or `--version`.
+    """
+    api: WaBucketRefAPI | None = ctx.obj["wabucket"]
+    if api is None:
+        if ctx.obj["api_pool"] is not None:
+            # the agent keeps the clients open between the commands
+            api = ctx.obj["api_pool"].get(ctx.obj["api_params"])
+        else:
+            from .api import WaBucketRefAPI
+
+            api = WaBucketRefAPI(**ctx.obj["api_params"])
+            ctx.find_root().call_on_close(api.close)
+        ctx.obj["wabucket"] = api
+    return api
 
 
 @main.command()
@@ -110,7 +297,9 @@ def main(
         "will autogenerated in form of UUID (default behaviour). "
         "WaBucket could also use a SHA value computed of run's "
         "arguments if this option is set to `'!run-config-hash'`. "
-        "This could be used to prevent artifacts overwrites."
+        "This could be used to prevent artifacts overwrites. "
+        "Set it to `'!content-hash'` to use the digest of the uploaded files, "
+        "the upload is skipped if the same content is already in the bucket."
     ),
 )
 @click.option(
@@ -141,6 +330,46 @@ def main(
         "from within a single job."
     ),
 )
+@click.option(
+    "-j",
+    "--jobs",
+    type=str,
+    default=str(DEFAULT_JOBS),
+    callback=_parse_jobs,
+    metavar="INTEGER|auto",
+    show_default=True,
+    help=(
+        "Maximum number of files uploaded to the bucket in parallel. "
+        "`auto` adapts it to the throughput, backing off on errors."
+    ),
+)
+@click.option(
+    "--pack",
+    is_flag=True,
+    default=False,
+    help=(
+        "Stream the files into tar shards with an index instead of uploading "
+        "them one by one. Speeds up artifacts of many small files. "
+        "Packed artifacts are unpacked on download automatically."
+    ),
+)
+@click.option(
+    "--shard-size",
+    type=str,
+    default="256M",
+    show_default=True,
+    help="Approximate size of a tar shard in the `--pack` mode.",
+)
+@click.option(
+    "--compress",
+    "compression",
+    type=click.Choice(CODEC_NAMES),
+    default=None,
+    help=(
+        "Compress every file on its way to the bucket with the given codec. "
+        "Compressed artifacts are decompressed on download automatically."
+    ),
+)
 @click.pass_context
 def upload(
     ctx: Context,
@@ -151,17 +380,22 @@ def upload(
     metadata: Sequence[str],
     reff: bool,
     suffix: str | None,
+    jobs: int,
+    pack: bool,
+    shard_size: str,
+    compression: str | None,
 ) -> None:
     """
     Upload artifact from local folder to the bucket
     and store it's reference in W&B artifact
     """
-    ref_api: WaBucketRefAPI = ctx.obj["wabucket"]
+    ref_api = _get_api(ctx)
     meta = parse_meta(metadata)
-    ref_api.wandb_start_run(
-        w_run_name=ctx.obj["run_params"]["w_run_name"],
-        w_job_type=ctx.obj["run_params"]["w_job_type"],
-    )
+    if not (ref_api.defer_logging and reff):
+        ref_api.wandb_start_run(
+            w_run_name=ctx.obj["run_params"]["w_run_name"],
+            w_job_type=ctx.obj["run_params"]["w_job_type"],
+        )
 
     ref_api.upload_artifact(
         src_folder=Path(src_dir),
@@ -171,6 +405,10 @@ def upload(
         art_metadata=meta,
         as_refference=reff,
         suffix=suffix,
+        jobs=jobs,
+        pack=pack,
+        shard_size=parse_size(shard_size),
+        compression=compression,
     )
 
 
@@ -192,6 +430,82 @@ def upload(
     "--run_args",
     help=("Arguments of current run to store in W&B. "),
 )
+@click.option(
+    "--range-size",
+    type=str,
+    help=(
+        "Split files larger than this size, e.g. `256M`, into byte ranges, "
+        "which are downloaded concurrently and retried independently. "
+        "Speeds up downloads of the large single-file artifacts, "
+        "applies to the `--direct-s3` transfers only."
+    ),
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=str,
+    default=str(DEFAULT_JOBS),
+    callback=_parse_jobs,
+    metavar="INTEGER|auto",
+    show_default=True,
+    help=(
+        "Maximum number of files or ranges downloaded in parallel. "
+        "`auto` adapts it to the throughput, backing off on errors."
+    ),
+)
+@click.option(
+    "--include",
+    type=str,
+    multiple=True,
+    help=(
+        "Download only the files, which paths relative to the artifact root "
+        "match this glob pattern, e.g. `*.json`. Could be repeated."
+    ),
+)
+@click.option(
+    "--exclude",
+    type=str,
+    multiple=True,
+    help="Skip the files matching this glob pattern. Could be repeated.",
+)
+@click.option(
+    "--verify",
+    is_flag=True,
+    default=False,
+    help=(
+        "Check the downloaded files against the checksums recorded on upload, "
+        "hashing them in parallel."
+    ),
+)
+@click.option(
+    "--no-run",
+    is_flag=True,
+    default=False,
+    help=(
+        "Do not start a W&B run, resolve the artifact with the W&B public API. "
+        "Speeds up the start, but the artifact usage is not recorded."
+    ),
+)
+@click.option(
+    "--shared",
+    is_flag=True,
+    default=False,
+    help=(
+        "Coordinate with the other processes downloading to the same destination, "
+        "e.g. the ranks of a distributed training on the node, with file locks: "
+        "the first one downloads, the others wait and reuse the result."
+    ),
+)
+@click.option(
+    "--shard",
+    is_flag=True,
+    default=False,
+    help=(
+        "As `--shared`, but split the files across the processes by "
+        "`LOCAL_RANK` and `LOCAL_WORLD_SIZE` env vars, set by `torchrun`: "
+        "each one downloads its part and waits for the others."
+    ),
+)
 @click.pass_context
 def download(
     ctx: Context,
@@ -200,11 +514,19 @@ def download(
     artifact_alias: str,
     destination_folder: Path | None,
     run_args: str | None,
+    range_size: str | None,
+    jobs: int,
+    include: Sequence[str],
+    exclude: Sequence[str],
+    verify: bool,
+    no_run: bool,
+    shared: bool,
+    shard: bool,
 ) -> None:
     """
     Download artifact of specified type, name and version.
     """
-    ref_api: WaBucketRefAPI = ctx.obj["wabucket"]
+    ref_api = _get_api(ctx)
     if destination_folder is None:
         destination_folder = Path() / artifact_type / artifact_name / artifact_alias
     elif not destination_folder.exists():
@@ -214,16 +536,25 @@ def download(
             f"Destination '{destination_folder}' exists, but not a directory. "
             "Unable to download artifact there."
         )
-    ref_api.wandb_start_run(
-        w_run_name=ctx.obj["run_params"]["w_run_name"],
-        w_job_type=ctx.obj["run_params"]["w_job_type"],
-        run_args=run_args,
-    )
+    if not no_run:
+        ref_api.wandb_start_run(
+            w_run_name=ctx.obj["run_params"]["w_run_name"],
+            w_job_type=ctx.obj["run_params"]["w_job_type"],
+            run_args=run_args,
+        )
     ref_api.download_artifact(
         art_name=artifact_name,
         art_type=artifact_type,
         art_alias=artifact_alias,
         dst_folder=destination_folder,
+        range_size=parse_size(range_size) if range_size else None,
+        jobs=jobs,
+        verify=verify,
+        use_run=not no_run,
+        include=include,
+        exclude=exclude,
+        shared=shared,
+        shard=_get_shard(shard),
     )
 
 
@@ -289,7 +620,7 @@ def link(
     """
     Create Artifact in W&B system out of existing binaries in Neu.ro bucket.
     """
-    ref_api: WaBucketRefAPI = ctx.obj["wabucket"]
+    ref_api = _get_api(ctx)
     meta = parse_meta(metadata)
     ref_api.link(
         bucket_path=bucket_path,
@@ -299,3 +630,203 @@ def link(
         art_metadata=meta,
         suffix=suffix,
     )
+
+
+@main.command("upload-many")
+@click.argument(
+    "manifest", type=click.Path(exists=True, dir_okay=False, path_type=Path)
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=str,
+    default=str(DEFAULT_JOBS),
+    callback=_parse_jobs,
+    metavar="INTEGER|auto",
+    show_default=True,
+    help=(
+        "Maximum number of files uploaded to the bucket in parallel, "
+        "by all the artifacts together."
+    ),
+)
+@click.option(
+    "--shard-size",
+    type=str,
+    default="256M",
+    show_default=True,
+    help="Approximate size of a tar shard of the artifacts with `pack: true`.",
+)
+@click.pass_context
+def upload_many(ctx: Context, manifest: Path, jobs: int, shard_size: str) -> None:
+    """
+    Upload the artifacts listed in the YAML or JSON MANIFEST concurrently,
+    within a single W&B run. Each artifact is a mapping with `src`, `name`
+    and `type` keys and, optionally, `alias`, `metadata` (a mapping), `suffix`,
+    `pack` and `compress`, as the options of the `upload` command.
+    The Apolo-Flow outputs of each artifact are suffixed with its `suffix`,
+    or its name, and printed once all the uploads have finished.
+    """
+    from .bulk import load_uploads
+
+    artifacts = load_uploads(manifest)
+    ref_api = _get_api(ctx)
+    if not ref_api.defer_logging:
+        ref_api.wandb_start_run(
+            w_run_name=ctx.obj["run_params"]["w_run_name"],
+            w_job_type=ctx.obj["run_params"]["w_job_type"],
+        )
+    ref_api.upload_many(artifacts, jobs=jobs, shard_size=parse_size(shard_size))
+
+
+@main.command("download-many")
+@click.argument(
+    "manifest", type=click.Path(exists=True, dir_okay=False, path_type=Path)
+)
+@click.option(
+    "-a",
+    "--run_args",
+    help=("Arguments of current run to store in W&B. "),
+)
+@click.option(
+    "--range-size",
+    type=str,
+    help=(
+        "Split files larger than this size, e.g. `256M`, into byte ranges, "
+        "which are downloaded concurrently and retried independently, "
+        "applies to the `--direct-s3` transfers only."
+    ),
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=str,
+    default=str(DEFAULT_JOBS),
+    callback=_parse_jobs,
+    metavar="INTEGER|auto",
+    show_default=True,
+    help=(
+        "Maximum number of files or ranges downloaded in parallel, "
+        "by all the artifacts together."
+    ),
+)
+@click.option(
+    "--verify",
+    is_flag=True,
+    default=False,
+    help="Check the downloaded files against the checksums recorded on upload.",
+)
+@click.option(
+    "--no-run",
+    is_flag=True,
+    default=False,
+    help=(
+        "Do not start a W&B run, resolve the artifacts with the W&B public API. "
+        "Speeds up the start, but the artifact usage is not recorded."
+    ),
+)
+@click.option(
+    "--shared",
+    is_flag=True,
+    default=False,
+    help=(
+        "Coordinate with the other processes downloading to the same destination, "
+        "e.g. the ranks of a distributed training on the node, with file locks: "
+        "the first one downloads, the others wait and reuse the result."
+    ),
+)
+@click.option(
+    "--shard",
+    is_flag=True,
+    default=False,
+    help=(
+        "As `--shared`, but split the files across the processes by "
+        "`LOCAL_RANK` and `LOCAL_WORLD_SIZE` env vars, set by `torchrun`: "
+        "each one downloads its part and waits for the others."
+    ),
+)
+@click.pass_context
+def download_many(
+    ctx: Context,
+    manifest: Path,
+    run_args: str | None,
+    range_size: str | None,
+    jobs: int,
+    verify: bool,
+    no_run: bool,
+    shared: bool,
+    shard: bool,
+) -> None:
+    """
+    Download the artifacts listed in the YAML or JSON MANIFEST concurrently,
+    within a single W&B run. Each artifact is a mapping with `type`, `name`
+    and `alias` keys and, optionally, `destination` (defaults to
+    `./{type}/{name}/{alias}`), `include` and `exclude` glob patterns.
+    """
+    from .bulk import load_downloads
+
+    artifacts = load_downloads(manifest)
+    ref_api = _get_api(ctx)
+    if not no_run:
+        ref_api.wandb_start_run(
+            w_run_name=ctx.obj["run_params"]["w_run_name"],
+            w_job_type=ctx.obj["run_params"]["w_job_type"],
+            run_args=run_args,
+        )
+    ref_api.download_many(
+        artifacts,
+        range_size=parse_size(range_size) if range_size else None,
+        jobs=jobs,
+        verify=verify,
+        use_run=not no_run,
+        shared=shared,
+        shard=_get_shard(shard),
+    )
+
+
+@main.command()
+@click.pass_context
+def flush(ctx: Context) -> None:
+    """
+    Log the artifacts recorded in the journal by `--defer-logging` to W&B,
+    in batches, one W&B run per the run they were produced by.
+    Fails if some artifacts could not be logged, they are kept in the journal.
+    """
+    ref_api = _get_api(ctx)
+    left = ref_api.flush_journal()
+    if left:
+        raise click.ClickException(
+            f"{left} artifacts are not logged to W&B, they are kept in the journal."
+        )
+
+
+@main.command()
+@click.option(
+    "--socket",
+    "socket_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    envvar=SOCKET_ENV,
+    help=(
+        "Unix socket to listen on. Alternatively, use the corresponding env var "
+        f"(`{SOCKET_ENV}`), the CLI finds the agent with it. "
+        "Defaults to `~/.cache/wabucket/agent.sock`."
+    ),
+)
+@click.option(
+    "--idle-timeout",
+    type=click.FloatRange(min=0, min_open=True),
+    help=(
+        "Stop after this number of seconds without commands. "
+        "Runs until stopped by default."
+    ),
+)
+def serve(socket_path: Path | None, idle_timeout: float | None) -> None:
+    """
+    Run the agent, which keeps the platform client, resolved buckets,
+    W&B service and caches warm between the commands.
+    While it is running, `upload`, `download` and `link` commands are sent to it
+    and run there, one at a time, in the directory and environment of the caller,
+    each in its own W&B run. Pass `--no-daemon` to run a command in-process.
+    """
+    from .server import default_socket_path, serve as run_agent
+
+    run_agent(socket_path or default_socket_path(), idle_timeout)
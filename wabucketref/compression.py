@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+import zlib
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable
+
+
+CODEC_METADATA_KEY = "wabucket_codec"
+ZSTD_LEVEL = 3
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+@dataclass(frozen=True)
+class Codec:
+    name: str
+    suffix: str
+    compressobj: Callable[[], Any]
+    decompressobj: Callable[[], Any]
+
+
+def _zstd() -> Codec:
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError(
+            "zstd compression requires `zstandard` package, "
+            "install it with `pip install wabucketref[zstd]`."
+        ) from None
+    return Codec(
+        name="zstd",
+        suffix=".zst",
+        compressobj=lambda: zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj(),
+        decompressobj=lambda: zstandard.ZstdDecompressor().decompressobj(),
+    )
+
+
+def _gzip() -> Codec:
+    return Codec(
+        name="gzip",
+        suffix=".gz",
+        compressobj=lambda: zlib.compressobj(wbits=_GZIP_WBITS),
+        decompressobj=lambda: zlib.decompressobj(wbits=_GZIP_WBITS),
+    )
+
+
+_CODECS = {"zstd": _zstd, "gzip": _gzip}
+CODEC_NAMES = tuple(_CODECS)
+
+
+def get_codec(name: str) -> Codec:
+    try:
+        return _CODECS[name]()
+    except KeyError:
+        raise ValueError(
+            f"Unknown compression codec {name}, supported: {', '.join(CODEC_NAMES)}."
+        ) from None
+
+
+async def compress_stream(
+    chunks: AsyncIterator[bytes], codec: Codec
+) -> AsyncIterator[bytes]:
+    """Compress the stream on the fly, CPU-heavy work is done in the executor."""
+    loop = asyncio.get_running_loop()
+    compressor = codec.compressobj()
+    async for chunk in chunks:
+        data = await loop.run_in_executor(None, compressor.compress, chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def decompress_stream(
+    chunks: AsyncIterator[bytes], codec: Codec
+) -> AsyncIterator[bytes]:
+    """Decompress the stream on the fly.
+
+    Raises:
+        ServerTimeoutError: If the stream ends before the compressed data does,
+            so the download is retried.
+    """
+    loop = asyncio.get_running_loop()
+    decompressor = codec.decompressobj()
+    async for chunk in chunks:
+        data = await loop.run_in_executor(None, decompressor.decompress, chunk)
+        if data:
+            yield data
+    if not decompressor.eof:
+        from aiohttp import ServerTimeoutError
+
+        raise ServerTimeoutError(f"{codec.name} stream ended prematurely")
+
+
+def compress(data: bytes, codec: Codec) -> bytes:
+    compressor = codec.compressobj()
+    return bytes(compressor.compress(data) + compressor.flush())
+
+
+def decompress(data: bytes, codec: Codec) -> bytes:
+    decompressor = codec.decompressobj()
+    result = decompressor.decompress(data)
+    if not decompressor.eof:
+        raise ValueError(f"Truncated {codec.name} data")
+    return bytes(result)
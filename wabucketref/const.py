@@ -0,0 +1,5 @@
+# Kept apart from the modules importing apolo_sdk and wandb,
+# so the CLI could use them without loading the heavy dependencies.
+DEFAULT_JOBS = 8
+DEFAULT_RETRIES = 5
+AUTO_JOBS = 0  # adapt the number of concurrent transfers to the throughput
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+import zlib
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import IO, AsyncIterator, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+# set by torchrun for every process of the node
+LOCAL_RANK_ENV = "LOCAL_RANK"
+LOCAL_WORLD_SIZE_ENV = "LOCAL_WORLD_SIZE"
+DEFAULT_SHARD_TIMEOUT = 3600.0  # seconds
+_POLL_INTERVAL = 0.2  # seconds
+
+# rank of the process and the number of the processes splitting the download
+Shard = Tuple[int, int]
+
+
+def shard_from_env() -> Shard:
+    """Local rank and world size of the process, as set by `torchrun`."""
+    try:
+        rank = int(os.environ[LOCAL_RANK_ENV])
+        world_size = int(os.environ[LOCAL_WORLD_SIZE_ENV])
+    except (KeyError, ValueError):
+        raise ValueError(
+            f"{LOCAL_RANK_ENV} and {LOCAL_WORLD_SIZE_ENV} env vars should be set "
+            "to split the download across the processes."
+        ) from None
+    return check_shard((rank, world_size))
+
+
+def check_shard(shard: Shard) -> Shard:
+    rank, world_size = shard
+    if not 0 <= rank < world_size:
+        raise ValueError(f"Wrong rank {rank} of {world_size} processes.")
+    return shard
+
+
+def shard_of(path: str, world_size: int) -> int:
+    """Rank downloading the file, the same in every process."""
+    return zlib.crc32(path.encode("utf-8")) % world_size
+
+
+class SharedDownload:
+    """Coordinates the processes downloading the same artifact into the same
+    directory, e.g. the ranks of a distributed training on the node.
+
+    Either the first process to take the lock downloads the artifact,
+    while the others wait for it, or every process downloads its shard
+    of the files and waits for the other shards. The complete download is
+    marked with `key`, so the later processes reuse it, unless it is
+    the download of the other artifact version.
+
+    Layout, next to the directory:
+        .<name>.wabucket-lock
+        .<name>.wabucket-done  key of the complete download
+        .<name>.wabucket-shards/<rank>  key of the downloaded shard
+    """
+
+    def __init__(self, dst_folder: Path, key: str):
+        dst = dst_folder.resolve()
+        self._prefix = f".{dst.name}.wabucket"
+        self._root = dst.parent
+        self.key = key
+
+    @property
+    def _done_path(self) -> Path:
+        return self._root / f"{self._prefix}-done"
+
+    def _shard_path(self, rank: int) -> Path:
+        return self._root / f"{self._prefix}-shards" / str(rank)
+
+    def is_done(self) -> bool:
+        return _read(self._done_path) == self.key
+
+    def mark_done(self) -> None:
+        _write(self._done_path, self.key)
+
+    def is_shard_done(self, rank: int) -> bool:
+        return _read(self._shard_path(rank)) == self.key
+
+    def mark_shard_done(self, rank: int) -> None:
+        _write(self._shard_path(rank), self.key)
+
+    def wait_shards(
+        self, world_size: int, timeout: float = DEFAULT_SHARD_TIMEOUT
+    ) -> None:
+        """Block until all `world_size` shards are downloaded.
+
+        Raises:
+            TimeoutError: If some shards are not downloaded in `timeout` seconds,
+                e.g. their process has died.
+        """
+        deadline = time.monotonic() + timeout
+        pending = set(range(world_size))
+        while True:
+            pending = {rank for rank in pending if not self.is_shard_done(rank)}
+            if not pending:
+                return
+            if time.monotonic() > deadline:
+                raise TimeoutError(
+                    f"Shards {sorted(pending)} of {self._root / self._prefix} "
+                    f"were not downloaded in {timeout} seconds."
+                )
+            time.sleep(_POLL_INTERVAL)
+
+    def _acquire(self) -> IO[str]:
+        import fcntl
+
+        self._root.mkdir(parents=True, exist_ok=True)
+        f = open(self._root / f"{self._prefix}-lock", "w")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        except BaseException:
+            f.close()
+            raise
+        return f
+
+    @asynccontextmanager
+    async def locked(self) -> AsyncIterator[None]:
+        """Hold the lock, waiting for the process holding it, if any.
+        The lock is released by the OS if the process dies.
+        """
+        loop = asyncio.get_running_loop()
+        f = await loop.run_in_executor(None, self._acquire)
+        try:
+            yield
+        finally:
+            # closing the file releases the lock
+            f.close()
+
+
+def _read(path: Path) -> str | None:
+    try:
+        return path.read_text()
+    except FileNotFoundError:
+        return None
+
+
+def _write(path: Path, value: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+    tmp.write_text(value)
+    os.replace(tmp, path)
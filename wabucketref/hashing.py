@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Mapping, Sequence
+
+
+HASH_BUFFER_SIZE = 16 * 1024 * 1024  # 16 MB
+
+
+def file_sha256(path: Path, buffer: bytearray | None = None) -> str:
+    """SHA256 hex digest of the file contents.
+
+    Pass preallocated `buffer` to avoid allocating it for every file.
+    """
+    if buffer is None:
+        buffer = bytearray(HASH_BUFFER_SIZE)
+    view = memoryview(buffer)
+    hasher = hashlib.sha256()
+    with path.open("rb", buffering=0) as stream:
+        read = stream.readinto(buffer)
+        while read:
+            hasher.update(view[:read])
+            read = stream.readinto(buffer)
+    return hasher.hexdigest()
+
+
+def hash_files(
+    root: Path, paths: Sequence[str], workers: int | None = None
+) -> dict[str, str]:
+    """SHA256 of `paths`, relative to `root`, computed in a thread pool.
+
+    hashlib releases GIL while hashing large buffers, so the threads
+    utilize several cores. Every thread reuses its own buffer.
+    """
+    local = threading.local()
+
+    def _hash(path: str) -> str:
+        if not hasattr(local, "buffer"):
+            local.buffer = bytearray(HASH_BUFFER_SIZE)
+        return file_sha256(root / path, local.buffer)
+
+    if workers is None:
+        workers = min(32, (os.cpu_count() or 1) + 4)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(paths, pool.map(_hash, paths)))
+
+
+def files_digest(file_hashes: Mapping[str, str]) -> str:
+    """Deterministic digest of the directory out of its files' relative paths
+    and content hashes.
+    """
+    hasher = hashlib.sha256()
+    for path in sorted(file_hashes):
+        hasher.update(f"{path}\0{file_hashes[path]}\n".encode())
+    return hasher.hexdigest()
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Iterator, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_DIR_ENV = "WABUCKET_JOURNAL_DIR"
+DEFER_LOGGING_ENV = "WABUCKET_DEFER_LOGGING"
+
+_LOCK_FILE = ".lock"
+
+# entity, project, run ID and tags of the run to log the artifact to
+RunKey = Tuple[Optional[str], Optional[str], Optional[str], Tuple[str, ...]]
+
+
+@dataclass(frozen=True)
+class ArtifactRecord:
+    """W&B artifact referring the bucket blob, which is not logged yet."""
+
+    name: str
+    type: str
+    alias: str
+    uri: str
+    metadata: dict[str, Any] = field(default_factory=dict)
+    entity: str | None = None
+    project: str | None = None
+    # the run the artifact was produced by, a new run is started if not set
+    run_id: str | None = None
+    # of the new run
+    tags: list[str] | None = None
+
+    @property
+    def run_key(self) -> RunKey:
+        return (self.entity, self.project, self.run_id, tuple(self.tags or ()))
+
+
+class Journal:
+    """Durable queue of the artifacts to be logged to W&B.
+
+    Every record is written to a temporary file, synced and renamed, so a crash
+    leaves either the complete record or none. Records are removed once the
+    artifact is committed to W&B, i.e. they are logged at least once;
+    logging the same reference again yields the same artifact version.
+
+    Layout:
+        <root>/<time_ns>-<uuid>.json
+        <root>/.<time_ns>-<uuid>.json  record being written
+        <root>/.lock  held while the records are flushed
+    """
+
+    def __init__(self, root: Path):
+        self.root = root.expanduser()
+
+    @classmethod
+    def from_env(cls) -> Journal:
+        root = os.environ.get(JOURNAL_DIR_ENV)
+        if root is None:
+            cache_home = os.environ.get("XDG_CACHE_HOME", "~/.cache")
+            root = os.path.join(cache_home, "wabucket", "journal")
+        return cls(Path(root))
+
+    def append(self, record: ArtifactRecord) -> Path:
+        self.root.mkdir(parents=True, exist_ok=True)
+        name = f"{time.time_ns():020d}-{uuid.uuid4().hex}.json"
+        tmp = self.root / f".{name}"
+        with tmp.open("w") as f:
+            json.dump(asdict(record), f)
+            f.flush()
+            os.fsync(f.fileno())
+        path = self.root / name
+        os.replace(tmp, path)
+        # the rename itself survives the crash once the directory is synced
+        fd = os.open(self.root, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        return path
+
+    def pending(self) -> list[tuple[Path, ArtifactRecord]]:
+        """Records in the order they were appended."""
+        if not self.root.is_dir():
+            return []
+        records = []
+        for path in sorted(self.root.glob("*.json")):
+            if path.name.startswith("."):
+                continue
+            try:
+                record = ArtifactRecord(**json.loads(path.read_text()))
+            except FileNotFoundError:
+                continue  # flushed meanwhile
+            except (OSError, ValueError, TypeError) as e:
+                logger.warning(f"Skipping broken journal record {path}: {e}")
+                continue
+            records.append((path, record))
+        return records
+
+    def remove(self, path: Path) -> None:
+        with contextlib.suppress(FileNotFoundError):
+            path.unlink()
+
+    @contextlib.contextmanager
+    def lock(self) -> Iterator[None]:
+        """Serialize the flushes, so the concurrent ones do not log
+        the same records twice.
+        """
+        import fcntl
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / _LOCK_FILE, "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import shutil
+import uuid
+from contextlib import asynccontextmanager
+from functools import partial
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Iterable
+
+from yarl import URL
+
+from .backends import FileInfo
+from .compression import Codec
+from .const import DEFAULT_RETRIES
+from .manifest import FileRecord, RecordHasher
+from .transfer import READ_CHUNK_SIZE, JobRunner, TransferStats
+
+
+logger = logging.getLogger(__name__)
+
+
+class LocalBackend(JobRunner):
+    """Storage backend of the artifacts kept in a local directory,
+    e.g. an NFS mount of the bucket, addressed by `file://` URIs.
+
+    Transfers are plain file copies, running in the thread pool,
+    at most `jobs` of them concurrently. Files are written under a temporary
+    name and renamed once complete, so readers never observe partial files.
+    """
+
+    async def exists(self, uri: URL) -> bool:
+        return await _in_thread(local_path(uri).is_dir)
+
+    async def list_files(self, root: URL) -> list[FileInfo]:
+        return await _in_thread(self._list_files, local_path(root))
+
+    def _list_files(self, root: Path) -> list[FileInfo]:
+        result = []
+        for file in sorted(root.rglob("*")):
+            if file.is_file() and not _is_temporary(file):
+                stat = file.stat()
+                result.append(
+                    FileInfo(
+                        file.relative_to(root).as_posix(), stat.st_size, stat.st_mtime
+                    )
+                )
+        return result
+
+    async def upload_files(
+        self,
+        src: Path,
+        dst: URL,
+        paths: Iterable[str],
+        codec: Codec | None = None,
+        records: dict[str, FileRecord] | None = None,
+    ) -> TransferStats:
+        """See `TransferEngine.upload_files()`."""
+        root = local_path(dst)
+
+        def _upload(path: str) -> int:
+            src_file = src / path
+            dst_file = _with_suffix(root / path, codec)
+            if records is None:
+                return _copy_file(src_file, dst_file, codec)
+            hasher = RecordHasher(path, src_file)
+            size = _copy_file(src_file, dst_file, codec, on_chunk=hasher.update)
+            records[path] = hasher.record()
+            return size
+
+        return await self.run(partial(_in_thread, _upload, path) for path in paths)
+
+    async def download_dir(
+        self,
+        src: URL,
+        dst: Path,
+        range_size: int | None = None,
+        retries: int = DEFAULT_RETRIES,
+        codec: Codec | None = None,
+        on_file_done: Callable[[str], None] | None = None,
+        selected: Callable[[str], bool] | None = None,
+    ) -> TransferStats:
+        """Copy all files under `src` into `dst` directory.
+
+        See `TransferEngine.download_dir()` for the arguments,
+        `range_size` and `retries` are not applicable to the local copies.
+        """
+        root = local_path(src)
+
+        async def _download(src_file: Path, path: str, codec: Codec | None) -> int:
+            size = await _in_thread(
+                _copy_file, src_file, dst / path, codec, decompress=True
+            )
+            if on_file_done is not None:
+                on_file_done(path)
+            return size
+
+        jobs = []
+        for info in await self.list_files(src):
+            path = info.path
+            file_codec = None
+            if codec is not None and path.endswith(codec.suffix):
+                file_codec = codec
+                path = path[: len(path) - len(codec.suffix)]
+            if selected is None or selected(path):
+                jobs.append(partial(_download, root / info.path, path, file_codec))
+        dst.mkdir(parents=True, exist_ok=True)
+        return await self.run(jobs)
+
+    async def delete_files(
+        self, root: URL, paths: Iterable[str], codec: Codec | None = None
+    ) -> TransferStats:
+        base = local_path(root)
+
+        async def _delete(path: str) -> int:
+            await _in_thread(_with_suffix(base / path, codec).unlink, missing_ok=True)
+            return 0
+
+        return await self.run(partial(_delete, path) for path in paths)
+
+    async def delete_dir(self, root: URL) -> None:
+        await _in_thread(shutil.rmtree, local_path(root), ignore_errors=True)
+
+    async def read_blob(self, uri: URL) -> bytes | None:
+        try:
+            return await _in_thread(local_path(uri).read_bytes)
+        except FileNotFoundError:
+            return None
+
+    async def write_blob(self, uri: URL, data: bytes) -> None:
+        await _in_thread(_write_atomic, local_path(uri), [data])
+
+    async def write_stream(self, uri: URL, chunks: AsyncIterator[bytes]) -> None:
+        path = local_path(uri)
+        tmp = _temporary(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        loop = asyncio.get_running_loop()
+        try:
+            with tmp.open("wb") as f:
+                async for chunk in chunks:
+                    await loop.run_in_executor(None, f.write, chunk)
+            os.replace(tmp, path)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    @asynccontextmanager
+    async def read_stream(
+        self, uri: URL, offset: int = 0
+    ) -> AsyncIterator[AsyncIterator[bytes]]:
+        loop = asyncio.get_running_loop()
+        with local_path(uri).open("rb") as f:
+            f.seek(offset)
+
+            async def _it() -> AsyncIterator[bytes]:
+                while True:
+                    chunk = await loop.run_in_executor(None, f.read, READ_CHUNK_SIZE)
+                    if not chunk:
+                        return
+                    yield chunk
+
+            yield _it()
+
+
+def local_path(uri: URL) -> Path:
+    if uri.scheme != "file":
+        raise ValueError(f"Local storage supports file:// URIs only, got {uri}.")
+    return Path(uri.path)
+
+
+async def _in_thread(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, partial(func, *args, **kwargs))
+
+
+_TMP_PREFIX = ".wabucket-tmp-"
+
+
+def _temporary(path: Path) -> Path:
+    return path.with_name(f"{_TMP_PREFIX}{uuid.uuid4().hex}-{path.name}")
+
+
+def _is_temporary(path: Path) -> bool:
+    return path.name.startswith(_TMP_PREFIX)
+
+
+def _with_suffix(path: Path, codec: Codec | None) -> Path:
+    return path.with_name(path.name + codec.suffix) if codec is not None else path
+
+
+def _copy_file(
+    src: Path,
+    dst: Path,
+    codec: Codec | None = None,
+    decompress: bool = False,
+    on_chunk: Callable[[bytes], None] | None = None,
+) -> int:
+    """Copy `src` file to `dst`, (de)compressing it with `codec` if it is given,
+    and return the number of bytes read from `src`.
+    `on_chunk`, e.g. the hasher of the file, is called with every chunk read.
+    """
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = _temporary(dst)
+    try:
+        if codec is None and on_chunk is None:
+            shutil.copyfile(src, tmp)
+            size = tmp.stat().st_size
+        else:
+            size = 0
+            coder: Any = None
+            transform: Callable[[bytes], bytes] = bytes
+            if codec is not None and decompress:
+                coder = codec.decompressobj()
+                transform = coder.decompress
+            elif codec is not None:
+                coder = codec.compressobj()
+                transform = coder.compress
+            with src.open("rb") as fin, tmp.open("wb") as fout:
+                for chunk in iter(partial(fin.read, READ_CHUNK_SIZE), b""):
+                    size += len(chunk)
+                    if on_chunk is not None:
+                        on_chunk(chunk)
+                    fout.write(transform(chunk))
+                if codec is not None and not decompress:
+                    fout.write(coder.flush())
+                elif codec is not None and not coder.eof:
+                    raise ValueError(f"{src} is truncated {codec.name} data")
+        os.replace(tmp, dst)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return size
+
+
+def _write_atomic(path: Path, chunks: Iterable[bytes]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = _temporary(path)
+    try:
+        with tmp.open("wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import threading
+import warnings
+from typing import Any, Coroutine, TypeVar
+
+
+_T = TypeVar("_T")
+
+
+class LoopThread:
+    """Event loop running in the dedicated daemon thread.
+
+    Unlike `asyncio.run()`-like runners, the loop keeps running between the calls,
+    so the coroutines submitted with `submit()` progress in the background.
+    """
+
+    def __init__(self) -> None:
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._executor: concurrent.futures.ThreadPoolExecutor | None = None
+
+    @property
+    def started(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        assert self._thread is None, "Loop was already started"
+        self._loop = asyncio.new_event_loop()
+        self._executor = concurrent.futures.ThreadPoolExecutor()
+        self._loop.set_default_executor(self._executor)
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="wabucket-loop", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, coro: Coroutine[Any, Any, _T]) -> concurrent.futures.Future[_T]:
+        if self._thread is None:
+            self.start()
+        assert self._loop is not None
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run(self, coro: Coroutine[Any, Any, _T]) -> _T:
+        """Run the coroutine in the loop thread and wait for its result."""
+        future = self.submit(coro)
+        try:
+            return future.result()
+        except BaseException:
+            # e.g. KeyboardInterrupt in the waiting thread
+            future.cancel()
+            raise
+
+    def stop(self) -> None:
+        if self._thread is None or self._loop is None:
+            return
+        loop = self._loop
+        self.run(self._shutdown())
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", ResourceWarning)
+            loop.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        self._thread = None
+        self._loop = None
+        self._executor = None
+
+    async def _shutdown(self) -> None:
+        current = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.get_running_loop().shutdown_asyncgens()
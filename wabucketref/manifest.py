@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+from typing import Callable, Dict, Mapping, Optional
+
+from yarl import URL
+
+from .hashing import files_digest, hash_files
+
+
+MANIFEST_SUFFIX = ".wabucket-manifest.json"
+MANIFEST_VERSION = 1
+DIGEST_METADATA_KEY = "wabucket_digest"
+
+
+@dataclass(frozen=True)
+class FileRecord:
+    path: str
+    size: int
+    mtime: float
+    sha256: str
+
+
+_RECORD_FIELDS = {f.name for f in fields(FileRecord)}
+
+
+@dataclass
+class Manifest:
+    """List of the artifact files, stored next to the artifact blob directory.
+
+    Allows to re-upload only the changed files on artifact overwrite.
+    `codec` is the compression the files are stored with, if any.
+    """
+
+    files: Dict[str, FileRecord]
+    codec: Optional[str] = None
+
+    @classmethod
+    def build(
+        cls, src: Path, previous: Manifest | None = None, codec: str | None = None
+    ) -> Manifest:
+        """Describe `src` directory contents.
+
+        Content hash of the file is reused from `previous` manifest
+        if the file size and modification time have not changed.
+        """
+        stats = {
+            f.relative_to(src).as_posix(): f.stat()
+            for f in sorted(src.rglob("*"))
+            if f.is_file()
+        }
+        hashes = {}
+        for path, stat in stats.items():
+            old = previous.files.get(path) if previous else None
+            if old and old.size == stat.st_size and old.mtime == stat.st_mtime:
+                hashes[path] = old.sha256
+        hashes.update(hash_files(src, [p for p in stats if p not in hashes]))
+        return cls(
+            {
+                path: FileRecord(path, stat.st_size, stat.st_mtime, hashes[path])
+                for path, stat in stats.items()
+            },
+            codec,
+        )
+
+    def verify(
+        self, root: Path, selected: Callable[[str], bool] | None = None
+    ) -> list[str]:
+        """Paths of the files under `root`, which are missing
+        or do not match the recorded size and content hash.
+
+        Only the files accepted by `selected` predicate are checked, if it is set.
+        """
+        mismatched = []
+        present = []
+        for path, record in self.files.items():
+            if selected is not None and not selected(path):
+                continue
+            file = root / path
+            if not file.is_file() or file.stat().st_size != record.size:
+                mismatched.append(path)
+            else:
+                present.append(path)
+        hashes = hash_files(root, present)
+        mismatched.extend(p for p in present if hashes[p] != self.files[p].sha256)
+        return sorted(mismatched)
+
+    def digest(self) -> str:
+        """Digest of the relative paths and contents of the files."""
+        return files_digest({path: r.sha256 for path, r in self.files.items()})
+
+    def check_uploaded(self, records: Mapping[str, FileRecord]) -> None:
+        """Make sure the uploaded files, described by `records`,
+        are the ones this manifest was built of.
+
+        Raises:
+            RuntimeError: If a file was modified after it was hashed.
+        """
+        for path, record in records.items():
+            expected = self.files[path]
+            if (record.size, record.sha256) != (expected.size, expected.sha256):
+                raise RuntimeError(f"File {path} was modified while uploading")
+
+    def diff(self, old: Manifest) -> tuple[list[str], list[str]]:
+        """Paths to upload and to delete to turn `old` artifact into this one."""
+        changed = [
+            path
+            for path, record in self.files.items()
+            if path not in old.files
+            or (old.files[path].size, old.files[path].sha256)
+            != (record.size, record.sha256)
+        ]
+        removed = [path for path in old.files if path not in self.files]
+        return changed, removed
+
+    def dumps(self) -> bytes:
+        return json.dumps(
+            {
+                "version": MANIFEST_VERSION,
+                "files": [asdict(record) for record in self.files.values()],
+                "codec": self.codec,
+            }
+        ).encode("utf-8")
+
+    @classmethod
+    def loads(cls, data: bytes) -> Manifest:
+        """Parse the stored manifest, `ValueError` is raised if it is malformed."""
+        payload = json.loads(data)
+        if not isinstance(payload, dict):
+            raise ValueError("Manifest is not a JSON object")
+        if payload.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported manifest version {payload.get('version')}")
+        files = payload.get("files")
+        if not isinstance(files, list):
+            raise ValueError("Manifest files are not a list")
+        codec = payload.get("codec")
+        if codec is not None and not isinstance(codec, str):
+            raise ValueError(f"Wrong manifest codec {codec!r}")
+        records = [_load_record(item) for item in files]
+        return cls({record.path: record for record in records}, codec)
+
+
+def _load_record(item: object) -> FileRecord:
+    valid = (
+        isinstance(item, dict)
+        and set(item) == _RECORD_FIELDS
+        and isinstance(item["path"], str)
+        and isinstance(item["size"], int)
+        and not isinstance(item["size"], bool)
+        and isinstance(item["mtime"], (int, float))
+        and isinstance(item["sha256"], str)
+    )
+    if not valid:
+        raise ValueError(f"Wrong manifest file record {item!r}")
+    return FileRecord(**item)  # type: ignore[arg-type]
+
+
+class RecordHasher:
+    """Builds `FileRecord` of the file out of the chunks read for its upload,
+    so the checksum is of the uploaded bytes and the file is read only once.
+    """
+
+    def __init__(self, path: str, src: Path):
+        self.path = path
+        self.mtime = src.stat().st_mtime
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+
+    def update(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        self._sha256.update(chunk)
+
+    def record(self) -> FileRecord:
+        return FileRecord(self.path, self.size, self.mtime, self._sha256.hexdigest())
+
+
+def local_files(src: Path) -> list[str]:
+    """Relative paths of the files under `src` directory."""
+    return [
+        f.relative_to(src).as_posix() for f in sorted(src.rglob("*")) if f.is_file()
+    ]
+
+
+def manifest_uri(artifact_root: URL) -> URL:
+    return URL(str(artifact_root).rstrip("/") + MANIFEST_SUFFIX)
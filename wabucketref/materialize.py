@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import stat
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Iterable
+
+
+logger = logging.getLogger(__name__)
+
+FICLONE = 0x40049409  # linux/fs.h, _IOW(0x94, 9, int)
+
+REFLINK = "reflink"
+HARDLINK = "hardlink"
+COPY = "copy"
+
+
+class Materializer:
+    """Populates the destination with the files of a local artifact copy,
+    e.g. a cached one, without duplicating the data where possible.
+
+    Files are cloned with reflinks (copy-on-write) if the file system supports
+    them, otherwise hardlinked and marked read-only, so the shared data could not
+    be modified through the destination. Plain copy is the last resort.
+    The methods, which failed once, are not tried again for the other files.
+    """
+
+    def __init__(self, hardlinks: bool = True):
+        self._methods = [REFLINK] if sys.platform.startswith("linux") else []
+        if hardlinks:
+            self._methods.append(HARDLINK)
+        self.stats: Counter[str] = Counter()
+
+    def materialize_tree(
+        self, src: Path, dst: Path, paths: Iterable[str] | None = None
+    ) -> None:
+        if paths is None:
+            paths = [
+                f.relative_to(src).as_posix() for f in src.rglob("*") if f.is_file()
+            ]
+        for path in paths:
+            self.materialize(src / path, dst / path)
+        if self.stats:
+            logger.info(
+                "Materialized files: "
+                + ", ".join(f"{n} by {method}" for method, n in self.stats.items())
+            )
+
+    def materialize(self, src: Path, dst: Path) -> str:
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        if dst.exists() or dst.is_symlink():
+            dst.unlink()
+        for method in list(self._methods):
+            try:
+                if method == REFLINK:
+                    _reflink(src, dst)
+                else:
+                    _hardlink(src, dst)
+            except OSError as e:
+                logger.debug(f"Failed to {method} {src} -> {dst}: {e}")
+                self._methods.remove(method)
+                continue
+            self.stats[method] += 1
+            return method
+        shutil.copy2(src, dst)
+        self.stats[COPY] += 1
+        return COPY
+
+
+def _reflink(src: Path, dst: Path) -> None:
+    import fcntl
+
+    try:
+        with src.open("rb") as s, dst.open("wb") as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        shutil.copystat(src, dst)
+    except OSError:
+        dst.unlink(missing_ok=True)
+        raise
+
+
+def _hardlink(src: Path, dst: Path) -> None:
+    # the inode is shared, so the source becomes read-only as well
+    mode = src.stat().st_mode
+    read_only = mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH)
+    if mode != read_only:
+        os.chmod(src, read_only)
+    os.link(src, dst)
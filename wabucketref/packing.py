@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import tarfile
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, List, Sequence
+
+from aiohttp import ServerTimeoutError
+from yarl import URL
+
+from .backends import StorageBackend
+from .const import DEFAULT_RETRIES
+from .manifest import FileRecord, RecordHasher
+from .transfer import TransferStats, read_chunks
+
+
+logger = logging.getLogger(__name__)
+
+PACK_INDEX_NAME = ".wabucket-pack-index.json.gz"
+PACK_INDEX_VERSION = 1
+DEFAULT_SHARD_SIZE = 256 * 1024**2  # 256 MB
+
+_BLOCK = tarfile.BLOCKSIZE
+_END_OF_ARCHIVE = tarfile.NUL * _BLOCK * 2
+
+
+@dataclass(frozen=True)
+class PackedMember:
+    path: str
+    shard: int
+    offset: int  # of the member data within the shard
+    size: int
+
+
+@dataclass
+class PackIndex:
+    """Location of every packed file within the tar shards.
+
+    Stored gzipped under the artifact root, so the packed artifacts are recognized
+    on download and any single file could be fetched with one ranged read.
+    """
+
+    shards: List[str]
+    members: Dict[str, PackedMember]
+
+    def dumps(self) -> bytes:
+        payload = {
+            "version": PACK_INDEX_VERSION,
+            "shards": self.shards,
+            "members": [
+                [m.path, m.shard, m.offset, m.size] for m in self.members.values()
+            ],
+        }
+        return gzip.compress(json.dumps(payload, separators=(",", ":")).encode())
+
+    @classmethod
+    def loads(cls, data: bytes) -> PackIndex:
+        payload = json.loads(gzip.decompress(data))
+        if payload.get("version") != PACK_INDEX_VERSION:
+            raise ValueError(f"Unsupported pack index version {payload.get('version')}")
+        members = [PackedMember(*item) for item in payload["members"]]
+        return cls(payload["shards"], {m.path: m for m in members})
+
+    def shard_members(self, shard: int) -> list[PackedMember]:
+        return sorted(
+            (m for m in self.members.values() if m.shard == shard),
+            key=lambda m: m.offset,
+        )
+
+
+@dataclass(frozen=True)
+class _ShardEntry:
+    member: PackedMember
+    header: bytes
+
+
+def _plan_shards(
+    src: Path, paths: Sequence[str], shard_size: int
+) -> tuple[PackIndex, list[list[_ShardEntry]]]:
+    """Split files into shards and compute their offsets ahead of the upload,
+    so the shards could be streamed to the bucket without staging on disk.
+    """
+    shards: list[list[_ShardEntry]] = []
+    members: dict[str, PackedMember] = {}
+    shard_offset = 0
+    for path in sorted(paths):
+        stat = (src / path).stat()
+        info = tarfile.TarInfo(path)
+        info.size = stat.st_size
+        info.mtime = int(stat.st_mtime)
+        info.mode = stat.st_mode & 0o777
+        header = info.tobuf(format=tarfile.PAX_FORMAT)
+        total = len(header) + _padded(stat.st_size)
+        if not shards or (shard_offset and shard_offset + total > shard_size):
+            shards.append([])
+            shard_offset = 0
+        member = PackedMember(
+            path, len(shards) - 1, shard_offset + len(header), stat.st_size
+        )
+        shards[-1].append(_ShardEntry(member, header))
+        members[path] = member
+        shard_offset += total
+    names = [f"shard-{i:05d}.tar" for i in range(len(shards))]
+    return PackIndex(names, members), shards
+
+
+def _padded(size: int) -> int:
+    return (size + _BLOCK - 1) // _BLOCK * _BLOCK
+
+
+async def _shard_stream(
+    src: Path,
+    entries: list[_ShardEntry],
+    records: dict[str, FileRecord] | None = None,
+) -> AsyncIterator[bytes]:
+    for entry in entries:
+        path = entry.member.path
+        hasher = RecordHasher(path, src / path) if records is not None else None
+        yield entry.header
+        written = 0
+        async for chunk in read_chunks(
+            src / path, hasher.update if hasher is not None else None
+        ):
+            written += len(chunk)
+            if written > entry.member.size:
+                break
+            yield chunk
+        if written != entry.member.size:
+            raise RuntimeError(f"File {entry.member.path} was modified while packing")
+        if records is not None and hasher is not None:
+            records[path] = hasher.record()
+        yield tarfile.NUL * (_padded(written) - written)
+    yield _END_OF_ARCHIVE
+
+
+async def pack_upload(
+    engine: StorageBackend,
+    src: Path,
+    paths: Sequence[str],
+    dst: URL,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    retries: int = DEFAULT_RETRIES,
+    records: dict[str, FileRecord] | None = None,
+) -> TransferStats:
+    """Stream files into tar shards of about `shard_size` bytes under `dst`
+    and write the index of the packed files. Failed shards are packed
+    and uploaded again. See `TransferEngine.upload_files()` for `records`.
+    """
+    index, shards = _plan_shards(src, paths, shard_size)
+    logger.info(f"Packing {len(index.members)} files into {len(shards)} shards")
+
+    async def _upload_shard(shard: int) -> int:
+        await engine.write_stream(
+            dst / index.shards[shard], _shard_stream(src, shards[shard], records)
+        )
+        return sum(e.member.size for e in shards[shard])
+
+    stats = await engine.run(
+        partial(engine.retry, partial(_upload_shard, shard), retries)
+        for shard in range(len(shards))
+    )
+    await engine.write_blob(dst / PACK_INDEX_NAME, index.dumps())
+    stats.files = len(index.members)
+    return stats
+
+
+async def read_pack_index(engine: StorageBackend, root: URL) -> PackIndex | None:
+    data = await engine.read_blob(root / PACK_INDEX_NAME)
+    return PackIndex.loads(data) if data is not None else None
+
+
+async def unpack_download(
+    engine: StorageBackend,
+    src: URL,
+    index: PackIndex,
+    dst: Path,
+    retries: int = DEFAULT_RETRIES,
+    selected: Callable[[str], bool] | None = None,
+) -> TransferStats:
+    """Download the shards concurrently, unpacking them while streaming.
+
+    If `selected` predicate is set, only the shards with the files
+    it accepts are downloaded, and only those files are unpacked.
+    """
+    shard_members = [
+        [m for m in index.shard_members(shard) if selected is None or selected(m.path)]
+        for shard in range(len(index.shards))
+    ]
+    files = 0
+    for members in shard_members:
+        for member in members:
+            dst_file = dst / member.path
+            dst_file.parent.mkdir(parents=True, exist_ok=True)
+            dst_file.unlink(missing_ok=True)  # might be a link to the cached copy
+            dst_file.touch()
+            files += 1
+
+    jobs = [
+        partial(
+            engine.retry,
+            partial(_unpack_shard, engine, src / name, shard_members[shard], dst),
+            retries,
+        )
+        for shard, name in enumerate(index.shards)
+        if shard_members[shard]
+    ]
+    stats = await engine.run(jobs)
+    stats.files = files
+    return stats
+
+
+async def _unpack_shard(
+    engine: StorageBackend, shard_uri: URL, members: list[PackedMember], dst: Path
+) -> int:
+    pending = [m for m in members if m.size]
+    if not pending:
+        return 0
+    position = 0
+    current = 0
+    f = (dst / pending[0].path).open("wb")
+    try:
+        async with engine.read_stream(shard_uri) as it:
+            async for chunk in it:
+                chunk_start = position
+                position += len(chunk)
+                while current < len(pending):
+                    member = pending[current]
+                    start = max(member.offset, chunk_start)
+                    end = min(member.offset + member.size, position)
+                    if end > start:
+                        lo, hi = start - chunk_start, end - chunk_start
+                        f.write(chunk[lo:hi])
+                    if member.offset + member.size > position:
+                        break  # the rest of the member is in the next chunks
+                    f.close()
+                    current += 1
+                    if current < len(pending):
+                        f = (dst / pending[current].path).open("wb")
+                if current == len(pending):
+                    break  # the rest is tar padding
+    finally:
+        f.close()
+    if current < len(pending):
+        # a dropped connection, retried as the other transfer errors
+        raise ServerTimeoutError(f"Shard {shard_uri} ended prematurely at {position}")
+    return sum(m.size for m in pending)
+
+
+async def read_member(
+    engine: StorageBackend,
+    root: URL,
+    index: PackIndex,
+    path: str,
+    retries: int = DEFAULT_RETRIES,
+) -> bytes:
+    """Fetch a single packed file with the ranged read of its shard.
+
+    `FileNotFoundError` is raised if the file is not packed.
+    """
+    if path not in index.members:
+        raise FileNotFoundError(f"{root / path} does not exist.")
+    member = index.members[path]
+    shard_uri = root / index.shards[member.shard]
+    chunks: list[bytes] = []
+
+    async def _read() -> int:
+        chunks.clear()
+        remaining = member.size
+        async with engine.read_stream(shard_uri, member.offset) as it:
+            async for chunk in it:
+                chunks.append(chunk[:remaining])
+                remaining -= len(chunks[-1])
+                if not remaining:
+                    break
+        if remaining:
+            raise ServerTimeoutError(f"Shard {shard_uri} ended prematurely")
+        return member.size
+
+    await engine.retry(_read, retries)
+    return b"".join(chunks)
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import concurrent.futures
+import threading
+import time
+from pathlib import Path, PurePosixPath
+
+
+class PrefetchHandle:
+    """Artifact download running in the background,
+    returned by `WaBucketRefAPI.prefetch_artifact()`.
+
+    Files could be awaited one by one with `wait_file()`, so the consumer
+    could start as soon as the files it needs have arrived.
+    """
+
+    def __init__(self, dst_folder: Path):
+        self.dst_folder = dst_folder
+        self._future: concurrent.futures.Future[Path] | None = None
+        self._arrived: set[str] = set()
+        self._cond = threading.Condition()
+
+    def _attach(self, future: concurrent.futures.Future[Path]) -> None:
+        self._future = future
+        future.add_done_callback(lambda _: self._notify())
+
+    def _file_done(self, path: str) -> None:
+        """Called from the event loop thread once `path` is in `dst_folder`."""
+        with self._cond:
+            self._arrived.add(path)
+            self._cond.notify_all()
+
+    def _notify(self) -> None:
+        with self._cond:
+            self._cond.notify_all()
+
+    def done(self) -> bool:
+        assert self._future is not None
+        return self._future.done()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Wait for the download to finish, successfully or not.
+        Returns False on timeout.
+        """
+        assert self._future is not None
+        done, _ = concurrent.futures.wait([self._future], timeout)
+        return bool(done)
+
+    def result(self, timeout: float | None = None) -> Path:
+        """Wait for the download and return the artifact directory.
+        The download error, if any, is re-raised.
+        """
+        assert self._future is not None
+        return self._future.result(timeout)
+
+    def wait_file(self, path: str, timeout: float | None = None) -> Path:
+        """Wait for a single file, relative to the artifact root, and return its path.
+
+        Raises:
+            FileNotFoundError: If the download has finished without the file.
+            TimeoutError: If the file has not arrived in `timeout` seconds.
+        """
+        assert self._future is not None
+        path = PurePosixPath(path).as_posix()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while path not in self._arrived:
+                if self._future.done():
+                    self._future.result()  # re-raise the download error
+                    raise FileNotFoundError(
+                        f"{path} is not a file of the downloaded artifact."
+                    )
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"{path} has not arrived in {timeout} sec.")
+                self._cond.wait(remaining)
+        return self.dst_folder / path
+
+    def cancel(self) -> bool:
+        assert self._future is not None
+        return self._future.cancel()
@@ -0,0 +1,424 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path, PurePosixPath
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Mapping
+
+import aiobotocore.session
+from aiobotocore.config import AioConfig
+from aiobotocore.credentials import AioCredentials, AioRefreshableCredentials
+from apolo_sdk import Bucket, BucketCredentials, Client
+from botocore.credentials import CredentialProvider
+from botocore.exceptions import (
+    ClientError,
+    ConnectionError as BotoConnectionError,
+    HTTPClientError,
+)
+from yarl import URL
+
+from .backends import FileInfo
+from .compression import Codec, compress_stream
+from .const import DEFAULT_JOBS, DEFAULT_RETRIES
+from .manifest import FileRecord, RecordHasher
+from .throttle import TokenBucket
+from .transfer import (
+    READ_CHUNK_SIZE,
+    BlobEngine,
+    BlobReader,
+    TransferStats,
+    blob_path,
+    read_chunks,
+)
+
+
+logger = logging.getLogger(__name__)
+
+DIRECT_S3_ENV = "WABUCKET_DIRECT_S3"
+PART_SIZE = 16 * 1024**2  # 16 MB
+MIN_PART_SIZE = 5 * 1024**2  # S3 limit, except the last part
+_DELETE_BATCH = 1000  # S3 limit of DeleteObjects request
+_TRANSIENT_CODES = ("RequestTimeout", "SlowDown", "Throttling")
+
+S3_PROVIDERS = (
+    Bucket.Provider.AWS,
+    Bucket.Provider.MINIO,
+    Bucket.Provider.SEAWEEDFS,
+    Bucket.Provider.OPEN_STACK,
+)
+
+
+@dataclass(frozen=True)
+class S3Connection:
+    """Pooled client of the object store behind the platform bucket."""
+
+    s3: Any  # aiobotocore S3 client
+    bucket: Bucket
+    bucket_name: str  # name of the bucket in the object store
+
+    @classmethod
+    @asynccontextmanager
+    async def open(
+        cls, client: Client, bucket: Bucket, pool_size: int = 100
+    ) -> AsyncIterator[S3Connection]:
+        """Connect to the object store with the bucket credentials.
+
+        Raises:
+            ValueError: If the bucket is not stored in an S3-compatible object store.
+        """
+        if bucket.provider not in S3_PROVIDERS:
+            raise ValueError(
+                f"Bucket {bucket.uri} is stored in {bucket.provider.value}, "
+                "not in an S3-compatible object store."
+            )
+
+        async def _get_credentials() -> BucketCredentials:
+            return await client.buckets.request_tmp_credentials(
+                bucket.id, bucket.cluster_name
+            )
+
+        credentials = await _get_credentials()
+        session = aiobotocore.session.get_session()
+        # ahead of the credentials from the environment and the config files
+        session.get_component("credential_provider").insert_before(
+            "env", _BucketCredentialProvider(credentials, _get_credentials)
+        )
+        config = AioConfig(
+            max_pool_connections=pool_size,
+            retries={"max_attempts": DEFAULT_RETRIES, "mode": "standard"},
+        )
+        async with session.create_client(
+            "s3",
+            endpoint_url=credentials.credentials.get("endpoint_url"),
+            region_name=credentials.credentials.get("region_name"),
+            config=config,
+        ) as s3:
+            yield cls(s3, bucket, credentials.credentials["bucket_name"])
+
+    def key(self, uri: URL) -> str:
+        return self.bucket.get_key_for_uri(uri)
+
+
+class _BucketCredentialProvider(CredentialProvider):
+    """Provides the bucket credentials to the botocore session."""
+
+    METHOD = "wabucket-bucket"
+    CANONICAL_NAME = "wabucket-bucket"
+
+    def __init__(
+        self,
+        credentials: BucketCredentials,
+        get_credentials: Callable[[], Awaitable[BucketCredentials]],
+    ):
+        super().__init__()
+        self._bucket_credentials = credentials
+        self._get_credentials = get_credentials
+
+    async def load(self) -> Any:
+        return _session_credentials(self._bucket_credentials, self._get_credentials)
+
+
+def _session_credentials(
+    credentials: BucketCredentials,
+    get_credentials: Callable[[], Awaitable[BucketCredentials]],
+) -> Any:
+    # temporary credentials are requested again once they have expired
+    def _metadata(credentials: BucketCredentials) -> Mapping[str, str]:
+        return {
+            "access_key": credentials.credentials["access_key_id"],
+            "secret_key": credentials.credentials["secret_access_key"],
+            "token": credentials.credentials["session_token"],
+            "expiry_time": credentials.credentials["expiration"],
+        }
+
+    async def _refresh() -> Mapping[str, str]:
+        return _metadata(await get_credentials())
+
+    if "expiration" in credentials.credentials:
+        return AioRefreshableCredentials.create_from_metadata(
+            metadata=_metadata(credentials),
+            refresh_using=_refresh,
+            method="wabucket-refresh",
+        )
+    return AioCredentials(
+        access_key=credentials.credentials["access_key_id"],
+        secret_key=credentials.credentials["secret_access_key"],
+    )
+
+
+class S3Backend(BlobEngine):
+    """Transfers the files of the platform bucket directly from and to the
+    S3-compatible object store behind it, with the bucket credentials.
+    Implements `backends.StorageBackend`.
+
+    Large files are uploaded with the multipart uploads and downloaded
+    by `part_size` ranges, the parts of all files are transferred concurrently,
+    at most `jobs` requests at once, over the pooled connections.
+    Failed requests are retried by botocore, the files and ranges
+    which still fail on the connection errors are transferred again.
+    """
+
+    def __init__(
+        self,
+        conn: S3Connection,
+        jobs: int = DEFAULT_JOBS,
+        part_size: int = PART_SIZE,
+        bandwidth: TokenBucket | None = None,
+    ):
+        super().__init__(jobs, bandwidth)
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(
+                f"Part size should be at least {MIN_PART_SIZE} bytes, got {part_size}."
+            )
+        self._conn = conn
+        self._s3 = conn.s3
+        self._bucket_name = conn.bucket_name
+        self._part_size = part_size
+        self._requests = asyncio.Semaphore(self._jobs)
+
+    async def exists(self, uri: URL) -> bool:
+        resp = await self._s3.list_objects_v2(
+            Bucket=self._bucket_name, Prefix=_dir_prefix(self._conn.key(uri)), MaxKeys=1
+        )
+        return bool(resp.get("KeyCount"))
+
+    async def list_files(self, root: URL) -> list[FileInfo]:
+        prefix = _dir_prefix(self._conn.key(root))
+        prefix_len = len(prefix)
+        paginator = self._s3.get_paginator("list_objects_v2")
+        result = []
+        async for page in paginator.paginate(Bucket=self._bucket_name, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                key: str = obj["Key"]
+                if not key.endswith("/"):
+                    result.append(
+                        FileInfo(
+                            key[prefix_len:],
+                            obj["Size"],
+                            obj["LastModified"].timestamp(),
+                        )
+                    )
+        return result
+
+    async def upload_files(
+        self,
+        src: Path,
+        dst: URL,
+        paths: Iterable[str],
+        codec: Codec | None = None,
+        records: dict[str, FileRecord] | None = None,
+    ) -> TransferStats:
+        """See `TransferEngine.upload_files()`."""
+        root = PurePosixPath(self._conn.key(dst))
+        return await self.run(
+            partial(
+                self.retry,
+                partial(self._upload_file, src, path, root, codec, records),
+                DEFAULT_RETRIES,
+            )
+            for path in paths
+        )
+
+    def _is_transient(self, error: Exception) -> bool:
+        if isinstance(error, (HTTPClientError, BotoConnectionError)):
+            return True
+        if isinstance(error, ClientError):
+            status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+            code = error.response.get("Error", {}).get("Code")
+            return (status or 0) >= 500 or code in _TRANSIENT_CODES
+        return super()._is_transient(error)
+
+    async def _upload_file(
+        self,
+        src_root: Path,
+        path: str,
+        dst_root: PurePosixPath,
+        codec: Codec | None,
+        records: dict[str, FileRecord] | None,
+    ) -> int:
+        src = src_root / path
+        hasher = RecordHasher(path, src) if records is not None else None
+        chunks = read_chunks(src, hasher.update if hasher is not None else None)
+        if codec is not None:
+            chunks = compress_stream(chunks, codec)
+        await self._put(
+            blob_path(dst_root / path, codec).as_posix(), self._throttled(chunks)
+        )
+        if records is not None and hasher is not None:
+            records[path] = hasher.record()
+        return src.stat().st_size
+
+    async def _put(self, key: str, chunks: AsyncIterator[bytes]) -> None:
+        """Upload the stream, with a single request if it fits in one part."""
+        parts = _rechunk(chunks, self._part_size)
+        first = await parts.__anext__()
+        try:
+            second = await parts.__anext__()
+        except StopAsyncIteration:
+            async with self._requests:
+                await self._s3.put_object(Bucket=self._bucket_name, Key=key, Body=first)
+            return
+
+        async def _parts() -> AsyncIterator[bytes]:
+            yield first
+            yield second
+            async for part in parts:
+                yield part
+
+        await self._multipart_upload(key, _parts())
+
+    async def _multipart_upload(self, key: str, parts: AsyncIterator[bytes]) -> None:
+        resp = await self._s3.create_multipart_upload(Bucket=self._bucket_name, Key=key)
+        upload_id = resp["UploadId"]
+        tasks: list[asyncio.Future[dict[str, Any]]] = []
+
+        async def _upload_part(number: int, data: bytes) -> dict[str, Any]:
+            resp = await self._s3.upload_part(
+                Bucket=self._bucket_name,
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=number,
+                Body=data,
+            )
+            return {"PartNumber": number, "ETag": resp["ETag"]}
+
+        try:
+            number = 0
+            async for data in parts:
+                # waiting for a free slot limits the memory taken by the parts
+                await self._requests.acquire()
+                number += 1
+                tasks.append(asyncio.ensure_future(_upload_part(number, data)))
+                # released by the cancelled parts as well
+                tasks[-1].add_done_callback(lambda _: self._requests.release())
+            uploaded = await asyncio.gather(*tasks)
+            await self._s3.complete_multipart_upload(
+                Bucket=self._bucket_name,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": uploaded},
+            )
+        except BaseException:
+            for part_task in tasks:
+                part_task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self._s3.abort_multipart_upload(
+                Bucket=self._bucket_name, Key=key, UploadId=upload_id
+            )
+            raise
+
+    async def download_dir(
+        self,
+        src: URL,
+        dst: Path,
+        range_size: int | None = None,
+        retries: int = DEFAULT_RETRIES,
+        codec: Codec | None = None,
+        on_file_done: Callable[[str], None] | None = None,
+        selected: Callable[[str], bool] | None = None,
+    ) -> TransferStats:
+        """See `BlobEngine.download_dir()`, large files are always
+        fetched by ranges, `part_size` ones by default.
+        """
+        return await super().download_dir(
+            src,
+            dst,
+            range_size or self._part_size,
+            retries,
+            codec,
+            on_file_done,
+            selected,
+        )
+
+    @asynccontextmanager
+    async def _reader(self, root: URL) -> AsyncIterator[BlobReader]:
+        prefix = PurePosixPath(self._conn.key(root))
+        yield lambda path, offset, length: self._read(
+            (prefix / path).as_posix(), offset, length
+        )
+
+    @asynccontextmanager
+    async def _read(
+        self, key: str, offset: int = 0, length: int | None = None
+    ) -> AsyncIterator[AsyncIterator[bytes]]:
+        kwargs: dict[str, str] = {}
+        if offset or length is not None:
+            end = "" if length is None else str(offset + length - 1)
+            kwargs["Range"] = f"bytes={offset}-{end}"
+        resp = await self._s3.get_object(Bucket=self._bucket_name, Key=key, **kwargs)
+        async with resp["Body"] as body:
+            yield body.iter_chunks(READ_CHUNK_SIZE)
+
+    async def delete_files(
+        self, root: URL, paths: Iterable[str], codec: Codec | None = None
+    ) -> TransferStats:
+        prefix = PurePosixPath(self._conn.key(root))
+        keys = [blob_path(prefix / path, codec).as_posix() for path in paths]
+        batches = [keys[i:][:_DELETE_BATCH] for i in range(0, len(keys), _DELETE_BATCH)]
+        return await self.run(partial(self._delete, batch) for batch in batches)
+
+    async def _delete(self, keys: list[str]) -> int:
+        # missing keys are not reported as errors
+        resp = await self._s3.delete_objects(
+            Bucket=self._bucket_name,
+            Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True},
+        )
+        errors = resp.get("Errors", [])
+        if errors:
+            raise RuntimeError(
+                f"Failed to delete {len(errors)} blobs, e.g. {errors[0]['Key']}: "
+                f"{errors[0]['Message']}"
+            )
+        return 0
+
+    async def delete_dir(self, root: URL) -> None:
+        await self.delete_files(root, [f.path for f in await self.list_files(root)])
+
+    async def read_blob(self, uri: URL) -> bytes | None:
+        try:
+            async with self._read(self._conn.key(uri)) as it:
+                return b"".join([chunk async for chunk in it])
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                return None
+            raise
+
+    async def write_blob(self, uri: URL, data: bytes) -> None:
+        await self._s3.put_object(
+            Bucket=self._bucket_name, Key=self._conn.key(uri), Body=data
+        )
+
+    async def write_stream(self, uri: URL, chunks: AsyncIterator[bytes]) -> None:
+        await self._put(self._conn.key(uri), self._throttled(chunks))
+
+    @asynccontextmanager
+    async def read_stream(
+        self, uri: URL, offset: int = 0
+    ) -> AsyncIterator[AsyncIterator[bytes]]:
+        async with self._read(self._conn.key(uri), offset) as it:
+            yield self._throttled(it)
+
+
+def _dir_prefix(key: str) -> str:
+    # trailing slash prevents matching of the sibling keys with the same prefix
+    return key.rstrip("/") + "/"
+
+
+async def _rechunk(chunks: AsyncIterator[bytes], size: int) -> AsyncIterator[bytes]:
+    """Regroup the stream into `size` bytes parts, the last one could be shorter.
+    An empty stream yields a single empty part.
+    """
+    buffer = bytearray()
+    sent = False
+    async for chunk in chunks:
+        buffer += chunk
+        while len(buffer) >= size:
+            part = bytes(buffer[:size])
+            del buffer[:size]
+            sent = True
+            yield part
+    if buffer or not sent:
+        yield bytes(buffer)
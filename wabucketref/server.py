@@ -0,0 +1,376 @@
+from __future__ import annotations
+
+import contextlib
+import io
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import traceback
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, BinaryIO, Callable, Iterator, Sequence
+
+from . import __version__
+
+
+if TYPE_CHECKING:
+    from .api import WaBucketRefAPI
+
+
+logger = logging.getLogger(__name__)
+
+SOCKET_ENV = "WABUCKET_SOCKET"
+CONNECT_TIMEOUT = 1.0  # seconds
+# commands run by the agent, the others always run in the CLI process
+DELEGATED_COMMANDS = ("upload", "download", "link", "upload-many", "download-many")
+# options of the commands waiting for the commands of the other processes,
+# which would wait behind them in the agent queue
+_LOCAL_OPTIONS = ("--shard",)
+# env vars the API defaults are read from, on top of `WABUCKET_*` ones
+_API_ENV = ("WANDB_PROJECT", "WANDB_ENTITY")
+
+
+def default_socket_path() -> Path:
+    path = os.environ.get(SOCKET_ENV)
+    if path is None:
+        cache_home = os.environ.get("XDG_CACHE_HOME", "~/.cache")
+        path = os.path.join(cache_home, "wabucket", "agent.sock")
+    return Path(path).expanduser()
+
+
+def _send(f: BinaryIO | io.BufferedIOBase, message: dict[str, Any]) -> None:
+    f.write(json.dumps(message).encode("utf-8") + b"\n")
+    f.flush()
+
+
+def delegate(args: Sequence[str], socket_path: Path | None = None) -> int | None:
+    """Run the CLI command with `args` by the agent, if it is running.
+
+    The command runs in the current directory and environment of the caller,
+    its output is streamed back to the caller stdout and stderr.
+
+    Returns:
+        int | None: exit code of the command, or None if there is no agent
+            to run it, so the command should run in the current process.
+    """
+    path = socket_path or default_socket_path()
+    if not path.exists():
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CONNECT_TIMEOUT)
+    try:
+        sock.connect(str(path))
+    except OSError as e:
+        logger.debug(f"wabucket agent at {path} is not available: {e}")
+        sock.close()
+        return None
+    # commands take as long as the transfers do
+    sock.settimeout(None)
+    with sock, sock.makefile("rwb") as f:
+        _send(
+            f,
+            {
+                "version": __version__,
+                "args": list(args),
+                "cwd": os.getcwd(),
+                "env": dict(os.environ),
+            },
+        )
+        for line in f:
+            message = json.loads(line)
+            if "stdout" in message:
+                sys.stdout.write(message["stdout"])
+                sys.stdout.flush()
+            elif "stderr" in message:
+                sys.stderr.write(message["stderr"])
+                sys.stderr.flush()
+            elif message.get("exit_code") is None:
+                # rejected before running, e.g. by the agent of the other version
+                logger.info(f"wabucket agent refused the command: {message['error']}")
+                return None
+            else:
+                exit_code: int = message["exit_code"]
+                return exit_code
+    sys.stderr.write(f"wabucket agent at {path} closed the connection.\n")
+    return 1
+
+
+class ApiPool:
+    """Warm API clients of the agent, one per distinct set of the API arguments,
+    so the platform client, the resolved buckets, S3 connections and caches
+    are reused by the commands.
+    """
+
+    def __init__(self, factory: Callable[..., WaBucketRefAPI] | None = None):
+        self._factory = factory
+        self._apis: dict[str, WaBucketRefAPI] = {}
+
+    def get(self, params: dict[str, Any]) -> WaBucketRefAPI:
+        env = {
+            k: v
+            for k, v in os.environ.items()
+            if k in _API_ENV or k.startswith("WABUCKET_")
+        }
+        key = json.dumps([params, env], sort_keys=True, default=str)
+        api = self._apis.get(key)
+        if api is None:
+            factory = self._factory
+            if factory is None:
+                from .api import WaBucketRefAPI
+
+                factory = WaBucketRefAPI
+            api = factory(**params)
+            self._apis[key] = api
+        return api
+
+    def finish_run(self) -> None:
+        """Finish W&B run of the served command, every command has its own run,
+        as if it were run by the CLI process.
+        """
+        for api in self._apis.values():
+            api.finish_run()
+
+    def close(self) -> None:
+        for api in self._apis.values():
+            api.close()
+        self._apis.clear()
+
+
+class _Output(io.TextIOBase):
+    """Text stream sent to the caller as `stream` messages."""
+
+    def __init__(self, f: BinaryIO, stream: str, lock: threading.Lock):
+        self._f = f
+        self._stream = stream
+        self._lock = lock
+
+    @property
+    def encoding(self) -> str:  # type: ignore[override]
+        return "utf-8"
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, s: str) -> int:
+        if not isinstance(s, str):
+            # as the other text streams do, click checks it
+            raise TypeError(f"write() argument must be str, not {type(s).__name__}")
+        if s:
+            with self._lock:
+                try:
+                    _send(self._f, {self._stream: s})
+                except OSError:
+                    # the caller is gone, the command is completed anyway
+                    pass
+        return len(s)
+
+
+@contextlib.contextmanager
+def _caller_context(cwd: str, env: dict[str, str]) -> Iterator[None]:
+    saved_env = dict(os.environ)
+    saved_cwd = os.getcwd()
+    os.environ.clear()
+    os.environ.update(env)
+    os.chdir(cwd)
+    try:
+        yield
+    finally:
+        os.chdir(saved_cwd)
+        os.environ.clear()
+        os.environ.update(saved_env)
+
+
+def _peer_uid(sock: socket.socket) -> int | None:
+    """User id of the process connected to the Unix socket,
+    `None` if the platform does not report it.
+    """
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    creds = sock.getsockopt(
+        socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+    )
+    _, uid, _ = struct.unpack("3i", creds)
+    return uid
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: AgentServer
+
+    def handle(self) -> None:
+        uid = _peer_uid(self.request)
+        if uid is not None and uid != os.getuid():
+            # commands run with the credentials of the agent owner
+            logger.warning(f"Refused the command of user {uid}")
+            _send(
+                self.wfile,
+                {"exit_code": None, "error": "agent is run by the other user"},
+            )
+            return
+        line = self.rfile.readline()
+        if not line:
+            return  # checked if the agent is listening
+        request = json.loads(line)
+        if request.get("version") != __version__:
+            _send(
+                self.wfile,
+                {
+                    "exit_code": None,
+                    "error": f"agent version {__version__} differs "
+                    f"from CLI version {request.get('version')}",
+                },
+            )
+            return
+        local = [arg for arg in request["args"] if arg in _LOCAL_OPTIONS]
+        if local:
+            _send(
+                self.wfile,
+                {
+                    "exit_code": None,
+                    "error": f"{local[0]} commands wait for each other "
+                    "and run in the CLI processes",
+                },
+            )
+            return
+        lock = threading.Lock()
+        exit_code = self.server.run_command(
+            request["args"],
+            request["cwd"],
+            request["env"],
+            _Output(self.wfile, "stdout", lock),
+            _Output(self.wfile, "stderr", lock),
+        )
+        _send(self.wfile, {"exit_code": exit_code})
+
+
+class AgentServer(socketserver.UnixStreamServer):
+    """Runs the CLI commands received on the Unix socket with the warm API clients.
+
+    The commands are run one by one, in the thread serving the socket:
+    W&B run is global to the process, and `wandb.init()` should be called
+    from the main thread. So `--shard` downloads, waiting for the shards
+    of the other processes, are refused and run by the CLI processes.
+    """
+
+    def __init__(self, socket_path: Path, pool: ApiPool | None = None):
+        super().__init__(str(socket_path), _Handler)
+        self.socket_path = socket_path
+        self.pool = pool or ApiPool()
+        self.idle = False
+
+    def server_bind(self) -> None:
+        # commands run with the credentials of the agent owner,
+        # so the socket is never accessible to the other users
+        umask = os.umask(0o077)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(umask)
+
+    def handle_timeout(self) -> None:
+        self.idle = True
+
+    def run_command(
+        self,
+        args: Sequence[str],
+        cwd: str,
+        env: dict[str, str],
+        stdout: io.TextIOBase,
+        stderr: io.TextIOBase,
+    ) -> int:
+        import click
+
+        from .cli import main
+
+        logger.info(f"Running wabucket {' '.join(args)}")
+        handler = logging.StreamHandler(stderr)
+        handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+        root_logger = logging.getLogger()
+        root_logger.addHandler(handler)
+        try:
+            with _caller_context(cwd, env), contextlib.redirect_stdout(
+                stdout  # type: ignore
+            ), contextlib.redirect_stderr(
+                stderr  # type: ignore
+            ):
+                try:
+                    main.main(
+                        args=list(args),
+                        prog_name="wabucket",
+                        standalone_mode=False,
+                        obj={"api_pool": self.pool},
+                    )
+                    return 0
+                except click.ClickException as e:
+                    e.show()
+                    return e.exit_code
+                except click.exceptions.Exit as e:
+                    return e.exit_code
+                except click.Abort:
+                    stderr.write("Aborted!\n")
+                    return 1
+                except Exception:
+                    traceback.print_exc()
+                    return 1
+                finally:
+                    self.pool.finish_run()
+        finally:
+            root_logger.removeHandler(handler)
+
+    def serve_until_idle(self, idle_timeout: float | None = None) -> None:
+        """Serve the commands until there are none for `idle_timeout` seconds."""
+        self.timeout = idle_timeout
+        while not self.idle:
+            self.handle_request()
+        logger.info(f"No commands for {idle_timeout} seconds, stopping.")
+
+
+def _is_listening(socket_path: Path) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            sock.connect(str(socket_path))
+        except OSError:
+            return False
+    return True
+
+
+def _interrupt(signum: int, frame: Any) -> None:
+    raise KeyboardInterrupt
+
+
+def serve(socket_path: Path, idle_timeout: float | None = None) -> None:
+    """Run the agent until interrupted or idle for `idle_timeout` seconds.
+
+    Raises:
+        RuntimeError: If the other agent is listening on `socket_path`.
+    """
+    if socket_path.exists():
+        if _is_listening(socket_path):
+            raise RuntimeError(f"wabucket agent is already running on {socket_path}.")
+        socket_path.unlink()  # left by the killed agent
+    socket_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+    # the SDKs take seconds to import, and W&B service process to start
+    import wandb
+
+    from . import api  # noqa: F401
+
+    wandb.setup()
+
+    server = AgentServer(socket_path)
+    signal.signal(signal.SIGTERM, _interrupt)
+    logger.info(f"wabucket agent is listening on {socket_path}")
+    try:
+        server.serve_until_idle(idle_timeout)
+    except KeyboardInterrupt:
+        logger.info("Interrupted, stopping.")
+    finally:
+        server.server_close()
+        if socket_path.exists():
+            socket_path.unlink()
+        server.pool.close()
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+
+logger = logging.getLogger(__name__)
+
+MAX_AUTO_JOBS = 64
+ADAPT_WINDOW = 1.0  # seconds between the concurrency adjustments
+
+
+class TokenBucket:
+    """Caps the transfer rate at `rate` bytes per second, with bursts
+    of up to `capacity` bytes (one second worth of transfer by default).
+
+    Shared by all the concurrent transfers, so it limits their total rate.
+    A consumer could take more tokens than available, it waits
+    until the debt is repaid, so the chunks larger than the bucket pass as well.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        if rate <= 0:
+            raise ValueError(f"Bandwidth should be positive, got {rate}.")
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    async def consume(self, amount: int) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+        self._tokens -= amount
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
+
+
+class AdaptiveConcurrency:
+    """Additive-increase/multiplicative-decrease limit of the concurrent transfers.
+
+    The limit is raised by one while the throughput, measured over
+    `window` seconds, keeps improving, and is halved on every transfer error,
+    e.g. timeout or connection failure, so the transfers back off
+    from the overloaded link or server.
+    """
+
+    def __init__(
+        self,
+        max_limit: int = MAX_AUTO_JOBS,
+        initial: int = 4,
+        window: float = ADAPT_WINDOW,
+    ):
+        self.max_limit = max_limit
+        self.limit = min(initial, max_limit)
+        self._window = window
+        self._active = 0
+        self._bytes = 0
+        self._started = time.monotonic()
+        self._best = 0.0
+        self._cond: asyncio.Condition | None = None
+
+    def _condition(self) -> asyncio.Condition:
+        # created lazily, in the running loop
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    async def acquire(self) -> None:
+        cond = self._condition()
+        async with cond:
+            await cond.wait_for(lambda: self._active < self.limit)
+            self._active += 1
+
+    async def release(self, transferred: int) -> None:
+        cond = self._condition()
+        async with cond:
+            self._active -= 1
+            self._bytes += transferred
+            self._adapt()
+            cond.notify_all()
+
+    def _adapt(self) -> None:
+        elapsed = time.monotonic() - self._started
+        if elapsed < self._window:
+            return
+        throughput = self._bytes / elapsed
+        self._bytes = 0
+        self._started = time.monotonic()
+        if throughput > self._best * 1.05:
+            self._best = throughput
+            if self.limit < self.max_limit:
+                self._set_limit(self.limit + 1)
+        else:
+            # forget the stale peak slowly, so the limit is probed again
+            self._best *= 0.95
+
+    def backoff(self) -> None:
+        self._best = 0.0
+        self._bytes = 0
+        self._started = time.monotonic()
+        self._set_limit(max(1, self.limit // 2))
+
+    def _set_limit(self, limit: int) -> None:
+        if limit != self.limit:
+            logger.debug(f"Transfer concurrency {self.limit} -> {limit}")
+            self.limit = limit
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterator, Optional
+
+
+if TYPE_CHECKING:
+    from .transfer import TransferStats
+
+
+logger = logging.getLogger(__name__)
+
+TIMINGS_ENV = "WABUCKET_TIMINGS"
+TIMINGS_WANDB_ENV = "WABUCKET_TIMINGS_WANDB"
+STDERR_SINK = "-"
+
+
+@dataclass
+class Phase:
+    """Timing of a single step of an API call, with the transfer counters
+    of the steps moving the files.
+    """
+
+    name: str
+    operation: str | None = None
+    started: float = field(default_factory=time.time)
+    duration: float = 0.0
+    bytes: int | None = None
+    files: int | None = None
+    retries: int | None = None
+
+    def add(self, stats: TransferStats | None) -> None:
+        if stats is None:
+            return
+        self.bytes = (self.bytes or 0) + stats.bytes
+        self.files = (self.files or 0) + stats.files
+        self.retries = (self.retries or 0) + stats.retries
+
+    def as_event(self) -> dict[str, Any]:
+        event: dict[str, Any] = {
+            "event": "phase",
+            "operation": self.operation,
+            "phase": self.name,
+            "started": round(self.started, 3),
+            "duration": round(self.duration, 4),
+        }
+        for key in ("bytes", "files", "retries"):
+            if getattr(self, key) is not None:
+                event[key] = getattr(self, key)
+        return event
+
+
+@dataclass
+class _Operation:
+    name: str
+    id: str
+    attrs: dict[str, Any]
+    phases: list[Phase] = field(default_factory=list)
+
+
+_current: ContextVar[Optional[_Operation]] = ContextVar("_current", default=None)
+
+
+class Timings:
+    """Measures the phases of the API calls, e.g. W&B run start,
+    bucket listing or file transfers, and emits them as JSON lines
+    into `sink` file (`-` for stderr).
+
+    Every phase is emitted once it is finished, with the operation
+    it belongs to, the operation summary is emitted at its end
+    and could be stored in the summary of the active W&B run as well.
+    """
+
+    def __init__(self, sink: str | Path | None = None, log_to_wandb: bool = False):
+        self._sink = sink
+        self._log_to_wandb = log_to_wandb
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(
+        cls, sink: str | Path | None = None, log_to_wandb: bool | None = None
+    ) -> Timings:
+        if sink is None:
+            sink = os.environ.get(TIMINGS_ENV) or None
+        if log_to_wandb is None:
+            log_to_wandb = os.environ.get(TIMINGS_WANDB_ENV, "").lower() in (
+                "1",
+                "true",
+            )
+        return cls(sink, log_to_wandb)
+
+    @property
+    def enabled(self) -> bool:
+        return self._sink is not None or self._log_to_wandb
+
+    @contextmanager
+    def operation(self, name: str, **attrs: Any) -> Iterator[None]:
+        """Group the phases measured in the current context under `name`."""
+        op = _Operation(name, uuid.uuid4().hex[:12], attrs)
+        token = _current.set(op)
+        started = time.time()
+        status = "error"
+        try:
+            yield
+            status = "ok"
+        finally:
+            _current.reset(token)
+            if self.enabled:
+                self._finish(op, started, time.time() - started, status)
+
+    @contextmanager
+    def phase(self, name: str, operation: str | None = None) -> Iterator[Phase]:
+        op = _current.get()
+        phase = Phase(name, operation or (op.name if op else None))
+        started = time.monotonic()
+        try:
+            yield phase
+        finally:
+            phase.duration = time.monotonic() - started
+            if op is not None:
+                op.phases.append(phase)
+            if self.enabled:
+                event = phase.as_event()
+                if op is not None:
+                    event["id"] = op.id
+                self.emit(event)
+
+    def _finish(
+        self, op: _Operation, started: float, duration: float, status: str
+    ) -> None:
+        summary: dict[str, Any] = {
+            "event": "operation",
+            "operation": op.name,
+            "id": op.id,
+            "status": status,
+            "started": round(started, 3),
+            "duration": round(duration, 4),
+            **op.attrs,
+            "phases": {},
+        }
+        for phase in op.phases:
+            # the repeated phases, e.g. uploads of the changed and new files, add up
+            duration = summary["phases"].get(phase.name, 0.0) + phase.duration
+            summary["phases"][phase.name] = round(duration, 4)
+        for key in ("bytes", "files", "retries"):
+            values = [getattr(p, key) for p in op.phases if getattr(p, key) is not None]
+            if values:
+                summary[key] = sum(values)
+        self.emit(summary)
+        if self._log_to_wandb:
+            self._log_wandb(op, summary)
+
+    def emit(self, event: dict[str, Any]) -> None:
+        if self._sink is None:
+            return
+        line = json.dumps(event, default=str) + "\n"
+        with self._lock:
+            if self._sink == STDERR_SINK:
+                sys.stderr.write(line)
+                sys.stderr.flush()
+            else:
+                with open(self._sink, "a") as f:
+                    f.write(line)
+
+    def _log_wandb(self, op: _Operation, summary: dict[str, Any]) -> None:
+        import wandb
+
+        if wandb.run is None:
+            return
+        prefix = f"wabucket/{op.name}"
+        if op.attrs.get("artifact"):
+            prefix += f"/{op.attrs['artifact']}"
+        values = {f"{prefix}/duration": summary["duration"]}
+        for phase, duration in summary["phases"].items():
+            values[f"{prefix}/{phase}"] = duration
+        for key in ("bytes", "files", "retries"):
+            if key in summary:
+                values[f"{prefix}/{key}"] = summary[key]
+        try:
+            wandb.run.summary.update(values)
+        except Exception as e:
+            logger.warning(f"Failed to log timings to W&B: {e}")
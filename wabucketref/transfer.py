@@ -0,0 +1,627 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import random
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path, PurePosixPath
+from typing import (
+    IO,
+    AsyncContextManager,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Iterator,
+    Optional,
+)
+
+from aiohttp import ClientError, ServerTimeoutError
+from apolo_sdk import BucketEntry, Client, ResourceNotFound
+from apolo_sdk._buckets import BucketFS
+from yarl import URL
+
+from .backends import FileInfo
+from .compression import Codec, compress, compress_stream, decompress_stream
+from .const import AUTO_JOBS, DEFAULT_JOBS, DEFAULT_RETRIES
+from .manifest import FileRecord, RecordHasher
+from .throttle import MAX_AUTO_JOBS, AdaptiveConcurrency, TokenBucket
+
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 4 * 1024**2  # 4 MB
+JOURNAL_NAME = ".wabucket-journal"
+
+TransferJob = Callable[[], Awaitable[int]]
+
+# shared by the runners in the context, see `shared_jobs()`
+_shared_jobs: ContextVar[Optional[asyncio.Semaphore]] = ContextVar(
+    "_shared_jobs", default=None
+)
+
+
+@contextmanager
+def shared_jobs(jobs: int) -> Iterator[None]:
+    """Run at most `jobs` transfers at once across all the `JobRunner`s
+    running in this context, e.g. of the artifacts transferred concurrently.
+    Each runner is bounded by its own `jobs` as well.
+    """
+    token = _shared_jobs.set(asyncio.Semaphore(jobs) if jobs != AUTO_JOBS else None)
+    try:
+        yield
+    finally:
+        _shared_jobs.reset(token)
+
+
+@dataclass
+class TransferStats:
+    files: int = 0
+    bytes: int = 0
+    elapsed: float = 0.0
+    retries: int = 0
+
+    @property
+    def throughput(self) -> float:
+        """Bytes per second."""
+        return self.bytes / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.files} files, {self.bytes / 1024**2:.1f} MB "
+            f"in {self.elapsed:.1f} sec ({self.throughput / 1024**2:.1f} MB/s)"
+        )
+
+
+class JobRunner:
+    """Runs at most `jobs` transfers concurrently.
+
+    With `AUTO_JOBS` the concurrency is adapted to the throughput
+    and the transfer errors, see `throttle.AdaptiveConcurrency`.
+    If `bandwidth` is set, the transfers share its rate limit.
+    """
+
+    def __init__(self, jobs: int = DEFAULT_JOBS, bandwidth: TokenBucket | None = None):
+        if jobs < 1 and jobs != AUTO_JOBS:
+            raise ValueError(f"Number of transfer jobs should be positive, got {jobs}.")
+        self._adaptive: AdaptiveConcurrency | None = None
+        if jobs == AUTO_JOBS:
+            self._adaptive = AdaptiveConcurrency(MAX_AUTO_JOBS)
+            jobs = MAX_AUTO_JOBS
+        self._jobs = jobs
+        self._bandwidth = bandwidth
+        self.retries = 0  # number of retried attempts
+
+    async def _throttle(self, size: int) -> None:
+        if self._bandwidth is not None:
+            await self._bandwidth.consume(size)
+
+    async def _throttled(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        async for chunk in chunks:
+            await self._throttle(len(chunk))
+            yield chunk
+
+    async def retry(self, job: TransferJob, retries: int) -> int:
+        for i in range(retries - 1):
+            try:
+                return await job()
+            except Exception as e:
+                if not self._is_transient(e):
+                    raise
+                # jitter spreads out the retries of the transfers failed together
+                backoff_time = random.uniform(0, 2 ** (i + 1) - 1)
+                self.retries += 1
+                if self._adaptive is not None:
+                    self._adaptive.backoff()
+                logger.warning(
+                    f"{e}, retry {i + 1}/{retries} in {backoff_time:.1f} sec."
+                )
+                await asyncio.sleep(backoff_time)
+        return await job()
+
+    def _is_transient(self, error: Exception) -> bool:
+        """Whether the failed transfer is worth repeating."""
+        return isinstance(error, (ServerTimeoutError, ClientError))
+
+    async def run(self, jobs: Iterable[TransferJob]) -> TransferStats:
+        """Run transfer jobs on the bounded worker pool.
+
+        Each job returns the number of transferred bytes.
+        The first failed job cancels the remaining ones and its error is re-raised.
+        """
+        stats = TransferStats()
+        started = time.monotonic()
+        retries = self.retries
+        queue: asyncio.Queue[TransferJob] = asyncio.Queue()
+        for job in jobs:
+            queue.put_nowait(job)
+        shared = _shared_jobs.get()
+
+        async def _worker() -> None:
+            while True:
+                if self._adaptive is not None:
+                    await self._adaptive.acquire()
+                transferred = 0
+                try:
+                    try:
+                        job = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    if shared is None:
+                        transferred = await job()
+                    else:
+                        async with shared:
+                            transferred = await job()
+                finally:
+                    if self._adaptive is not None:
+                        await self._adaptive.release(transferred)
+                stats.bytes += transferred
+                stats.files += 1
+
+        workers: list[asyncio.Future[None]] = [
+            asyncio.ensure_future(_worker())
+            for _ in range(min(self._jobs, queue.qsize()))
+        ]
+        try:
+            await asyncio.gather(*workers)
+        except BaseException:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            raise
+        stats.elapsed = time.monotonic() - started
+        stats.retries = self.retries - retries
+        logger.info(f"Transferred {stats}")
+        return stats
+
+
+BlobReader = Callable[
+    [str, int, Optional[int]], AsyncContextManager[AsyncIterator[bytes]]
+]
+
+
+class BlobEngine(JobRunner):
+    """Downloads blob directories from an object store.
+
+    Subclasses list the blobs with `list_files()` and provide `_reader()`,
+    which opens the streams of the blobs by their paths relative to the root.
+    """
+
+    # the reader could stop the stream at the end of a byte range
+    ranged_reads = True
+
+    async def list_files(self, root: URL) -> list[FileInfo]:
+        raise NotImplementedError
+
+    def _reader(self, root: URL) -> AsyncContextManager[BlobReader]:
+        """Reader of the blobs under `root`, it is called with the relative path,
+        the offset and the number of bytes to read (`None` to read till the end).
+        """
+        raise NotImplementedError
+
+    async def download_dir(
+        self,
+        src: URL,
+        dst: Path,
+        range_size: int | None = None,
+        retries: int = DEFAULT_RETRIES,
+        codec: Codec | None = None,
+        on_file_done: Callable[[str], None] | None = None,
+        selected: Callable[[str], bool] | None = None,
+    ) -> TransferStats:
+        """Download all blobs under `src` into `dst` directory.
+
+        Blobs larger than `range_size` are split into byte ranges,
+        fetched concurrently and written into the preallocated file at their offsets,
+        if the engine supports the bounded reads (`ranged_reads`).
+        Every file or range is retried on its own.
+        Blobs compressed with `codec` are decompressed while streaming,
+        as a whole, since the compressed stream could not be split into ranges.
+
+        Completed files are recorded in the journal under `dst`,
+        so a repeated call after a failure fetches only the missing
+        or incomplete files. The journal is removed once all files are downloaded.
+        `on_file_done` is called with the relative path of every complete file.
+        If `selected` predicate is set, only the files with the relative paths
+        it accepts are downloaded.
+        """
+        if range_size is not None and not self.ranged_reads:
+            logger.info(
+                f"Byte ranges of {src} could not be fetched, "
+                "every file is fetched with a single stream"
+            )
+            range_size = None
+        files = await self.list_files(src)
+        dst.mkdir(parents=True, exist_ok=True)
+        journal = DownloadJournal(dst / JOURNAL_NAME)
+        paths: dict[str, str] = {}
+
+        def _file_done(info: FileInfo) -> None:
+            journal.mark_done(info)
+            if on_file_done is not None:
+                on_file_done(paths[info.path])
+
+        try:
+            async with self._reader(src) as read:
+                jobs: list[TransferJob] = []
+                pending: dict[str, int] = {}
+                resumed = 0
+                for info in files:
+                    dst_file = dst / info.path
+                    file_codec = None
+                    if codec is not None and dst_file.name.endswith(codec.suffix):
+                        file_codec = codec
+                        name_len = len(dst_file.name) - len(codec.suffix)
+                        dst_file = dst_file.with_name(dst_file.name[:name_len])
+                    path = dst_file.relative_to(dst).as_posix()
+                    if selected is not None and not selected(path):
+                        continue
+                    paths[info.path] = path
+                    if journal.is_done(info) and dst_file.exists():
+                        resumed += 1
+                        if on_file_done is not None:
+                            on_file_done(path)
+                        continue
+                    dst_file.parent.mkdir(parents=True, exist_ok=True)
+                    # never write through a hardlink to the cached copy
+                    dst_file.unlink(missing_ok=True)
+                    file_jobs: list[TransferJob] = []
+                    if file_codec is not None:
+                        file_jobs.append(
+                            partial(
+                                self._download_decompressed,
+                                read,
+                                info,
+                                dst_file,
+                                file_codec,
+                            )
+                        )
+                    else:
+                        with dst_file.open("wb") as f:
+                            f.truncate(info.size)
+                        step = range_size or max(info.size, 1)
+                        for offset in range(0, info.size, step):
+                            length = min(step, info.size - offset)
+                            file_jobs.append(
+                                partial(
+                                    self._download_range,
+                                    read,
+                                    info,
+                                    dst_file,
+                                    offset,
+                                    length,
+                                )
+                            )
+                    if not file_jobs:  # empty file
+                        _file_done(info)
+                    pending[info.path] = len(file_jobs)
+                    jobs.extend(
+                        partial(
+                            self._complete_file,
+                            job,
+                            info,
+                            pending,
+                            retries,
+                            _file_done,
+                        )
+                        for job in file_jobs
+                    )
+                if resumed:
+                    logger.info(
+                        f"Resuming download of {src}, "
+                        f"{resumed} files are already downloaded"
+                    )
+                stats = await self.run(jobs)
+        finally:
+            journal.close()
+        journal.remove()
+        stats.files = len(pending)  # ranges of the same file are counted once
+        return stats
+
+    async def _complete_file(
+        self,
+        job: TransferJob,
+        info: FileInfo,
+        pending: dict[str, int],
+        retries: int,
+        file_done: Callable[[FileInfo], None],
+    ) -> int:
+        """Run file or range download job, `file_done` is called
+        once all the jobs of the file have finished.
+        """
+        transferred = await self.retry(job, retries)
+        pending[info.path] -= 1
+        if not pending[info.path]:
+            file_done(info)
+        return transferred
+
+    async def _download_range(
+        self, read: BlobReader, info: FileInfo, dst: Path, offset: int, length: int
+    ) -> int:
+        position = offset
+        end = offset + length
+        with dst.open("r+b") as f:
+            f.seek(offset)
+            async with read(info.path, offset, length) as it:
+                async for chunk in it:
+                    chunk = chunk[: end - position]
+                    await self._throttle(len(chunk))
+                    f.write(chunk)
+                    position += len(chunk)
+                    if position >= end:
+                        break
+        if position < end:
+            raise ServerTimeoutError(
+                f"Range {offset}-{end} of {info.path} ended prematurely at {position}"
+            )
+        return length
+
+    async def _download_decompressed(
+        self, read: BlobReader, info: FileInfo, dst: Path, codec: Codec
+    ) -> int:
+        written = 0
+        with dst.open("wb") as f:
+            async with read(info.path, 0, None) as it:
+                async for chunk in decompress_stream(self._throttled(it), codec):
+                    f.write(chunk)
+                    written += len(chunk)
+        return written
+
+
+class TransferEngine(BlobEngine):
+    """Transfers files between the local disk and a bucket one by one,
+    running at most `jobs` transfers concurrently.
+    Implements `backends.StorageBackend` for the platform buckets.
+    Failed uploads and downloads are retried.
+
+    All transfers of a single call share one bucket provider,
+    so the bucket credentials are requested only once.
+    """
+
+    # the SDK fetches a blob from the offset till its end, so every range
+    # of a file would request the whole remainder of the blob
+    ranged_reads = False
+
+    def __init__(
+        self,
+        client: Client,
+        jobs: int = DEFAULT_JOBS,
+        bandwidth: TokenBucket | None = None,
+    ):
+        super().__init__(jobs, bandwidth)
+        self._client = client
+
+    async def exists(self, uri: URL) -> bool:
+        async with self.bucket_fs(uri) as bfs:
+            return await bfs.is_dir(PurePosixPath(bfs.bucket.get_key_for_uri(uri)))
+
+    async def upload_dir(self, src: Path, dst: URL) -> TransferStats:
+        files = sorted(f for f in src.rglob("*") if f.is_file())
+        return await self.upload_files(
+            src, dst, [f.relative_to(src).as_posix() for f in files]
+        )
+
+    async def upload_files(
+        self,
+        src: Path,
+        dst: URL,
+        paths: Iterable[str],
+        codec: Codec | None = None,
+        records: dict[str, FileRecord] | None = None,
+    ) -> TransferStats:
+        """Upload `paths`, relative to `src` directory, under `dst` blob URI.
+
+        If `codec` is set, files are compressed on the fly
+        and stored with the codec suffix appended to their names.
+        If `records` is set, the records of the uploaded files are put
+        into it, with the checksums of the bytes read for the upload.
+        """
+        async with self.bucket_fs(dst) as bfs:
+            root = PurePosixPath(bfs.bucket.get_key_for_uri(dst))
+            return await self.run(
+                partial(
+                    self.retry,
+                    partial(self._upload_file, bfs, src, path, root, codec, records),
+                    DEFAULT_RETRIES,
+                )
+                for path in paths
+            )
+
+    def bucket_fs(self, uri: URL) -> AsyncContextManager[BucketFS]:
+        """Bucket file system, which is used to transfer blobs under `uri`."""
+        return self._client.buckets._get_bucket_fs(uri)
+
+    async def _upload_file(
+        self,
+        bfs: BucketFS,
+        src_root: Path,
+        path: str,
+        dst_root: PurePosixPath,
+        codec: Codec | None = None,
+        records: dict[str, FileRecord] | None = None,
+    ) -> int:
+        src = src_root / path
+        dst = blob_path(dst_root / path, codec)
+        hasher = RecordHasher(path, src) if records is not None else None
+        on_chunk = hasher.update if hasher is not None else None
+        size = src.stat().st_size
+        if size <= READ_CHUNK_SIZE:
+            # single PUT request instead of the multipart upload
+            loop = asyncio.get_running_loop()
+            data = await loop.run_in_executor(None, read_file, src, on_chunk)
+            if codec is not None:
+                data = await loop.run_in_executor(None, compress, data, codec)
+            await self._throttle(len(data))
+            await bfs._provider.put_blob(dst.as_posix(), data)
+        else:
+            chunks = read_chunks(src, on_chunk)
+            if codec is not None:
+                chunks = compress_stream(chunks, codec)
+            await bfs.write_chunks(dst, self._throttled(chunks))
+        if records is not None and hasher is not None:
+            records[path] = hasher.record()
+        return size
+
+    async def list_files(self, root: URL) -> list[FileInfo]:
+        # trailing slash prevents matching of the sibling keys with the same prefix
+        async with self._client.buckets.list_blobs(
+            URL(str(root).rstrip("/") + "/"), recursive=True
+        ) as it:
+            return [
+                FileInfo(
+                    relative_key(entry, root),
+                    entry.size,
+                    entry.modified_at.timestamp() if entry.modified_at else None,
+                )
+                async for entry in it
+                if entry.is_file()
+            ]
+
+    @asynccontextmanager
+    async def _reader(self, root: URL) -> AsyncIterator[BlobReader]:
+        async with self.bucket_fs(root) as bfs:
+            prefix = PurePosixPath(bfs.bucket.get_key_for_uri(root))
+
+            def _read(
+                path: str, offset: int, length: int | None
+            ) -> AsyncContextManager[AsyncIterator[bytes]]:
+                # not bounded by `length`, the ranges are not used (`ranged_reads`)
+                return bfs.read_chunks(prefix / path, offset)
+
+            yield _read
+
+    async def delete_files(
+        self, root: URL, paths: Iterable[str], codec: Codec | None = None
+    ) -> TransferStats:
+        """Delete `paths`, relative to `root` blob URI."""
+        async with self.bucket_fs(root) as bfs:
+            key = PurePosixPath(bfs.bucket.get_key_for_uri(root))
+            return await self.run(
+                partial(self._delete, bfs, blob_path(key / p, codec)) for p in paths
+            )
+
+    async def _delete(self, bfs: BucketFS, path: PurePosixPath) -> int:
+        try:
+            await bfs.rm(path)
+        except ResourceNotFound:
+            pass
+        return 0
+
+    async def read_blob(self, uri: URL) -> bytes | None:
+        """Read a small blob at once, `None` is returned if it does not exist."""
+        async with self.bucket_fs(uri) as bfs:
+            path = PurePosixPath(bfs.bucket.get_key_for_uri(uri))
+            try:
+                async with bfs.read_chunks(path) as it:
+                    return b"".join([chunk async for chunk in it])
+            except ResourceNotFound:
+                return None
+
+    async def write_blob(self, uri: URL, data: bytes) -> None:
+        async with self.bucket_fs(uri) as bfs:
+            await bfs._provider.put_blob(bfs.bucket.get_key_for_uri(uri), data)
+
+    async def write_stream(self, uri: URL, chunks: AsyncIterator[bytes]) -> None:
+        async with self.bucket_fs(uri) as bfs:
+            await bfs.write_chunks(
+                PurePosixPath(bfs.bucket.get_key_for_uri(uri)), self._throttled(chunks)
+            )
+
+    @asynccontextmanager
+    async def read_stream(
+        self, uri: URL, offset: int = 0
+    ) -> AsyncIterator[AsyncIterator[bytes]]:
+        async with self.bucket_fs(uri) as bfs:
+            path = PurePosixPath(bfs.bucket.get_key_for_uri(uri))
+            async with bfs.read_chunks(path, offset) as it:
+                yield self._throttled(it)
+
+    async def delete_dir(self, root: URL) -> None:
+        await self._client.buckets.blob_rm(root / "*")
+
+
+class DownloadJournal:
+    """Append-only log of the completely downloaded blobs.
+
+    Blobs are identified by their path, size and modification time,
+    so an overwritten blob is never taken for the downloaded one.
+    """
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._done: set[str] = set()
+        self._file: IO[str] | None = None
+        try:
+            with path.open() as f:
+                self._done.update(line.rstrip("\n") for line in f)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _record(info: FileInfo) -> str:
+        return json.dumps([info.path, info.size, info.modified])
+
+    def is_done(self, info: FileInfo) -> bool:
+        return self._record(info) in self._done
+
+    def mark_done(self, info: FileInfo) -> None:
+        if self._file is None:
+            self._file = self._path.open("a")
+        record = self._record(info)
+        self._file.write(record + "\n")
+        self._file.flush()
+        self._done.add(record)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self) -> None:
+        self._path.unlink(missing_ok=True)
+
+
+def relative_key(entry: BucketEntry, root: URL) -> str:
+    """Path of the blob relative to the `root` directory URI."""
+    prefix = entry.bucket.get_key_for_uri(root).rstrip("/")
+    return PurePosixPath(entry.key).relative_to(prefix).as_posix()
+
+
+def blob_path(path: PurePosixPath, codec: Codec | None) -> PurePosixPath:
+    """Key of the blob, which stores the file at `path` compressed with `codec`."""
+    return path.with_name(path.name + codec.suffix) if codec is not None else path
+
+
+async def read_chunks(
+    path: Path, on_chunk: Callable[[bytes], None] | None = None
+) -> AsyncIterator[bytes]:
+    """Read the file by chunks in the thread pool. `on_chunk`, e.g. the hasher
+    of the file, is called with every chunk in the thread pool as well.
+    """
+    loop = asyncio.get_running_loop()
+
+    def _read(f: IO[bytes]) -> bytes:
+        chunk = f.read(READ_CHUNK_SIZE)
+        if chunk and on_chunk is not None:
+            on_chunk(chunk)
+        return chunk
+
+    with path.open("rb") as f:
+        while True:
+            chunk = await loop.run_in_executor(None, _read, f)
+            if not chunk:
+                return
+            yield chunk
+
+
+def read_file(path: Path, on_chunk: Callable[[bytes], None] | None = None) -> bytes:
+    """Read the small file at once, see `read_chunks()`."""
+    data = path.read_bytes()
+    if data and on_chunk is not None:
+        on_chunk(data)
+    return data
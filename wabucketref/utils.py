@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from fnmatch import fnmatchcase
 from typing import Sequence
 
 
@@ -14,3 +15,31 @@ def parse_meta(meta: Sequence[str]) -> dict[str, str]:
         val = "=".join(v)
         result[k] = val
     return result
+
+
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
+
+def parse_size(size: str) -> int:
+    """Parse human-readable size, e.g. `512M` or `50GB`, into bytes."""
+    value = size.strip().upper().rstrip("IB").rstrip("B")
+    unit = value[-1:] if value[-1:] in _SIZE_UNITS else ""
+    number = value[: len(value) - len(unit)]
+    try:
+        return int(float(number) * _SIZE_UNITS[unit])
+    except ValueError:
+        raise ValueError(f"Wrong size value: {size}.") from None
+
+
+def path_matches(
+    path: str, include: Sequence[str] = (), exclude: Sequence[str] = ()
+) -> bool:
+    """Whether relative `path` matches any of `include` glob patterns
+    (any path if there are none) and none of `exclude` ones.
+
+    Patterns are matched against the whole path, `*` matches `/` as well,
+    e.g. `*.json` matches both `config.json` and `dir/config.json`.
+    """
+    if include and not any(fnmatchcase(path, p) for p in include):
+        return False
+    return not any(fnmatchcase(path, p) for p in exclude)